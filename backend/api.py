@@ -1,234 +1,113 @@
-from typing import List, Union, Tuple, Dict
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from secrets import compare_digest
+from typing import Callable, List, Union, Tuple, Dict, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 import uvicorn
-from catboost import CatBoostClassifier
 import numpy as np
 
-from backend.storage import (
-    PLAYER_DATA_DICT,
-    H2H_DICT,
-    SURFACE_H2H_DICT,
-    PREDICTION_COLUMNS,
-    IOC_DICT,
-    SORTED_PLAYER_IDS,
+from backend.leaderboard import HANDS
+from backend.metrics import METRICS, MetricsMiddleware, timed
+from backend.player_store import PlayerView
+from backend.cache import PredictionCache
+from backend.inference import get_model_output, get_batch_model_output
+from backend.model_registry import DEFAULT_MODEL, MODEL_CHOICES
+from backend.schemas import Prediction, DrawSimulation
+from backend.serving import BundleManager, ServingBundle, load_serving_bundle
+from backend.simulation import (
+    get_round_names,
+    is_valid_draw_size,
+    get_win_matrix,
+    simulate_draw,
 )
-
-from backend.backend_utils import Player, get_surface_player_val
-from utils.feature_helpers import get_surface_idx_by_name
+from backend.win_matrix import get_pair_predictions
 from utils.logger import get_logger
-from config import ROOT_DIR
-
-
-app = FastAPI()
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods = ["*"],
-    allow_headers=["*"]
-)
 
-TOURNEY_YEAR = 2024
-TOURNEY_MONTH = 12
-TOURNEY_DAY = 15
 
-MODEL = CatBoostClassifier()
-MODEL.load_model(f'{ROOT_DIR}/models/catboost_model.cbm')
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 4096))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", 0)) or None
+PREDICTION_CACHE = PredictionCache(PREDICTION_CACHE_SIZE,
+                                   PREDICTION_CACHE_TTL)
+
+RELOAD_INTERVAL = float(os.getenv("RELOAD_INTERVAL", 0))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+SERVING = BundleManager(load_serving_bundle())
+PREDICTION_CACHE_HELP = {
+    "hits": "Predictions served from the cache",
+    "misses": "Predictions computed on a cache miss",
+    "coalesced": "Predictions that waited on the same in-flight computation",
+    "evictions": "Entries evicted from the full cache",
+    "size": "Entries in the prediction cache",
+    "hit_rate": "Share of lookups served without a new computation"
+}
+METRICS.add_collector(lambda: {
+    f"prediction_cache_{name}": value
+    for name, value in PREDICTION_CACHE.get_stats().items()
+    if name in PREDICTION_CACHE_HELP
+}, {f"prediction_cache_{name}": help_text
+    for name, help_text in PREDICTION_CACHE_HELP.items()})
 
 PAGE_LIMIT = 24
+SEARCH_LIMIT = 50
+LEADERBOARD_PAGE_LIMIT = 100
 
 logger = get_logger("backend.api")
 
 
-class Prediction(BaseModel):
-    player_1_id: int
-    player_2_id: int
-    player_1_entry: str = "ALT"
-    player_2_entry: str = "ALT"
-    surface: str = "hard"
-    tourney_level: str = "A"
-    draw_size: float = 64.0
-
-
-class PredictionData:
-    entry_columns = [
-        "ALT", "Alt", "LL", "PR",
-        "Q", "SE", "WC"
-    ]
-
-    surface_columns = [
-        "surface_Carpet", "surface_Clay",
-        "surface_Grass", "surface_Hard"
-    ]
-
-    tourney_level_columns = [
-        'tourney_level_A', 'tourney_level_D', 'tourney_level_F',
-        'tourney_level_G', 'tourney_level_M',
-    ]
-
-    player_total_diff_columns = [
-        col for col in PREDICTION_COLUMNS
-        if "diff" in col and "h2h" not in col
-    ]
-
-    player_diff_columns = [
-        col for col in player_total_diff_columns if "surface" not in col
-    ]
-
-    player_surface_diff_columns = [
-        col for col in player_total_diff_columns if "surface" in col
-    ]
-
-    def __init__(self, player_1: Player, player_2: Player,
-                 prediction: Prediction):
-        self.player_1 = player_1
-        self.player_2 = player_2
-        self.prediction = prediction
-
-    def set(self) -> None:
-        self.set_players_entry_data()
-        self.set_players_hand_data()
-
-        self.set_tourney_date()
-
-        self.set_surface_data(self.prediction.surface)
-        self.set_tourney_level(self.prediction.tourney_level)
-
-        self.set_diff_columns()
-        self.set_surface_diff_columns()
-        self.draw_size = self.prediction.draw_size
-
-    def set_players_entry_data(self) -> None:
-        self.set_player_entry_data(self.prediction.player_1_entry)
-        self.set_player_entry_data(self.prediction.player_2_entry, 2)
-
-    def set_players_hand_data(self) -> None:
-        self.player_1_hand_L = self.player_1.hand_L
-        self.player_1_hand_R = self.player_1.hand_R
-
-        self.player_2_hand_L = self.player_2.hand_L
-        self.player_2_hand_R = self.player_2.hand_R
-
-    def set_tourney_date(self) -> None:
-        self.tourney_year = TOURNEY_YEAR
-        self.tourney_month = TOURNEY_MONTH
-        self.tourney_day = TOURNEY_DAY
-
-    def set_player_entry_data(self, entry_name: str, num: int=1) -> None:
-        for entry_col in self.entry_columns:
-            entry_val = True if entry_col == entry_name else False
-            setattr(self, f"player_{num}_entry_{entry_col}", entry_val)
-
-    def set_surface_data(self, surface: str) -> None:
-        surface = surface.capitalize()
-        for surface_col in self.surface_columns:
-            surface_val = (True if surface_col == f"surface_{surface}"
-                           else False)
-            setattr(self, surface_col, surface_val)
-
-    def set_tourney_level(self, tourney_level: str) -> None:
-        for tourney_col in self.tourney_level_columns:
-            tourney_val = (True
-                        if tourney_col == f"tourney_level_{tourney_level}"
-                        else False)
-            setattr(self, tourney_col, tourney_val)
-
-    def set_diff_columns(self) -> None:
-        for col in self.player_diff_columns:
-            player_col = col.replace("_diff", "")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    watcher = None
+    if RELOAD_INTERVAL > 0:
+        watcher = asyncio.create_task(SERVING.watch(RELOAD_INTERVAL))
 
-            player_1_val = getattr(self.player_1, player_col)
-            player_2_val = getattr(self.player_2, player_col)
+    yield
 
-            setattr(self, col, player_1_val - player_2_val)
+    if watcher is not None:
+        watcher.cancel()
 
-    def set_surface_diff_columns(self) -> None:
-        surface = self.prediction.surface.capitalize()
-        for col in self.player_surface_diff_columns:
-            player_col = col.replace("diff", surface)
 
-            player_1_val = get_surface_player_val(self.player_1, player_col)
-            player_2_val = get_surface_player_val(self.player_2, player_col)
-
-            setattr(self, col, player_1_val - player_2_val)
-
-
-def get_head_to_head_diff(player_1_id: int, player_2_id: int) -> int:
-    if (player_1_id, player_2_id) in H2H_DICT:
-        curr = H2H_DICT[(player_1_id, player_2_id)]
-
-    elif (player_2_id, player_1_id) in H2H_DICT:
-        curr = H2H_DICT[(player_2_id, player_1_id)][::-1]
-
-    else:
-        return 0
-
-    return curr[0] - curr[1]
-
-
-def get_head_to_head_surface_diff(player_1_id: int, player_2_id: int,
-                                  surface_idx: int) -> int:
-    if (player_1_id, player_2_id) in H2H_DICT:
-        curr = SURFACE_H2H_DICT[(player_1_id, player_2_id)][surface_idx]
-
-    elif (player_2_id, player_1_id) in H2H_DICT:
-        curr = SURFACE_H2H_DICT[(player_2_id, player_1_id)][surface_idx][::-1]
-
-    else:
-        return 0
-
-    return curr[0] - curr[1]
-
-
-def get_prediction_data(player_1: Player, player_2: Player,
-                        prediction: Prediction) -> PredictionData:
-    player_1_id, player_2_id = prediction.player_1_id, prediction.player_2_id
-    prediction_data = PredictionData(player_1, player_2, prediction)
-    prediction_data.set()
-
-    surface_idx = get_surface_idx_by_name(prediction.surface)
-    h2h_diff = get_head_to_head_diff(player_1_id, player_2_id)
-    surface_h2h_diff = get_head_to_head_surface_diff(player_1_id,
-                                                     player_2_id, surface_idx)
-
-    prediction_data.h2h_diff = h2h_diff
-    prediction_data.surface_h2h_diff = surface_h2h_diff
-    return prediction_data
-
-
-def get_prediction_list(prediction_data:
-                        PredictionData) -> List[Union[float, int, bool]]:
-    prediction_list = [getattr(prediction_data, col)
-                         for col in PREDICTION_COLUMNS]
-    return prediction_list
+app = FastAPI(lifespan=lifespan)
 
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods = ["*"],
+    allow_headers=["*"]
+)
+app.add_middleware(MetricsMiddleware)
 
-def get_prediction_array(prediction_data: PredictionData) -> np.array:
-    prediction_list = get_prediction_list(prediction_data)
-    prediction_array = np.array(prediction_list).reshape(1, -1)
-    return prediction_array
 
+def get_version_headers(bundle: ServingBundle) -> Dict[str, str]:
+    return {"X-Model-Version": bundle.model_version,
+            "X-Data-Version": bundle.data_version}
 
-def get_model_output(prediction_array: np.array) -> Tuple[int, float]:
-    player_1_won = MODEL.predict(prediction_array)
-    logger.debug(f"Raw Player 1 Won Prediction: {player_1_won[0]}")
 
-    probabilities = MODEL.predict_proba(prediction_array)
-    confidence_score = np.max(probabilities[0])
-    logger.debug(f"Raw Confidence Score: {confidence_score}")
+def get_serving_bundle(response: Response) -> ServingBundle:
+    bundle = SERVING.bundle
+    response.headers.update(get_version_headers(bundle))
+    return bundle
 
-    winner_player = 1 if player_1_won else 2
-    confidence_percent = round(confidence_score * 100, 2)
-    logger.info(f"Model Prediction: Player {winner_player}"
-                f" wins with {confidence_percent}% confidence")
 
-    return winner_player, confidence_percent
+def get_encoded_response(request: Request, bundle: ServingBundle,
+                         key: Optional[tuple],
+                         get_content: Callable[[], dict | list]) -> Response:
+    # Headers set on the injected response are dropped when a Response is
+    # returned, so the version headers are passed along here
+    encoded_response = bundle.get_encoded_response(key, get_content)
+    return encoded_response.get_response(
+        request.headers.get("if-none-match"),
+        request.headers.get("accept-encoding"),
+        get_version_headers(bundle)
+    )
 
 
-def get_player_hand_text(player: Player) -> str:
+def get_player_hand_text(player: PlayerView) -> str:
     if player.hand_L and player.hand_R:
         return "Both-handed"
     elif player.hand_L:
@@ -237,10 +116,10 @@ def get_player_hand_text(player: Player) -> str:
         return "Right-handed"
 
 
-def get_main_statistics_dict(player: Player,
-                        player_id: int) -> Dict[str, Union[str, float]]:
+def get_main_statistics_dict(player: PlayerView, player_id: int,
+                             ioc_dict: dict) -> Dict[str, Union[str, float]]:
     name = player.name
-    ioc = IOC_DICT.get(player_id, "Unknown")
+    ioc = ioc_dict.get(player_id, "Unknown")
     hand = get_player_hand_text(player)
 
     original_rank, rank_points = player.original_rank, int(player.rank_points)
@@ -260,10 +139,11 @@ def get_main_statistics_dict(player: Player,
     }
 
 
-def get_preview_statistics_dict(player: Player,
-                            player_id: int) -> Dict[str, Union[str, float]]:
+def get_preview_statistics_dict(player: PlayerView, player_id: int,
+                                ioc_dict: dict
+                                ) -> Dict[str, Union[str, float]]:
     name = player.name
-    ioc = IOC_DICT.get(player_id, "Unknown")
+    ioc = ioc_dict.get(player_id, "Unknown")
 
     original_rank, rank_points = player.original_rank, int(player.rank_points)
     elo, win_ratio = int(player.elo), round(player.win_ratio * 100, 1)
@@ -278,6 +158,48 @@ def get_preview_statistics_dict(player: Player,
     }
 
 
+async def ensure_model_loaded(bundle: ServingBundle, model: str) -> None:
+    if model not in MODEL_CHOICES:
+        raise HTTPException(status_code=400,
+                            detail=f"Model {model} doesn't exist!")
+
+    registry = bundle.predictor.registry
+    if registry.is_loaded(model):
+        return None
+
+    try:
+        await run_in_threadpool(registry.load, model)
+    except (FileNotFoundError, ImportError, ValueError) as load_error:
+        logger.error("Loading %s model failed -> %s", model, load_error)
+        raise HTTPException(status_code=503,
+                            detail=f"Model {model} is not available!")
+
+
+def get_prediction_key(prediction: Prediction, model: str) -> tuple:
+    return (
+        model, prediction.player_1_id, prediction.player_2_id,
+        prediction.player_1_entry, prediction.player_2_entry,
+        prediction.surface, prediction.tourney_level, prediction.draw_size
+    )
+
+
+async def get_prediction_output(bundle: ServingBundle, prediction: Prediction,
+                                model: str) -> Tuple[int, float]:
+    if bundle.win_matrix is not None and model == DEFAULT_MODEL:
+        with timed("win_matrix"):
+            player_1_probability = bundle.win_matrix.lookup(prediction)
+        if player_1_probability is not None:
+            return get_model_output(np.array([[1 - player_1_probability,
+                                               player_1_probability]]))
+
+    prediction_array = bundle.predictor.get_prediction_array(prediction)
+    with timed("inference"):
+        probabilities = await bundle.get_scheduler(model).submit(
+            prediction_array)
+    with timed("output"):
+        return get_model_output(probabilities)
+
+
 def handle_reverse_order(prediction: Prediction) -> None:
     prediction.player_1_id, prediction.player_2_id = (
         prediction.player_2_id, prediction.player_1_id
@@ -289,19 +211,21 @@ def handle_reverse_order(prediction: Prediction) -> None:
 
 
 @app.post("/prediction")
-def prediction(prediction: Prediction) -> dict:
+async def prediction(prediction: Prediction, model: str=DEFAULT_MODEL,
+                     bundle: ServingBundle=Depends(get_serving_bundle)
+                     ) -> dict:
+    await ensure_model_loaded(bundle, model)
+
     reverse_order = False
     if prediction.player_1_id < prediction.player_2_id:
         reverse_order = True
         handle_reverse_order(prediction)
 
-    player_1 = PLAYER_DATA_DICT[prediction.player_1_id]
-    player_2 = PLAYER_DATA_DICT[prediction.player_2_id]
-
-    prediction_data = get_prediction_data(player_1, player_2, prediction)
-    prediction_array = get_prediction_array(prediction_data)
-
-    winner_player, confidence_percent = get_model_output(prediction_array)
+    winner_player, confidence_percent = (
+        await PREDICTION_CACHE.get_or_compute(
+            get_prediction_key(prediction, model), bundle.version,
+            lambda: get_prediction_output(bundle, prediction, model))
+    )
     if reverse_order:
         winner_player = 2 if winner_player == 1 else 1
 
@@ -311,41 +235,255 @@ def prediction(prediction: Prediction) -> dict:
     }
 
 
+@app.post("/predictions/batch")
+async def batch_prediction(predictions: List[Prediction],
+        model: str=DEFAULT_MODEL,
+        bundle: ServingBundle=Depends(get_serving_bundle)) -> List[dict]:
+    await ensure_model_loaded(bundle, model)
+    if not predictions:
+        return []
+
+    reverse_orders = []
+    for prediction in predictions:
+        reverse_order = prediction.player_1_id < prediction.player_2_id
+        if reverse_order:
+            handle_reverse_order(prediction)
+
+        reverse_orders.append(reverse_order)
+
+    prediction_matrix = bundle.predictor.get_prediction_matrix(predictions)
+    with timed("inference"):
+        probabilities = await bundle.get_scheduler(model).submit(
+            prediction_matrix)
+    with timed("output"):
+        model_outputs = get_batch_model_output(probabilities)
+
+    results = []
+    for (winner_player, confidence_percent), reverse_order in zip(
+            model_outputs, reverse_orders):
+        if reverse_order:
+            winner_player = 2 if winner_player == 1 else 1
+
+        results.append({
+            "winner_player": winner_player,
+            "confidence": confidence_percent
+        })
+
+    return results
+
+
+@app.post("/simulate/draw")
+async def draw_simulation(simulation: DrawSimulation,
+        model: str=DEFAULT_MODEL,
+        bundle: ServingBundle=Depends(get_serving_bundle)) -> dict:
+    player_store = bundle.storage.player_store
+    player_ids = simulation.player_ids
+    if not is_valid_draw_size(len(player_ids)):
+        raise HTTPException(status_code=400,
+                            detail="Draw size must be a power of two!")
+
+    if len(set(player_ids)) != len(player_ids):
+        raise HTTPException(status_code=400,
+                            detail="Draw contains duplicate players!")
+
+    for player_id in player_ids:
+        if player_id not in player_store:
+            raise HTTPException(status_code=404,
+                                detail=f"Player {player_id} doesn't exist!")
+
+    await ensure_model_loaded(bundle, model)
+    predictions, rows_1, rows_2 = get_pair_predictions(
+        player_ids, simulation.surface,
+        {"tourney_level": simulation.tourney_level,
+         "draw_size": simulation.draw_size or float(len(player_ids))}
+    )
+    prediction_matrix = bundle.predictor.get_prediction_matrix(predictions)
+    with timed("inference"):
+        probabilities = await bundle.get_scheduler(model).submit(
+            prediction_matrix)
+    win_matrix = get_win_matrix(len(player_ids), rows_1, rows_2,
+                                probabilities[:, 1])
+
+    with timed("simulation"):
+        advancement = await run_in_threadpool(simulate_draw, win_matrix,
+                                              simulation.iterations,
+                                              simulation.seed)
+    round_names = get_round_names(len(player_ids))
+
+    players = []
+    for player_id, player_advancement in zip(player_ids, advancement):
+        players.append({
+            "id": player_id, "name": player_store[player_id].name,
+            "probabilities": dict(zip(round_names,
+                                      player_advancement.round(4).tolist()))
+        })
+
+    return {
+        "rounds": round_names,
+        "iterations": simulation.iterations,
+        "players": players
+    }
+
+
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(METRICS.render(),
+                             media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+def cache_stats() -> dict:
+    return PREDICTION_CACHE.get_stats()
+
+
+@app.get("/health")
+def health(bundle: ServingBundle=Depends(get_serving_bundle)) -> dict:
+    return SERVING.get_health(bundle)
+
+
+@app.post("/admin/reload")
+async def reload(force: bool=False,
+                 x_admin_token: Optional[str]=Header(default=None)) -> dict:
+    # Without a configured token the endpoint does not exist
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not compare_digest(x_admin_token,
+                                                   ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token!")
+
+    try:
+        reloaded = await SERVING.reload(force)
+    except Exception:
+        logger.exception("Reloading the serving bundle failed")
+        raise HTTPException(status_code=500, detail="Reload failed!")
+
+    return {"reloaded": reloaded, **SERVING.get_health()}
+
+
+@app.get("/players/search")
+def search_players(q: str, limit: int=10,
+        bundle: ServingBundle=Depends(get_serving_bundle)
+        ) -> List[Dict[str, Union[str, int]]]:
+    if not 1 <= limit <= SEARCH_LIMIT:
+        raise HTTPException(status_code=400,
+                            detail=f"Limit must be between 1 and "
+                                   f"{SEARCH_LIMIT}!")
+
+    player_store = bundle.storage.player_store
+    ioc_dict = bundle.storage.ioc_dict
+    rows = bundle.player_search.search(q, limit)
+
+    return [{"id": id, "name": player_store.column("name")[row].item(),
+             "ioc": ioc_dict.get(id, "Unknown"),
+             "rank": player_store.column("original_rank")[row].item()}
+            for id, row in zip(player_store.player_ids[rows].tolist(),
+                               rows.tolist())]
+
+
+@app.get("/leaderboard")
+def get_leaderboard(stat: str="elo", order: str="desc",
+        ioc: Optional[str]=None, hand: Optional[str]=None,
+        min_matches: int=0, page: int=1, page_size: int=PAGE_LIMIT,
+        bundle: ServingBundle=Depends(get_serving_bundle)) -> dict:
+    leaderboard = bundle.leaderboard
+    if not leaderboard.is_stat(stat):
+        raise HTTPException(status_code=400,
+                            detail=f"Stat {stat} doesn't exist!")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400,
+                            detail="Order must be asc or desc!")
+    if hand is not None and hand not in HANDS:
+        raise HTTPException(status_code=400,
+                            detail=f"Hand must be one of {', '.join(HANDS)}!")
+    if page < 1 or not 1 <= page_size <= LEADERBOARD_PAGE_LIMIT:
+        raise HTTPException(status_code=400,
+                            detail=f"Page must be positive and page size "
+                                   f"between 1 and {LEADERBOARD_PAGE_LIMIT}!")
+
+    rows = leaderboard.get_rows(stat, order == "desc", ioc, hand,
+                                min_matches)
+    page_rows = rows[(page - 1) * page_size:page * page_size]
+
+    player_store = bundle.storage.player_store
+    ioc_dict = bundle.storage.ioc_dict
+    values, _ = leaderboard.get_stat_values(stat)
+
+    return {
+        "data": [
+            {**get_preview_statistics_dict(PlayerView(player_store, row), id,
+                                           ioc_dict),
+             "value": value}
+            for id, row, value in zip(
+                player_store.player_ids[page_rows].tolist(),
+                page_rows.tolist(), values[page_rows].tolist())
+        ],
+        "total": len(rows),
+        "total_page_number": -(-len(rows) // page_size)
+    }
+
+
 @app.get("/players/{player_id}")
-def get_player_data(player_id: int) -> dict:
-    if player_id not in PLAYER_DATA_DICT:
+def get_player_data(player_id: int,
+        bundle: ServingBundle=Depends(get_serving_bundle)) -> dict:
+    player_store = bundle.storage.player_store
+    if player_id not in player_store:
         raise HTTPException(status_code=404,
                             detail=f"Player {player_id} doesn't exist!")
 
-    player = PLAYER_DATA_DICT[player_id]
-    main_statistics_dict = get_main_statistics_dict(player, player_id)
+    player = player_store[player_id]
+    main_statistics_dict = get_main_statistics_dict(player, player_id,
+                                                    bundle.storage.ioc_dict)
 
     return main_statistics_dict
 
 
-@app.get("/players")
-def get_players_data(page: int=1) -> dict | list:
+def get_players_page(bundle: ServingBundle, page: int) -> dict | list:
+    player_store = bundle.storage.player_store
+    ioc_dict = bundle.storage.ioc_dict
+    sorted_player_ids = bundle.storage.sorted_player_ids
+
     if page == -1:
-        return [get_preview_statistics_dict(PLAYER_DATA_DICT[id], id)
-                                for id in SORTED_PLAYER_IDS]
+        return [get_preview_statistics_dict(player_store[id], id, ioc_dict)
+                                for id in sorted_player_ids]
 
     page -= 1
-    curr_ids = SORTED_PLAYER_IDS[
+    curr_ids = sorted_player_ids[
         page * PAGE_LIMIT:(page + 1) * PAGE_LIMIT
     ]
 
-    preview_data = [get_preview_statistics_dict(PLAYER_DATA_DICT[id], id)
+    preview_data = [get_preview_statistics_dict(player_store[id], id,
+                                                ioc_dict)
                                 for id in curr_ids]
-    logger.info(f"Preview Data: {preview_data}")
+    logger.debug("Preview page %s: %s players", page + 1, len(preview_data))
     return {
         "data": preview_data,
-        "total_page_number": len(SORTED_PLAYER_IDS) // PAGE_LIMIT
+        "total_page_number": len(sorted_player_ids) // PAGE_LIMIT
     }
 
 
+@app.get("/players")
+def get_players_data(request: Request, page: int=1,
+        bundle: ServingBundle=Depends(get_serving_bundle)) -> Response:
+    # Only real pages are kept, anything else is encoded per request
+    page_count = len(bundle.storage.sorted_player_ids) // PAGE_LIMIT + 1
+    key = ("players", page) if -1 <= page <= page_count else None
+
+    return get_encoded_response(request, bundle, key,
+                                lambda: get_players_page(bundle, page))
+
+
+def get_players_lookup(bundle: ServingBundle) -> List[Dict[str, int]]:
+    player_store = bundle.storage.player_store
+    return [{player_store[id].name: id}
+            for id in bundle.storage.sorted_player_ids]
+
+
 @app.get("/players-lookup")
-def players_lookup() -> List[Dict[str, int]]:
-    return [{PLAYER_DATA_DICT[id].name: id} for id in SORTED_PLAYER_IDS]
+def players_lookup(request: Request,
+                   bundle: ServingBundle=Depends(get_serving_bundle)
+                   ) -> Response:
+    return get_encoded_response(request, bundle, ("players-lookup",),
+                                lambda: get_players_lookup(bundle))
 
 
 if __name__ == '__main__':
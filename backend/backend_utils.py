@@ -1,8 +1,15 @@
-from typing import List, Iterable, Tuple
+import ctypes
+import gc
+import os
+from typing import Callable, List, Tuple, Dict
 
+import numpy as np
 import pandas as pd
 
-from utils.feature_helpers import get_surface_name_by_row
+from utils.feature_helpers import (
+    Surface,
+    SURFACE_NAMES
+)
 from config import ROOT_DIR
 
 
@@ -12,63 +19,92 @@ EXCLUDED_FEATURES = [
     "h2h_won"
 ]
 
-class Player:
-    def __init__(self, row: Iterable, column_names: List[str], num: int=1):
-        self.row = row
-        self.num = num
 
-        self.column_names = column_names
-        self.set_player_attributes()
+def get_last_occurrences(player_1_keys: np.ndarray,
+                         player_2_keys: np.ndarray
+                         ) -> Tuple[np.ndarray, np.ndarray]:
+    # Same order as scanning the rows backwards, player 1 before player 2
+    row_count = len(player_1_keys)
+    keys = np.empty(2 * row_count, dtype=np.int64)
+    keys[0::2] = player_1_keys[::-1]
+    keys[1::2] = player_2_keys[::-1]
 
-    def set_player_attributes(self):
-        for col in self.column_names:
-            new_col = col.replace(f"player_{self.num}_", "")
-            setattr(self, new_col, getattr(self.row, col))
+    _, positions = np.unique(keys, return_index=True)
+    positions.sort()
 
-        return None
+    return row_count - 1 - positions // 2, positions % 2 + 1
 
-    def __str__(self):
-        return f"{self.name}: {self.win_ratio}"
 
+def get_player_values(df: pd.DataFrame, rows: np.ndarray, nums: np.ndarray,
+                      player_1_column: str,
+                      player_2_column: str) -> np.ndarray:
+    player_values = np.where(nums == 1,
+                             df[player_1_column].to_numpy()[rows],
+                             df[player_2_column].to_numpy()[rows])
+    if player_values.dtype == object:
+        player_values = np.array(player_values.tolist())
 
-def get_player_data_dict(df: pd.DataFrame, player_1_columns: List[str],
-                         player_2_columns: List[str]) -> dict:
-    player_data_dict = {}
+    return player_values
 
-    for row in df[::-1].itertuples():
-        player_1_id, player_2_id = row.player_1_id, row.player_2_id
 
-        if player_1_id not in player_data_dict:
-            player_data_dict[player_1_id] = Player(row, player_1_columns)
-        if player_2_id not in player_data_dict:
-            player_data_dict[player_2_id] = Player(row, player_2_columns, 2)
+def get_player_columns(df: pd.DataFrame, player_1_columns: List[str],
+                       player_2_columns: List[str]
+                       ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    player_1_ids = df["player_1_id"].to_numpy(dtype=np.int64)
+    player_2_ids = df["player_2_id"].to_numpy(dtype=np.int64)
+    rows, nums = get_last_occurrences(player_1_ids, player_2_ids)
 
-    return player_data_dict
+    player_ids = np.where(nums == 1, player_1_ids[rows], player_2_ids[rows])
+    player_columns = {
+        player_1_col.replace("player_1_", ""): get_player_values(
+            df, rows, nums, player_1_col, player_2_col)
+        for player_1_col, player_2_col
+        in zip(player_1_columns, player_2_columns)
+    }
 
+    return player_ids, player_columns
 
-def set_surface_attributes(player_surface_columns: List[str], row: Iterable,
-                           player: Player, num: int=1) -> None:
-    surface_name = get_surface_name_by_row(row)
-    for col in player_surface_columns:
-        new_col = f"{col}_{surface_name}"
-        new_col = new_col.replace(f"player_{num}_", "")
 
-        row_val = getattr(row, col)
-
-        if not hasattr(player, new_col):
-            setattr(player, new_col, row_val)
+def get_surface_idx_column(df: pd.DataFrame) -> np.ndarray:
+    return np.select(
+        [df["surface_Carpet"].to_numpy(dtype=bool),
+         df["surface_Clay"].to_numpy(dtype=bool),
+         df["surface_Grass"].to_numpy(dtype=bool)],
+        [Surface.CARPET.value, Surface.CLAY.value, Surface.GRASS.value],
+        default=Surface.HARD.value
+    )
 
 
-def add_surface_attributes(df: pd.DataFrame, player_data_dict: dict,
+def get_player_surface_columns(df: pd.DataFrame, player_ids: np.ndarray,
         player_1_surface_columns: List[str],
-        player_2_surface_columns: List[str]) -> None:
-    for row in df[::-1].itertuples():
-        player_1_id, player_2_id = row.player_1_id, row.player_2_id
-        player_1 = player_data_dict[player_1_id]
-        player_2 = player_data_dict[player_2_id]
-
-        set_surface_attributes(player_1_surface_columns, row, player_1)
-        set_surface_attributes(player_2_surface_columns, row, player_2, 2)
+        player_2_surface_columns: List[str]
+        ) -> Tuple[np.ndarray, np.ndarray]:
+    surface_count = len(SURFACE_NAMES)
+    surface_idx = get_surface_idx_column(df)
+    player_1_keys = (df["player_1_id"].to_numpy(dtype=np.int64)
+                     * surface_count + surface_idx)
+    player_2_keys = (df["player_2_id"].to_numpy(dtype=np.int64)
+                     * surface_count + surface_idx)
+    rows, nums = get_last_occurrences(player_1_keys, player_2_keys)
+
+    keys = np.where(nums == 1, player_1_keys[rows], player_2_keys[rows])
+    id_order = np.argsort(player_ids)
+    player_rows = id_order[np.searchsorted(player_ids, keys // surface_count,
+                                           sorter=id_order)]
+    key_surfaces = keys % surface_count
+
+    surface_values = np.zeros((len(player_ids), surface_count,
+                               len(player_1_surface_columns)),
+                              dtype=np.float64)
+    surface_seen = np.zeros((len(player_ids), surface_count), dtype=bool)
+    surface_seen[player_rows, key_surfaces] = True
+
+    for col_idx, (player_1_col, player_2_col) in enumerate(
+            zip(player_1_surface_columns, player_2_surface_columns)):
+        surface_values[player_rows, key_surfaces, col_idx] = (
+            get_player_values(df, rows, nums, player_1_col, player_2_col))
+
+    return surface_values, surface_seen
 
 
 def get_player_column_names(column_names: List[str],
@@ -103,23 +139,63 @@ def get_final_player_columns(PLAYER_1_ALL_COLUMNS: List[str],
     )
 
 
-def get_surface_player_val(player: Player, player_col: str) -> float | int:
-    if hasattr(player, player_col):
-        player_val = getattr(player, player_col)
-    else:
-        player_val = 0
-
-    return player_val
-
-
 def get_ioc_dict(
         csv_path: str=f"{ROOT_DIR}/data/atp_players.csv") -> dict:
-    df = pd.read_csv(csv_path)
+    df = pd.read_csv(csv_path, usecols=["player_id", "ioc"])
     ioc_dict = {}
 
     for row in df.itertuples():
         id, ioc = row.player_id, row.ioc
-        if ioc and id not in ioc_dict:
+        if isinstance(ioc, str) and id not in ioc_dict:
             ioc_dict[id] = ioc
 
-    return ioc_dict
\ No newline at end of file
+    return ioc_dict
+
+
+def get_file_version(file_path: str) -> str:
+    file_stat = os.stat(file_path)
+    return f"{file_stat.st_size:x}-{file_stat.st_mtime_ns:x}"
+
+
+# Set for worker processes that share one copy of the generated artifacts
+SHARED_ARTIFACTS = os.getenv("SHARED_ARTIFACTS") == "1"
+
+
+def build_once(lock_path: str, is_current: Callable[[], bool],
+               build: Callable[[], None]) -> None:
+    import fcntl
+
+    # The first process builds, the others wait and find it current
+    with open(lock_path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if not is_current():
+            build()
+
+
+def get_memory_usage(status_path: str="/proc/self/status"
+                     ) -> Dict[str, float]:
+    # Resident MiB, file backed pages are shared with other workers
+    if not os.path.exists(status_path):
+        return {}
+
+    fields = {"VmRSS": "rss_mb", "VmHWM": "peak_rss_mb", "RssAnon": "anon_mb",
+              "RssFile": "file_mb", "RssShmem": "shmem_mb"}
+    memory_usage = {}
+    with open(status_path) as status_file:
+        for line in status_file:
+            name, _, value = line.partition(":")
+            if name in fields:
+                memory_usage[fields[name]] = round(
+                    int(value.split()[0]) / 1024, 1)
+
+    return memory_usage
+
+
+def release_memory() -> None:
+    # Hands the heap left behind by freed frames back to the system
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
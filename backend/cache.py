@@ -0,0 +1,87 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class PredictionCache:
+    def __init__(self, max_size: int=4096, ttl: Optional[float]=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        # The last version asked for, only reported in the stats
+        self.version: Hashable = None
+
+        self.entries: OrderedDict[Hashable, Tuple[Any, float]] = OrderedDict()
+        self.in_flight: Dict[Hashable, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get_or_compute(self, key: Hashable, version: Hashable,
+                             compute: Callable[[], Awaitable[Any]]) -> Any:
+        # Keyed by serving version, so requests still on the old bundle
+        # during a reload neither read nor evict the new one's entries.
+        # Entries of a retired version age out of the LRU
+        self.version = version
+        key = (version, key)
+
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        task = self.in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self.on_computed(key, done))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        if key not in self.entries:
+            return False, None
+
+        value, expires_at = self.entries[key]
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            self.evictions += 1
+            return False, None
+
+        self.entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        expires_at = (time.monotonic() + self.ttl if self.ttl
+                      else float("inf"))
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def on_computed(self, key: Hashable, task: asyncio.Future) -> None:
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+
+        if task.cancelled() or task.exception() is not None:
+            return None
+
+        self.put(key, task.result())
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits, "misses": self.misses,
+            "coalesced": self.coalesced, "evictions": self.evictions,
+            "size": len(self.entries), "max_size": self.max_size,
+            "hit_rate": (round((self.hits + self.coalesced) / lookups, 4)
+                         if lookups else 0.0),
+            "version": self.version
+        }
@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+import os
+from typing import Dict, Optional, Union
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+RESPONSE_MAX_AGE = int(os.getenv("RESPONSE_MAX_AGE", 60))
+MIN_COMPRESS_SIZE = 1024
+
+# The same serializer FastAPI uses for endpoints returning dict | list
+JSON_ADAPTER = TypeAdapter(Union[dict, list])
+
+
+class EncodedResponse:
+    def __init__(self, content: Union[dict, list]):
+        body = JSON_ADAPTER.dump_json(content)
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+        # Smallest first, so the first accepted variant is the one to send
+        self.variants: Dict[str, bytes] = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body)
+            self.variants["gzip"] = gzip.compress(body, mtime=0)
+        self.variants["identity"] = body
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(body) for body in self.variants.values())
+
+    def get_encoding(self, accept_encoding: Optional[str]) -> str:
+        accepted = get_accepted_encodings(accept_encoding)
+        for encoding in self.variants:
+            if encoding in accepted:
+                return encoding
+
+        return "identity"
+
+    def get_response(self, if_none_match: Optional[str],
+                     accept_encoding: Optional[str],
+                     headers: Optional[Dict[str, str]]=None) -> Response:
+        response_headers = {
+            **(headers or {}),
+            "ETag": self.etag,
+            "Cache-Control": f"public, max-age={RESPONSE_MAX_AGE}",
+            "Vary": "Accept-Encoding",
+        }
+
+        if is_etag_match(if_none_match, self.etag):
+            return Response(status_code=304, headers=response_headers)
+
+        encoding = self.get_encoding(accept_encoding)
+        if encoding != "identity":
+            response_headers["Content-Encoding"] = encoding
+
+        return Response(content=self.variants[encoding],
+                        media_type="application/json",
+                        headers=response_headers)
+
+
+def get_accepted_encodings(accept_encoding: Optional[str]) -> set:
+    accepted = {"identity"}
+    for item in (accept_encoding or "").split(","):
+        encoding, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.discard(encoding.strip().lower())
+        elif encoding:
+            accepted.add(encoding.strip().lower())
+
+    return accepted
+
+
+def is_etag_match(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    # Weak comparison, as If-None-Match requires
+    return any(tag.strip() in ("*", etag, f"W/{etag}")
+               for tag in if_none_match.split(","))
@@ -0,0 +1,223 @@
+from typing import List, Dict, Tuple, Optional, Sequence
+
+import numpy as np
+
+from backend.player_store import PlayerStore
+from backend.schemas import Prediction
+from utils.feature_helpers import SURFACE_NAMES
+
+
+DATE_COLUMNS = ("tourney_year", "tourney_month", "tourney_day")
+
+
+def is_player_diff_column(column: str) -> bool:
+    return "diff" in column and "h2h" not in column
+
+
+class FeaturePlan:
+    def __init__(self, prediction_columns: List[str],
+                 player_store: PlayerStore,
+                 tourney_date: Tuple[int, int, int]):
+        self.prediction_columns = list(prediction_columns)
+        self.width = len(self.prediction_columns)
+        self.template = np.zeros(self.width, dtype=np.float32)
+
+        self.surface_rows = {name: idx for idx, name
+                             in enumerate(SURFACE_NAMES)}
+        self.surface_slots = np.full(len(SURFACE_NAMES), -1, dtype=np.intp)
+        self.entry_slots: Tuple[Dict[str, int], ...] = ({}, {})
+        self.tourney_level_slots: Dict[str, int] = {}
+
+        self.draw_size_slot: Optional[int] = None
+        self.h2h_diff_slot: Optional[int] = None
+        self.surface_h2h_diff_slot: Optional[int] = None
+
+        self.player_columns: List[str] = []
+        self.player_slots: Tuple[List[int], ...] = ([], [])
+        self.player_idx: Tuple[List[int], ...] = ([], [])
+
+        self.diff_slots, self.diff_idx = [], []
+        self.surface_diff_slots, self.surface_diff_columns = [], []
+
+        self.set_slots(tourney_date)
+        self.set_player_tables(player_store)
+
+    def set_slots(self, tourney_date: Tuple[int, int, int]) -> None:
+        for slot, column in enumerate(self.prediction_columns):
+            self.set_slot(slot, column, tourney_date)
+
+        self.player_slots = tuple(np.array(slots, dtype=np.intp)
+                                  for slots in self.player_slots)
+        self.player_idx = tuple(np.array(idx, dtype=np.intp)
+                                for idx in self.player_idx)
+
+        self.diff_slots = np.array(self.diff_slots, dtype=np.intp)
+        self.diff_idx = np.array(self.diff_idx, dtype=np.intp)
+        self.surface_diff_slots = np.array(self.surface_diff_slots,
+                                           dtype=np.intp)
+
+    def set_slot(self, slot: int, column: str,
+                 tourney_date: Tuple[int, int, int]) -> None:
+        if column in DATE_COLUMNS:
+            self.template[slot] = tourney_date[DATE_COLUMNS.index(column)]
+
+        elif column == "draw_size":
+            self.draw_size_slot = slot
+
+        elif column == "h2h_diff":
+            self.h2h_diff_slot = slot
+
+        elif column == "surface_h2h_diff":
+            self.surface_h2h_diff_slot = slot
+
+        elif is_player_diff_column(column) and "surface" in column:
+            self.surface_diff_slots.append(slot)
+            self.surface_diff_columns.append(column)
+
+        elif is_player_diff_column(column):
+            self.diff_slots.append(slot)
+            self.diff_idx.append(
+                self.get_player_column_idx(column.replace("_diff", "")))
+
+        elif column.startswith("surface_"):
+            surface_name = column.replace("surface_", "", 1)
+            if surface_name not in self.surface_rows:
+                raise ValueError(f"Unknown surface column {column}")
+
+            self.surface_slots[self.surface_rows[surface_name]] = slot
+
+        elif column.startswith("tourney_level_"):
+            tourney_level = column.replace("tourney_level_", "", 1)
+            self.tourney_level_slots[tourney_level] = slot
+
+        elif column.startswith(("player_1_", "player_2_")):
+            self.set_player_slot(slot, column)
+
+        else:
+            raise ValueError(f"No feature slot for column {column}")
+
+    def set_player_slot(self, slot: int, column: str) -> None:
+        num = int(column[len("player_")])
+        player_col = column.replace(f"player_{num}_", "", 1)
+
+        if player_col.startswith("entry_"):
+            entry_name = player_col.replace("entry_", "", 1)
+            self.entry_slots[num - 1][entry_name] = slot
+            return None
+
+        self.player_slots[num - 1].append(slot)
+        self.player_idx[num - 1].append(self.get_player_column_idx(player_col))
+
+    def get_player_column_idx(self, player_col: str) -> int:
+        if player_col not in self.player_columns:
+            self.player_columns.append(player_col)
+
+        return self.player_columns.index(player_col)
+
+    def set_player_tables(self, player_store: PlayerStore) -> None:
+        # Only column positions are kept, the values stay in the store
+        # arrays that every worker maps from the same snapshot files
+        self.player_store = player_store
+        self.player_value_idx = np.array(
+            [player_store.get_value_idx(col) for col in self.player_columns],
+            dtype=np.intp)
+
+        self.surface_value_idx = np.array([
+            [player_store.get_surface_value_idx(
+                col.replace("diff", surface_name))
+             for col in self.surface_diff_columns]
+            for surface_name in SURFACE_NAMES
+        ], dtype=np.intp).reshape(len(SURFACE_NAMES), -1)
+
+    def fill(self, prediction: Prediction, h2h_diff: int,
+             surface_h2h_diff: int,
+             out: Optional[np.ndarray]=None) -> np.ndarray:
+        if out is None:
+            out = np.empty(self.width, dtype=np.float32)
+
+        self.fill_matrix([prediction], [h2h_diff], [surface_h2h_diff],
+                         out.reshape(1, -1))
+        return out
+
+    def fill_matrix(self, predictions: Sequence[Prediction],
+                    h2h_diffs: Sequence[int],
+                    surface_h2h_diffs: Sequence[int],
+                    out: Optional[np.ndarray]=None) -> np.ndarray:
+        row_count = len(predictions)
+        if out is None:
+            out = np.empty((row_count, self.width), dtype=np.float32)
+
+        out[:] = self.template
+        rows_1 = self.player_store.get_rows(np.fromiter(
+            (p.player_1_id for p in predictions), np.int64, row_count))
+        rows_2 = self.player_store.get_rows(np.fromiter(
+            (p.player_2_id for p in predictions), np.int64, row_count))
+
+        self.fill_player_values(out, rows_1, rows_2)
+        self.fill_surface_values(out, predictions, rows_1, rows_2)
+        self.fill_categorical_values(out, predictions)
+
+        if self.draw_size_slot is not None:
+            out[:, self.draw_size_slot] = [p.draw_size for p in predictions]
+        if self.h2h_diff_slot is not None:
+            out[:, self.h2h_diff_slot] = h2h_diffs
+        if self.surface_h2h_diff_slot is not None:
+            out[:, self.surface_h2h_diff_slot] = surface_h2h_diffs
+
+        return out
+
+    def fill_player_values(self, out: np.ndarray, rows_1: np.ndarray,
+                           rows_2: np.ndarray) -> None:
+        values_1 = self.player_store.values[rows_1][:, self.player_value_idx]
+        values_2 = self.player_store.values[rows_2][:, self.player_value_idx]
+
+        out[:, self.player_slots[0]] = values_1[:, self.player_idx[0]]
+        out[:, self.player_slots[1]] = values_2[:, self.player_idx[1]]
+        out[:, self.diff_slots] = (values_1[:, self.diff_idx]
+                                   - values_2[:, self.diff_idx])
+
+    def fill_surface_values(self, out: np.ndarray,
+                            predictions: Sequence[Prediction],
+                            rows_1: np.ndarray, rows_2: np.ndarray) -> None:
+        surface_idx = np.fromiter(
+            (self.surface_rows.get(p.surface.capitalize(), -1)
+             for p in predictions), np.intp, len(predictions)
+        )
+        known = np.flatnonzero(surface_idx >= 0)
+        surface_idx = surface_idx[known]
+
+        surface_slots = self.surface_slots[surface_idx]
+        has_slot = surface_slots >= 0
+        out[known[has_slot], surface_slots[has_slot]] = 1
+
+        surface_value_idx = self.surface_value_idx[surface_idx]
+        out[np.ix_(known, self.surface_diff_slots)] = (
+            self.get_surface_values(rows_1[known], surface_idx,
+                                    surface_value_idx)
+            - self.get_surface_values(rows_2[known], surface_idx,
+                                      surface_value_idx)
+        )
+
+    def get_surface_values(self, rows: np.ndarray, surface_idx: np.ndarray,
+                           surface_value_idx: np.ndarray) -> np.ndarray:
+        # Players never seen on the surface get 0, the value the
+        # prediction columns always used for a missing surface attribute
+        player_store = self.player_store
+        values = np.take_along_axis(
+            player_store.surface_values[rows, surface_idx],
+            np.maximum(surface_value_idx, 0), axis=1)
+        seen = player_store.surface_seen[rows, surface_idx]
+
+        return np.where(seen[:, None] & (surface_value_idx >= 0), values, 0.0)
+
+    def fill_categorical_values(self, out: np.ndarray,
+                                predictions: Sequence[Prediction]) -> None:
+        for row, prediction in enumerate(predictions):
+            slots = (
+                self.entry_slots[0].get(prediction.player_1_entry),
+                self.entry_slots[1].get(prediction.player_2_entry),
+                self.tourney_level_slots.get(prediction.tourney_level)
+            )
+            for slot in slots:
+                if slot is not None:
+                    out[row, slot] = 1
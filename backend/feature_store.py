@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+
+import numpy as np
+
+from backend.h2h_store import HeadToHeadStore
+from backend.player_store import PlayerStore
+from utils.feature_helpers import SURFACE_NAMES
+from utils.logger import get_logger
+from config import ROOT_DIR
+
+logger = get_logger("backend.feature_store")
+
+FEATURE_STORE_DIR = f"{ROOT_DIR}/data/feature_store"
+FEATURE_STORE_FORMAT = 6
+
+
+def get_feature_store_arrays(storage) -> dict:
+    player_store = storage.player_store
+    h2h_store = storage.h2h_store
+    # Only players that can be served need a country code
+    ioc_items = [(id, storage.ioc_dict[id]) for id in player_store
+                 if isinstance(storage.ioc_dict.get(id), str)]
+
+    return {
+        "player_ids": player_store.player_ids,
+        "players": player_store.records,
+        "player_surface_values": player_store.surface_values,
+        "player_surface_seen": player_store.surface_seen,
+        "h2h_pair_keys": h2h_store.pair_keys,
+        "h2h_counts": h2h_store.counts,
+        "surface_h2h_counts": h2h_store.surface_counts,
+        "h2h_match_offsets": h2h_store.match_offsets,
+        "h2h_matches": h2h_store.matches,
+        "ioc_ids": np.array([id for id, _ in ioc_items], dtype=np.int64),
+        "ioc_codes": np.array([ioc for _, ioc in ioc_items], dtype=str),
+        "sorted_player_ids": np.array(storage.sorted_player_ids,
+                                      dtype=np.int64),
+    }
+
+
+def get_snapshot_version(storage) -> str:
+    # prediction_columns come from the model, so a new model file needs a
+    # new snapshot as much as a new csv does
+    return f"{storage.data_version}_{storage.model_version}"
+
+
+def remove_old_snapshots(store_dir: str, keep: List[str]) -> None:
+    # The previous snapshot stays for processes that read the old pointer
+    # but have not mapped its files yet
+    versions_dir = os.path.join(store_dir, "versions")
+    for directory in os.listdir(versions_dir):
+        if directory not in keep:
+            shutil.rmtree(os.path.join(versions_dir, directory),
+                          ignore_errors=True)
+
+
+def save_feature_store(storage, store_dir: str=FEATURE_STORE_DIR) -> None:
+    versions_dir = os.path.join(store_dir, "versions")
+    os.makedirs(versions_dir, exist_ok=True)
+    previous_manifest = read_feature_store_manifest(store_dir)
+
+    # Every snapshot gets a directory of its own, readers only find it
+    # through the manifest, which is swapped in once all arrays are written
+    version = get_snapshot_version(storage)
+    snapshot_dir = tempfile.mkdtemp(prefix=f"{version}-", dir=versions_dir)
+    arrays = get_feature_store_arrays(storage)
+    for name, array in arrays.items():
+        np.save(os.path.join(snapshot_dir, f"{name}.npy"), array,
+                allow_pickle=False)
+
+    manifest = {
+        "format": FEATURE_STORE_FORMAT,
+        "version": version,
+        "directory": os.path.basename(snapshot_dir),
+        "data_version": storage.data_version,
+        "model_version": storage.model_version,
+        "prediction_columns": storage.prediction_columns,
+        "player_columns": storage.player_columns,
+        "player_column_types": {
+            col: column_type.str
+            for col, column_type in storage.player_store.column_types.items()
+        },
+        "player_surface_columns": storage.player_surface_columns,
+        "surface_names": SURFACE_NAMES,
+        "arrays": sorted(arrays),
+    }
+    manifest_path = os.path.join(store_dir, "manifest.json")
+    with open(f"{manifest_path}.tmp", "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    remove_old_snapshots(store_dir, [
+        manifest["directory"],
+        *([previous_manifest["directory"]] if previous_manifest else [])
+    ])
+    logger.info("Saved feature store snapshot %s of %s players to %s",
+                version, len(arrays["players"]), snapshot_dir)
+
+
+def read_feature_store_manifest(store_dir: str=FEATURE_STORE_DIR
+                                ) -> Optional[dict]:
+    manifest_path = os.path.join(store_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    if manifest.get("format") != FEATURE_STORE_FORMAT:
+        logger.warning("Ignoring feature store snapshot with format %s",
+                       manifest.get("format"))
+        return None
+
+    return manifest
+
+
+def load_feature_store(store_dir: str=FEATURE_STORE_DIR) -> dict:
+    manifest = read_feature_store_manifest(store_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No feature store snapshot in {store_dir}")
+
+    snapshot_dir = os.path.join(store_dir, "versions",
+                                manifest["directory"])
+    arrays = {
+        name: np.load(os.path.join(snapshot_dir, f"{name}.npy"),
+                      mmap_mode="r", allow_pickle=False)
+        for name in manifest["arrays"]
+    }
+
+    return {
+        "prediction_columns": manifest["prediction_columns"],
+        "player_columns": manifest["player_columns"],
+        "player_surface_columns": manifest["player_surface_columns"],
+        "player_store": PlayerStore(
+            arrays["player_ids"], arrays["players"],
+            manifest["player_column_types"],
+            manifest["player_surface_columns"],
+            arrays["player_surface_values"], arrays["player_surface_seen"]
+        ),
+        "h2h_store": HeadToHeadStore(
+            arrays["h2h_pair_keys"], arrays["h2h_counts"],
+            arrays["surface_h2h_counts"], arrays["h2h_match_offsets"],
+            arrays["h2h_matches"]
+        ),
+        "ioc_dict": dict(zip(arrays["ioc_ids"].tolist(),
+                             arrays["ioc_codes"].tolist())),
+        "sorted_player_ids": arrays["sorted_player_ids"].tolist(),
+        "data_version": manifest["data_version"],
+        "model_version": manifest["model_version"],
+    }
+
+
+if __name__ == '__main__':
+    from backend.storage import get_csv_storage
+
+    save_feature_store(get_csv_storage())
@@ -0,0 +1,162 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.backend_utils import get_surface_idx_column
+from utils.feature_helpers import SURFACE_NAMES
+
+
+# What a head to head match resolves to without the csv it came from,
+# dates as YYYYMMDD
+H2H_MATCH_DTYPE = np.dtype([("date", np.int32), ("winner_id", np.int32),
+                            ("surface_idx", np.int8)])
+
+def get_pair_keys(player_1_ids: np.ndarray,
+                  player_2_ids: np.ndarray) -> np.ndarray:
+    # Canonical key: lower id in the high 32 bits, higher id in the low ones
+    player_1_ids = np.asarray(player_1_ids, dtype=np.int64)
+    player_2_ids = np.asarray(player_2_ids, dtype=np.int64)
+    return ((np.minimum(player_1_ids, player_2_ids) << 32)
+            | np.maximum(player_1_ids, player_2_ids))
+
+
+class HeadToHeadStore:
+    def __init__(self, pair_keys: np.ndarray, counts: np.ndarray,
+                 surface_counts: np.ndarray, match_offsets: np.ndarray,
+                 matches: np.ndarray):
+        # counts[pair] = [wins of the lower id, wins of the higher id]
+        self.pair_keys = pair_keys
+        self.counts = counts
+        self.surface_counts = surface_counts
+
+        # Matches of pair i are matches[offsets[i]:offsets[i + 1]], oldest
+        # first
+        self.match_offsets = match_offsets
+        self.matches = matches
+
+    def __len__(self) -> int:
+        return len(self.pair_keys)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (
+            self.pair_keys, self.counts, self.surface_counts,
+            self.match_offsets, self.matches
+        ))
+
+    def get_pair_idx(self, player_1_ids: np.ndarray,
+                     player_2_ids: np.ndarray
+                     ) -> Tuple[np.ndarray, np.ndarray]:
+        keys = get_pair_keys(player_1_ids, player_2_ids)
+        if not len(self):
+            return (np.zeros(keys.shape, dtype=np.intp),
+                    np.zeros(keys.shape, dtype=bool))
+
+        pair_idx = np.searchsorted(self.pair_keys, keys)
+        pair_idx[pair_idx == len(self)] = 0
+        return pair_idx, self.pair_keys[pair_idx] == keys
+
+    def get_diffs(self, player_1_ids: np.ndarray, player_2_ids: np.ndarray,
+                  surface_idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        player_1_ids = np.asarray(player_1_ids, dtype=np.int64)
+        player_2_ids = np.asarray(player_2_ids, dtype=np.int64)
+        pair_idx, found = self.get_pair_idx(player_1_ids, player_2_ids)
+
+        # Counts are kept from the lower id's side
+        sign = np.where(player_1_ids < player_2_ids, 1, -1) * found
+        counts = self.counts[pair_idx]
+        surface_counts = self.surface_counts[pair_idx, surface_idx]
+
+        h2h_diffs = sign * (counts[:, 0] - counts[:, 1])
+        surface_h2h_diffs = sign * (surface_counts[:, 0]
+                                    - surface_counts[:, 1])
+        return h2h_diffs, surface_h2h_diffs
+
+    def get_diff(self, player_1_id: int, player_2_id: int,
+                 surface_idx: int) -> Tuple[int, int]:
+        h2h_diffs, surface_h2h_diffs = self.get_diffs(
+            [player_1_id], [player_2_id], [surface_idx])
+        return int(h2h_diffs[0]), int(surface_h2h_diffs[0])
+
+    def get_matches(self, player_1_id: int, player_2_id: int) -> np.ndarray:
+        pair_idx, found = self.get_pair_idx([player_1_id], [player_2_id])
+        if not found[0]:
+            return self.matches[:0]
+
+        start, end = self.match_offsets[pair_idx[0]:pair_idx[0] + 2]
+        return self.matches[start:end]
+
+
+def get_h2h_store(df: pd.DataFrame) -> HeadToHeadStore:
+    player_1_ids = df["player_1_id"].to_numpy(dtype=np.int64)
+    player_2_ids = df["player_2_id"].to_numpy(dtype=np.int64)
+    player_1_won = df["player_1_won"].to_numpy(dtype=bool)
+
+    pair_keys, pair_idx = np.unique(get_pair_keys(player_1_ids, player_2_ids),
+                                    return_inverse=True)
+    pair_idx = pair_idx.ravel()
+    pair_count = len(pair_keys)
+
+    winner_ids = np.where(player_1_won, player_1_ids, player_2_ids)
+    winner_side = (winner_ids != np.minimum(player_1_ids, player_2_ids))
+    winner_side = winner_side.astype(np.intp)
+
+    counts = np.bincount(pair_idx * 2 + winner_side,
+                         minlength=pair_count * 2).reshape(pair_count, 2)
+
+    surface_count = len(SURFACE_NAMES)
+    surface_idx = get_surface_idx_column(df)
+    surface_slots = (pair_idx * surface_count
+                     + surface_idx) * 2 + winner_side
+    surface_counts = np.bincount(
+        surface_slots, minlength=pair_count * surface_count * 2
+    ).reshape(pair_count, surface_count, 2)
+
+    match_offsets = np.zeros(pair_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pair_idx, minlength=pair_count),
+              out=match_offsets[1:])
+    dates = (df["tourney_year"].to_numpy(dtype=np.int32) * 10000
+             + df["tourney_month"].to_numpy(dtype=np.int32) * 100
+             + df["tourney_day"].to_numpy(dtype=np.int32))
+    match_order = np.lexsort((dates, pair_idx))
+
+    matches = np.empty(len(df), dtype=H2H_MATCH_DTYPE)
+    matches["date"] = dates[match_order]
+    matches["winner_id"] = winner_ids[match_order]
+    matches["surface_idx"] = surface_idx[match_order]
+
+    return HeadToHeadStore(pair_keys, counts.astype(np.int32),
+                           surface_counts.astype(np.int32), match_offsets,
+                           matches)
+
+
+
+if __name__ == '__main__':
+    import sys
+    from time import perf_counter
+
+    from utils.dataframe import read_final_csv
+    from utils.feature_helpers import MatchHistory
+
+    boosting_df = read_final_csv("boosting_model")
+
+    # The feature engineering pass keeps the same wins in dicts
+    start = perf_counter()
+    match_history = MatchHistory(boosting_df, ())
+    match_history.get_counts()
+    h2h_dict = match_history.h2h_won
+    surface_h2h_dict = match_history.surface_h2h_won
+    dict_time = perf_counter() - start
+
+    start = perf_counter()
+    h2h_store = get_h2h_store(boosting_df)
+    store_time = perf_counter() - start
+
+    dict_bytes = sys.getsizeof(h2h_dict) + sys.getsizeof(surface_h2h_dict)
+    for key in (*h2h_dict, *surface_h2h_dict):
+        dict_bytes += sys.getsizeof(key)
+
+    print(f"{len(h2h_store)} pairs: dicts {dict_time * 1000:.0f} ms / "
+          f"{dict_bytes / 2 ** 20:.2f} MiB, store {store_time * 1000:.0f} ms"
+          f" / {h2h_store.nbytes / 2 ** 20:.2f} MiB")
@@ -0,0 +1,90 @@
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from backend.feature_plan import FeaturePlan
+from backend.metrics import timed
+from backend.model_registry import DEFAULT_MODEL, ModelRegistry
+from backend.schemas import Prediction
+from backend.storage import Storage
+from utils.feature_helpers import get_surface_idx_by_name
+from utils.logger import get_logger
+
+
+TOURNEY_YEAR = 2024
+TOURNEY_MONTH = 12
+TOURNEY_DAY = 15
+
+logger = get_logger("backend.inference")
+
+
+class Predictor:
+    def __init__(self, registry: ModelRegistry, storage: Storage):
+        self.registry = registry
+        self.model_version = registry.versions.get(DEFAULT_MODEL)
+        self.storage = storage
+
+        self.feature_plan = FeaturePlan(
+            storage.prediction_columns, storage.player_store,
+            (TOURNEY_YEAR, TOURNEY_MONTH, TOURNEY_DAY)
+        )
+
+    def get_head_to_head_diffs(self, predictions: List[Prediction]
+                               ) -> Tuple[np.ndarray, np.ndarray]:
+        return self.storage.h2h_store.get_diffs(
+            [prediction.player_1_id for prediction in predictions],
+            [prediction.player_2_id for prediction in predictions],
+            [get_surface_idx_by_name(prediction.surface)
+             for prediction in predictions]
+        )
+
+    def get_prediction_matrix(self,
+                              predictions: List[Prediction]) -> np.ndarray:
+        with timed("h2h"):
+            h2h_diffs, surface_h2h_diffs = self.get_head_to_head_diffs(
+                predictions)
+        with timed("features"):
+            return self.feature_plan.fill_matrix(predictions, h2h_diffs,
+                                                 surface_h2h_diffs)
+
+    def get_prediction_array(self, prediction: Prediction) -> np.ndarray:
+        return self.get_prediction_matrix([prediction])
+
+    def predict_proba(self, prediction_matrix: np.ndarray,
+                      model_name: str=DEFAULT_MODEL) -> np.ndarray:
+        return self.registry.predict_proba(model_name, prediction_matrix)
+
+
+def load_predictor(storage: Storage,
+                   preload: Iterable[str]=(DEFAULT_MODEL,)) -> Predictor:
+    registry = ModelRegistry(storage.prediction_columns)
+    for model_name in preload:
+        registry.load(model_name)
+
+    return Predictor(registry, storage)
+
+
+def get_model_output(probabilities: np.ndarray) -> Tuple[int, float]:
+    player_1_won = probabilities[0][1] > 0.5
+    logger.debug("Raw Player 1 Won Prediction: %s", player_1_won)
+
+    confidence_score = np.max(probabilities[0])
+    logger.debug("Raw Confidence Score: %s", confidence_score)
+
+    winner_player = 1 if player_1_won else 2
+    confidence_percent = round(float(confidence_score) * 100, 2)
+    logger.debug("Model Prediction: Player %s wins with %s%% confidence",
+                 winner_player, confidence_percent)
+
+    return winner_player, confidence_percent
+
+
+def get_batch_model_output(probabilities: np.ndarray
+                           ) -> List[Tuple[int, float]]:
+    player_1_won = probabilities[:, 1] > 0.5
+    confidence_scores = np.max(probabilities, axis=1)
+
+    return [
+        (1 if won else 2, round(float(confidence) * 100, 2))
+        for won, confidence in zip(player_1_won, confidence_scores)
+    ]
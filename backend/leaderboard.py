@@ -0,0 +1,109 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from backend.player_store import PlayerStore
+
+
+HANDS = ("left", "right", "both")
+
+
+class Leaderboard:
+    def __init__(self, player_store: PlayerStore, ioc_dict: dict):
+        self.player_store = player_store
+        self.iocs = np.array([ioc if isinstance(ioc, str) else "Unknown"
+                              for ioc in (ioc_dict.get(id, "Unknown")
+                                          for id in player_store)],
+                             dtype=str)
+
+        # Every sort permutation is built with the serving bundle, so no
+        # request pays for an argsort
+        self.orders: Dict[Tuple[str, bool], np.ndarray] = {}
+        self.set_orders()
+
+    def set_orders(self) -> None:
+        player_store = self.player_store
+        for stat in (*player_store.value_idx,
+                     *player_store.surface_attributes):
+            values, has_value = self.get_stat_values(stat)
+            for descending in (True, False):
+                keys = -values if descending else values
+                order = np.argsort(keys, kind="stable")
+                self.orders[(stat, descending)] = (
+                    order[has_value[order]].astype(np.int32))
+
+    def is_stat(self, stat: str) -> bool:
+        return (stat in self.player_store.value_idx
+                or stat in self.player_store.surface_attributes)
+
+    def get_stat_values(self, stat: str) -> Tuple[np.ndarray, np.ndarray]:
+        # Values and the rows that have one, a surface stat only exists
+        # for players seen on that surface
+        player_store = self.player_store
+        if stat in player_store.value_idx:
+            values = player_store.values[:, player_store.value_idx[stat]]
+            return values, ~np.isnan(values)
+
+        surface_idx, col_idx = player_store.surface_attributes[stat]
+        return (player_store.surface_values[:, surface_idx, col_idx],
+                np.asarray(player_store.surface_seen[:, surface_idx]))
+
+    def get_order(self, stat: str, descending: bool=True) -> np.ndarray:
+        return self.orders[(stat, descending)]
+
+    def get_mask(self, ioc: Optional[str]=None, hand: Optional[str]=None,
+                 min_matches: int=0) -> Optional[np.ndarray]:
+        player_store = self.player_store
+        masks = []
+
+        if ioc:
+            masks.append(self.iocs == ioc.upper())
+
+        if hand:
+            hand_l = player_store.column("hand_L").astype(bool)
+            hand_r = player_store.column("hand_R").astype(bool)
+            # Same rules as get_player_hand_text
+            masks.append({"both": hand_l & hand_r,
+                          "left": hand_l & ~hand_r,
+                          "right": ~hand_l}[hand])
+
+        if min_matches > 0:
+            masks.append(player_store.column("total_match") >= min_matches)
+
+        return np.logical_and.reduce(masks) if masks else None
+
+    def get_rows(self, stat: str, descending: bool=True,
+                 ioc: Optional[str]=None, hand: Optional[str]=None,
+                 min_matches: int=0) -> np.ndarray:
+        order = self.get_order(stat, descending)
+        mask = self.get_mask(ioc, hand, min_matches)
+        if mask is None:
+            return order
+
+        return order[mask[order]]
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+
+    from backend.storage import load_storage
+
+    storage = load_storage()
+    start = perf_counter()
+    leaderboard = Leaderboard(storage.player_store, storage.ioc_dict)
+    order_bytes = sum(order.nbytes for order in leaderboard.orders.values())
+    print(f"{len(leaderboard.orders)} sort orders in "
+          f"{(perf_counter() - start) * 1000:.0f} ms, "
+          f"{order_bytes / 2 ** 20:.2f} MiB")
+    names = storage.player_store.column("name")
+
+    for stat, kwargs in (("elo", {}), ("win_ratio", {"min_matches": 50}),
+                         ("elo_surface_Clay", {"hand": "left"})):
+        leaderboard.get_rows(stat, **kwargs)
+        start = perf_counter()
+        for _ in range(100):
+            rows = leaderboard.get_rows(stat, **kwargs)
+        elapsed = (perf_counter() - start) / 100
+
+        print(f"{stat} {kwargs}: {len(rows)} players in "
+              f"{elapsed * 1e6:.0f} us, top {names[rows[:3]].tolist()}")
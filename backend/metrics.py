@@ -0,0 +1,366 @@
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # The last count is the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts = [count + other_count for count, other_count
+                       in zip(self.counts, other.counts)]
+        self.total += other.total
+
+
+class MetricsShard:
+    # Series updated by a single thread, so requests never wait on a lock;
+    # the shards are merged when /metrics is scraped
+    def __init__(self, metrics: "Metrics"):
+        self.metrics = metrics
+        self.counters: Dict[str, Dict[Labels, float]] = {
+            name: {} for name in metrics.counter_names}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {
+            name: {} for name in metrics.buckets}
+        self.endpoint_series: Dict[str, EndpointSeries] = {}
+
+    def record(self, counts: List[Tuple[str, Labels, float]],
+               observations: List[Tuple[str, Labels, float]]) -> None:
+        for name, labels, amount in counts:
+            counter = self.counters[name]
+            counter[labels] = counter.get(labels, 0) + amount
+
+        for name, labels, value in observations:
+            self.get_histogram(name, labels).observe(value)
+
+    def get_histogram(self, name: str, labels: Labels) -> Histogram:
+        histogram = self.histograms[name].get(labels)
+        if histogram is None:
+            histogram = Histogram(self.metrics.buckets[name])
+            self.histograms[name][labels] = histogram
+
+        return histogram
+
+    def get_endpoint_series(self, endpoint: str) -> "EndpointSeries":
+        series = self.endpoint_series.get(endpoint)
+        if series is None:
+            series = EndpointSeries(self, endpoint)
+            self.endpoint_series[endpoint] = series
+
+        return series
+
+
+class Metrics:
+    def __init__(self):
+        # Only taken to add a shard and to scrape, never per request
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.shards: List[MetricsShard] = []
+
+        self.counter_names: List[str] = []
+        self.buckets: Dict[str, Tuple[float, ...]] = {}
+        self.help: Dict[str, str] = {}
+
+        # Gauges read at scrape time, e.g. the prediction cache counters
+        self.collectors: List[Callable[[], Dict[str, float]]] = []
+        self.gauge_help: Dict[str, str] = {}
+
+    def add_counter(self, name: str, help_text: str) -> None:
+        self.counter_names.append(name)
+        self.help[name] = help_text
+
+    def add_histogram(self, name: str, help_text: str,
+                      buckets: Tuple[float, ...]=LATENCY_BUCKETS) -> None:
+        self.buckets[name] = buckets
+        self.help[name] = help_text
+
+    def add_collector(self, collect: Callable[[], Dict[str, float]],
+                      help_texts: Dict[str, str]) -> None:
+        # One help text for every gauge the collector returns
+        self.collectors.append(collect)
+        self.gauge_help.update(help_texts)
+
+    def get_shard(self) -> MetricsShard:
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = MetricsShard(self)
+            with self.lock:
+                self.shards.append(shard)
+
+            return shard
+
+    def record(self, counts: List[Tuple[str, Labels, float]],
+               observations: List[Tuple[str, Labels, float]]) -> None:
+        self.get_shard().record(counts, observations)
+
+    def get_merged(self) -> Tuple[Dict[str, Dict[Labels, float]],
+                                  Dict[str, Dict[Labels, Histogram]]]:
+        counters = {name: {} for name in self.counter_names}
+        histograms = {name: {} for name in self.buckets}
+        with self.lock:
+            shards = list(self.shards)
+
+        for shard in shards:
+            for name, shard_counter in shard.counters.items():
+                counter = counters[name]
+                # Copied first, the owning thread may add a series meanwhile
+                for labels, value in list(shard_counter.items()):
+                    counter[labels] = counter.get(labels, 0) + value
+
+            for name, shard_histograms in shard.histograms.items():
+                merged = histograms[name]
+                for labels, histogram in list(shard_histograms.items()):
+                    if labels not in merged:
+                        merged[labels] = Histogram(self.buckets[name])
+                    merged[labels].merge(histogram)
+
+        return counters, histograms
+
+    def render(self) -> str:
+        counters, histograms = self.get_merged()
+
+        lines = []
+        for name, counter in counters.items():
+            lines += [f"# HELP {name} {self.help[name]}",
+                      f"# TYPE {name} counter"]
+            lines += [f"{name}{format_labels(labels)} {value}"
+                      for labels, value in counter.items()]
+
+        for name, name_histograms in histograms.items():
+            lines += [f"# HELP {name} {self.help[name]}",
+                      f"# TYPE {name} histogram"]
+            for labels, histogram in name_histograms.items():
+                lines += get_histogram_lines(name, labels, histogram)
+
+        for collect in self.collectors:
+            for name, value in collect().items():
+                lines += [f"# HELP {name} {self.gauge_help[name]}",
+                          f"# TYPE {name} gauge", f"{name} {value}"]
+
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def get_histogram_lines(name: str, labels: Labels,
+                        histogram: Histogram) -> List[str]:
+    lines = []
+    cumulative = np.cumsum(histogram.counts).tolist()
+    for bucket, count in zip((*histogram.buckets, "+Inf"), cumulative):
+        bucket_labels = format_labels((*labels, ("le", str(bucket))))
+        lines.append(f"{name}_bucket{bucket_labels} {count}")
+
+    lines += [f"{name}_sum{format_labels(labels)} {histogram.total}",
+              f"{name}_count{format_labels(labels)} {cumulative[-1]}"]
+    return lines
+
+
+METRICS = Metrics()
+METRICS.add_counter("api_requests_total", "Requests by endpoint and status")
+METRICS.add_histogram("api_request_duration_seconds",
+                      "Request time by endpoint")
+METRICS.add_histogram("api_stage_duration_seconds",
+                      "Time spent in each request stage")
+METRICS.add_counter("model_calls_total", "Model predict_proba calls")
+METRICS.add_counter("model_rows_total", "Rows scored by each model")
+METRICS.add_histogram("model_batch_rows", "Rows per model call",
+                      BATCH_SIZE_BUCKETS)
+METRICS.add_histogram("model_call_duration_seconds",
+                      "Time of each model predict_proba call")
+
+# Stage timings of the current request, None outside of one
+REQUEST_STAGES: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_stages", default=None)
+
+
+class StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "StageTimer":
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        stages = REQUEST_STAGES.get()
+        if stages is not None:
+            stages.append((self.stage, perf_counter() - self.start))
+
+
+timed = StageTimer
+
+
+def get_model_call(model_name: str, predict_proba: Callable
+                   ) -> Callable[[np.ndarray], np.ndarray]:
+    labels = (("model", model_name),)
+
+    def model_call(prediction_matrix: np.ndarray) -> np.ndarray:
+        start = perf_counter()
+        probabilities = predict_proba(prediction_matrix)
+        elapsed = perf_counter() - start
+
+        row_count = len(prediction_matrix)
+        METRICS.record(
+            [("model_calls_total", labels, 1),
+             ("model_rows_total", labels, row_count)],
+            [("model_call_duration_seconds", labels, elapsed),
+             ("model_batch_rows", labels, row_count)]
+        )
+
+        return probabilities
+
+    return model_call
+
+
+def get_server_timing(stages: List[Tuple[str, float]],
+                      total: float) -> bytes:
+    # A single %-format over all the stages, formatting each one on its own
+    # costs more than the rest of the instrumentation
+    values = []
+    for stage, elapsed in stages:
+        values += (stage, elapsed * 1000)
+    values.append(total * 1000)
+
+    header = "%s;dur=%.3f, " * len(stages) + "total;dur=%.3f"
+    return (header % tuple(values)).encode()
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = perf_counter()
+        stages: List[Tuple[str, float]] = []
+        token = REQUEST_STAGES.set(stages)
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"server-timing",
+                     get_server_timing(stages, perf_counter() - start))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            REQUEST_STAGES.reset(token)
+            record_request(scope, status[0], perf_counter() - start, stages)
+
+
+class EndpointSeries:
+    # Histograms and counters of one endpoint in one shard, looked up once
+    # so a request only pays for the observations
+    def __init__(self, shard: MetricsShard, endpoint: str):
+        self.shard = shard
+        self.labels = (("endpoint", endpoint),)
+        self.requests = shard.counters["api_requests_total"]
+        self.request_labels: Dict[int, Labels] = {}
+        self.request_histogram = shard.get_histogram(
+            "api_request_duration_seconds", self.labels)
+        self.stage_histograms: Dict[str, Histogram] = {}
+
+    def get_request_labels(self, status: int) -> Labels:
+        labels = self.request_labels.get(status)
+        if labels is None:
+            labels = (*self.labels, ("status", str(status)))
+            self.request_labels[status] = labels
+
+        return labels
+
+    def get_stage_histogram(self, stage: str) -> Histogram:
+        histogram = self.stage_histograms.get(stage)
+        if histogram is None:
+            histogram = self.shard.get_histogram(
+                "api_stage_duration_seconds", (*self.labels, ("stage", stage)))
+            self.stage_histograms[stage] = histogram
+
+        return histogram
+
+
+def record_request(scope: dict, status: int, elapsed: float,
+                   stages: List[Tuple[str, float]]) -> None:
+    # Route templates keep the label count bounded, /players/{player_id}
+    # rather than one series per player
+    endpoint = getattr(scope.get("route"), "path", "unmatched")
+    series = METRICS.get_shard().get_endpoint_series(endpoint)
+
+    request_labels = series.get_request_labels(status)
+    series.requests[request_labels] = series.requests.get(request_labels,
+                                                          0) + 1
+
+    series.request_histogram.observe(elapsed)
+    for stage, stage_elapsed in stages:
+        series.get_stage_histogram(stage).observe(stage_elapsed)
+
+
+if __name__ == '__main__':
+    iterations = 20000
+    scope = {"route": type("Route", (), {"path": "/prediction"})()}
+
+    def run_requests() -> None:
+        for _ in range(iterations):
+            stages = []
+            token = REQUEST_STAGES.set(stages)
+            request_start = perf_counter()
+            for stage in ("h2h", "features", "inference", "output"):
+                with timed(stage):
+                    pass
+            get_server_timing(stages, perf_counter() - request_start)
+            REQUEST_STAGES.reset(token)
+            record_request(scope, 200, perf_counter() - request_start,
+                           stages)
+
+    # Best of a few runs, the slower ones measure the rest of the machine
+    timings = []
+    for _ in range(5):
+        start = perf_counter()
+        run_requests()
+        timings.append((perf_counter() - start) / iterations)
+
+    print(f"{min(timings) * 1e6:.2f} us of instrumentation per request "
+          f"with 4 stages")
+
+    threads = [threading.Thread(target=run_requests) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    counters, _ = METRICS.get_merged()
+    request_count = sum(counters["api_requests_total"].values())
+    print(f"{request_count} requests recorded over {len(METRICS.shards)} "
+          f"shards, {9 * iterations} expected")
@@ -0,0 +1,218 @@
+import os
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.backend_utils import get_file_version, SHARED_ARTIFACTS
+from backend.oblivious_trees import (
+    ensure_tree_bundle,
+    is_tree_bundle_current,
+    load_oblivious_tree_model,
+    read_bundle_version,
+)
+from utils.logger import get_logger
+from config import ROOT_DIR
+
+logger = get_logger("backend.model_registry")
+
+MODEL_DIR = f"{ROOT_DIR}/models"
+MODEL_PATHS = {
+    "catboost": f"{MODEL_DIR}/catboost_model.cbm",
+    "xgboost": f"{MODEL_DIR}/xgboost.json",
+    "random_forest": f"{MODEL_DIR}/random_forest.joblib",
+}
+DEFAULT_MODEL = "catboost"
+ENSEMBLE = "ensemble"
+MODEL_CHOICES = (*MODEL_PATHS, ENSEMBLE)
+
+
+def get_ensemble_weights(weights_text: Optional[str]=None
+                         ) -> Dict[str, float]:
+    # "catboost=2,xgboost=1,random_forest=1", equal weights by default
+    if not weights_text:
+        return {name: 1.0 for name in MODEL_PATHS}
+
+    weights = {}
+    for item in weights_text.split(","):
+        name, weight = item.split("=")
+        weights[name.strip()] = float(weight)
+
+    return weights
+
+
+ENSEMBLE_WEIGHTS = get_ensemble_weights(os.getenv("ENSEMBLE_WEIGHTS"))
+CATBOOST_EVALUATOR = os.getenv("CATBOOST_EVALUATOR", "numpy")
+
+# Shared by every registry, a pool per registry kept its threads alive
+# after each hot reload
+ENSEMBLE_EXECUTOR = ThreadPoolExecutor(max_workers=len(MODEL_PATHS),
+                                       thread_name_prefix="ensemble")
+
+
+def check_model_file(model_path: str) -> None:
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file {model_path} not found")
+
+
+def load_catboost(model_path: str) -> Tuple[Any, List[str]]:
+    if CATBOOST_EVALUATOR == "numpy" and SHARED_ARTIFACTS:
+        ensure_tree_bundle(model_path)
+
+    if CATBOOST_EVALUATOR == "numpy" and is_tree_bundle_current(model_path):
+        model = load_oblivious_tree_model()
+        return model, model.feature_names_
+
+    from catboost import CatBoostClassifier
+
+    check_model_file(model_path)
+
+    model = CatBoostClassifier()
+    model.load_model(model_path)
+    return model, list(model.feature_names_ or [])
+
+
+def load_xgboost(model_path: str) -> Tuple[Any, List[str]]:
+    from xgboost import XGBClassifier
+
+    check_model_file(model_path)
+
+    model = XGBClassifier()
+    model.load_model(model_path)
+    return model, list(model.get_booster().feature_names or [])
+
+
+def load_random_forest(model_path: str) -> Tuple[Any, List[str]]:
+    import joblib
+
+    check_model_file(model_path)
+    # Fitted on a DataFrame, scored on the plain feature matrix
+    warnings.filterwarnings("ignore", message="X does not have valid "
+                                              "feature names")
+    model = joblib.load(model_path)
+    return model, list(getattr(model, "feature_names_in_", []))
+
+
+MODEL_LOADERS: Dict[str, Callable[[str], Tuple[Any, List[str]]]] = {
+    "catboost": load_catboost,
+    "xgboost": load_xgboost,
+    "random_forest": load_random_forest,
+}
+
+
+class ModelRegistry:
+    def __init__(self, prediction_columns: List[str],
+                 model_paths: Dict[str, str]=MODEL_PATHS,
+                 ensemble_weights: Dict[str, float]=ENSEMBLE_WEIGHTS):
+        self.prediction_columns = list(prediction_columns)
+        self.model_paths = model_paths
+        self.ensemble_weights = {name: weight for name, weight
+                                 in ensemble_weights.items()
+                                 if name in model_paths and weight > 0}
+
+        self.versions = get_model_versions(model_paths)
+        self.version = tuple(sorted(self.versions.items()))
+
+        self.models: Dict[str, Any] = {}
+        self.load_lock = threading.Lock()
+
+    def get_model_names(self, model_name: str) -> List[str]:
+        if model_name == ENSEMBLE:
+            return list(self.ensemble_weights)
+
+        if model_name not in self.model_paths:
+            raise ValueError(f"Unknown model {model_name}")
+
+        return [model_name]
+
+    def is_loaded(self, model_name: str) -> bool:
+        return all(name in self.models
+                   for name in self.get_model_names(model_name))
+
+    def load(self, model_name: str) -> None:
+        for name in self.get_model_names(model_name):
+            self.get_model(name)
+
+    def get_model(self, model_name: str) -> Any:
+        model = self.models.get(model_name)
+        if model is not None:
+            return model
+
+        with self.load_lock:
+            if model_name not in self.models:
+                self.models[model_name] = self.load_model(model_name)
+
+        return self.models[model_name]
+
+    def load_model(self, model_name: str) -> Any:
+        model_path = self.model_paths[model_name]
+        model, feature_names = MODEL_LOADERS[model_name](model_path)
+        if feature_names and feature_names != self.prediction_columns:
+            raise ValueError(f"Model {model_name} was trained on different "
+                             f"feature columns")
+
+        logger.info("Loaded %s model (%s) from %s", model_name,
+                    type(model).__name__, model_path)
+        return model
+
+    def predict_proba(self, model_name: str,
+                      prediction_matrix: np.ndarray) -> np.ndarray:
+        if model_name == ENSEMBLE:
+            return self.get_ensemble_proba(prediction_matrix)
+
+        return self.get_model(model_name).predict_proba(prediction_matrix)
+
+    def get_ensemble_proba(self, prediction_matrix: np.ndarray) -> np.ndarray:
+        futures = {
+            name: ENSEMBLE_EXECUTOR.submit(self.predict_proba, name,
+                                           prediction_matrix)
+            for name in self.ensemble_weights
+        }
+
+        total_weight = sum(self.ensemble_weights.values())
+        return sum(futures[name].result() * (weight / total_weight)
+                   for name, weight in self.ensemble_weights.items())
+
+
+def get_model_version(model_name: str, model_path: str) -> Optional[str]:
+    if os.path.exists(model_path):
+        return get_file_version(model_path)
+
+    # The exported tree bundle can serve without the original model file
+    if model_name == "catboost":
+        return read_bundle_version()
+
+    return None
+
+
+def get_model_versions(model_paths: Dict[str, str]=MODEL_PATHS
+                       ) -> Dict[str, str]:
+    model_versions = {name: get_model_version(name, model_path)
+                      for name, model_path in model_paths.items()}
+    return {name: version for name, version in model_versions.items()
+            if version is not None}
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+
+    from backend.storage import load_storage
+
+    storage = load_storage()
+    registry = ModelRegistry(storage.prediction_columns)
+    registry.load(ENSEMBLE)
+
+    prediction_matrix = np.random.default_rng(0).random(
+        (256, len(storage.prediction_columns))).astype(np.float32)
+
+    for model_name in MODEL_CHOICES:
+        registry.predict_proba(model_name, prediction_matrix)
+        start = perf_counter()
+        for _ in range(20):
+            registry.predict_proba(model_name, prediction_matrix)
+        elapsed = (perf_counter() - start) / 20
+
+        print(f"{model_name}: {elapsed * 1000:.2f} ms "
+              f"per {len(prediction_matrix)} rows")
@@ -0,0 +1,224 @@
+import json
+import os
+import tempfile
+from typing import List, Optional
+
+import numpy as np
+
+from backend.backend_utils import build_once, get_file_version
+from utils.logger import get_logger
+from config import ROOT_DIR
+
+logger = get_logger("backend.oblivious_trees")
+
+CATBOOST_MODEL_PATH = f"{ROOT_DIR}/models/catboost_model.cbm"
+TREE_BUNDLE_PATH = f"{ROOT_DIR}/models/catboost_model.npz"
+TREE_BATCH_SIZE = 4096
+
+# How CatBoost sends missing values of features that had them in training
+NAN_FILL_VALUES = {"AsFalse": -np.inf, "AsTrue": np.inf}
+
+
+class ObliviousTreeModel:
+    def __init__(self, split_features: np.ndarray, split_borders: np.ndarray,
+                 leaf_values: np.ndarray, nan_fill: np.ndarray,
+                 scale: float, bias: float, feature_names: List[str]):
+        # Every tree tests split_features[t, d] > split_borders[t, d] and
+        # split d sets bit d of the leaf index
+        self.split_features = split_features
+        self.split_borders = split_borders
+        self.leaf_values = leaf_values
+        self.nan_fill = nan_fill
+
+        self.scale = scale
+        self.bias = bias
+        self.feature_names_ = feature_names
+
+        self.tree_count, self.depth = split_features.shape
+        self.flat_leaf_values = leaf_values.ravel()
+        self.leaf_offsets = (np.arange(self.tree_count, dtype=np.intp)[:, None]
+                             * leaf_values.shape[1])
+
+    def get_leaf_positions(self,
+                           prediction_matrix: np.ndarray) -> np.ndarray:
+        # Positions into flat_leaf_values, one row per tree. Feature-major
+        # rows keep the gather of each level contiguous
+        feature_rows = np.ascontiguousarray(prediction_matrix.T)
+        leaf_positions = np.repeat(self.leaf_offsets, len(prediction_matrix),
+                                   axis=1)
+        for level in range(self.depth):
+            split_bits = (feature_rows[self.split_features[:, level]]
+                          > self.split_borders[:, level, None])
+            leaf_positions |= split_bits.astype(np.intp) << level
+
+        return leaf_positions
+
+    def predict_raw(self, prediction_matrix: np.ndarray) -> np.ndarray:
+        prediction_matrix = np.asarray(prediction_matrix, dtype=np.float32)
+        if np.isnan(prediction_matrix).any():
+            prediction_matrix = np.where(np.isnan(prediction_matrix),
+                                         self.nan_fill, prediction_matrix)
+
+        raw = np.empty(len(prediction_matrix), dtype=np.float64)
+        for start in range(0, len(prediction_matrix), TREE_BATCH_SIZE):
+            batch = prediction_matrix[start:start + TREE_BATCH_SIZE]
+            raw[start:start + len(batch)] = np.take(
+                self.flat_leaf_values,
+                self.get_leaf_positions(batch)).sum(axis=0)
+
+        return raw * self.scale + self.bias
+
+    def predict_proba(self, prediction_matrix: np.ndarray) -> np.ndarray:
+        player_1_probabilities = 1 / (1 + np.exp(
+            -self.predict_raw(prediction_matrix)))
+        return np.column_stack([1 - player_1_probabilities,
+                                player_1_probabilities])
+
+
+def get_tree_arrays(model_json: dict) -> dict:
+    float_features = model_json["features_info"]["float_features"]
+    flat_idx = [feature["flat_feature_index"] for feature in float_features]
+    trees = model_json["oblivious_trees"]
+    depth = max(len(tree["splits"]) for tree in trees)
+
+    # Shallower trees are padded with splits that never fire
+    split_features = np.zeros((len(trees), depth), dtype=np.int32)
+    split_borders = np.full((len(trees), depth), np.inf, dtype=np.float32)
+    leaf_values = np.zeros((len(trees), 2 ** depth), dtype=np.float64)
+
+    for tree_idx, tree in enumerate(trees):
+        for split_idx, split in enumerate(tree["splits"]):
+            if split["split_type"] != "FloatFeature":
+                raise ValueError(f"Unsupported split type "
+                                 f"{split['split_type']}")
+
+            split_features[tree_idx, split_idx] = (
+                flat_idx[split["float_feature_index"]])
+            split_borders[tree_idx, split_idx] = split["border"]
+
+        if len(tree["leaf_values"]) != 2 ** len(tree["splits"]):
+            raise ValueError("Only single-output models are supported")
+        leaf_values[tree_idx, :len(tree["leaf_values"])] = (
+            tree["leaf_values"])
+
+    feature_count = max(flat_idx) + 1
+    nan_fill = np.full(feature_count, np.nan, dtype=np.float32)
+    feature_names = [""] * feature_count
+    for feature in float_features:
+        nan_fill[feature["flat_feature_index"]] = NAN_FILL_VALUES.get(
+            feature["nan_value_treatment"], np.nan)
+        feature_names[feature["flat_feature_index"]] = feature["feature_id"]
+
+    scale, biases = model_json["scale_and_bias"]
+    return {
+        "split_features": split_features, "split_borders": split_borders,
+        "leaf_values": leaf_values, "nan_fill": nan_fill,
+        "scale": np.float64(scale), "bias": np.float64(biases[0]),
+        "feature_names": np.array(feature_names, dtype=str),
+    }
+
+
+def export_catboost_model(model_path: str=CATBOOST_MODEL_PATH,
+                          bundle_path: str=TREE_BUNDLE_PATH) -> None:
+    from catboost import CatBoostClassifier
+
+    model = CatBoostClassifier()
+    model.load_model(model_path)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "model.json")
+        model.save_model(json_path, format="json")
+        with open(json_path) as json_file:
+            tree_arrays = get_tree_arrays(json.load(json_file))
+
+    tmp_path = f"{bundle_path}.tmp"
+    with open(tmp_path, "wb") as file:
+        np.savez(file, source_version=np.array(get_file_version(model_path)),
+                 **tree_arrays)
+    os.replace(tmp_path, bundle_path)
+
+    logger.info("Exported %s oblivious trees to %s",
+                len(tree_arrays["leaf_values"]), bundle_path)
+
+
+def read_bundle_version(bundle_path: str=TREE_BUNDLE_PATH) -> Optional[str]:
+    if not os.path.exists(bundle_path):
+        return None
+
+    with np.load(bundle_path) as bundle:
+        return str(bundle["source_version"])
+
+
+def read_bundle_feature_names(bundle_path: str=TREE_BUNDLE_PATH
+                              ) -> Optional[List[str]]:
+    if not os.path.exists(bundle_path):
+        return None
+
+    with np.load(bundle_path) as bundle:
+        return bundle["feature_names"].tolist()
+
+
+def is_tree_bundle_current(model_path: str=CATBOOST_MODEL_PATH,
+                           bundle_path: str=TREE_BUNDLE_PATH) -> bool:
+    bundle_version = read_bundle_version(bundle_path)
+    if bundle_version is None:
+        return False
+
+    if not os.path.exists(model_path):
+        return True
+
+    return bundle_version == get_file_version(model_path)
+
+
+def ensure_tree_bundle(model_path: str=CATBOOST_MODEL_PATH,
+                       bundle_path: str=TREE_BUNDLE_PATH) -> None:
+    if not os.path.exists(model_path):
+        return None
+
+    build_once(f"{bundle_path}.lock",
+               lambda: is_tree_bundle_current(model_path, bundle_path),
+               lambda: export_catboost_model(model_path, bundle_path))
+
+
+def load_oblivious_tree_model(bundle_path: str=TREE_BUNDLE_PATH
+                              ) -> ObliviousTreeModel:
+    with np.load(bundle_path) as bundle:
+        return ObliviousTreeModel(
+            bundle["split_features"], bundle["split_borders"],
+            bundle["leaf_values"], bundle["nan_fill"],
+            float(bundle["scale"]), float(bundle["bias"]),
+            bundle["feature_names"].tolist()
+        )
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+
+    from catboost import CatBoostClassifier
+
+    from backend.storage import LAST_N_MATCHES
+    from utils.dataframe import read_final_csv, delete_columns
+
+    export_catboost_model()
+    tree_model = load_oblivious_tree_model()
+
+    catboost_model = CatBoostClassifier()
+    catboost_model.load_model(CATBOOST_MODEL_PATH)
+
+    test_df = delete_columns(read_final_csv("boosting_model"),
+                             LAST_N_MATCHES)
+    test_matrix = test_df.drop("player_1_won", axis=1).to_numpy(
+        dtype=np.float32)
+
+    print(f"{tree_model.tree_count} trees of depth {tree_model.depth}")
+
+    for batch_size in (1, 16, 1024):
+        batch = test_matrix[:batch_size]
+        for name, model in (("catboost", catboost_model),
+                            ("numpy", tree_model)):
+            start = perf_counter()
+            for _ in range(100):
+                model.predict_proba(batch)
+            elapsed = (perf_counter() - start) / 100
+
+            print(f"{name}: {elapsed * 1000:.3f} ms per {batch_size} rows")
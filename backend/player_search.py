@@ -0,0 +1,211 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Set
+
+import numpy as np
+
+from backend.player_store import PlayerStore
+
+
+MAX_CHAR = "\U0010ffff"
+MIN_FUZZY_LENGTH = 4
+MAX_KEYS_PER_PLAYER = 8
+MAX_FILTER_ROWS = 256
+
+NON_WORD_PATTERN = re.compile(r"[\W_]+")
+
+
+def normalize_name(name: str) -> str:
+    # "Stan Wawrinka", "stán  WAWRINKA" and "Stan-Wawrinka" all become
+    # "stan wawrinka"
+    decomposed = unicodedata.normalize("NFKD", str(name))
+    stripped = "".join(char for char in decomposed
+                       if not unicodedata.combining(char))
+    return NON_WORD_PATTERN.sub(" ", stripped.casefold()).strip()
+
+
+def get_deletions(word: str) -> Set[str]:
+    return {word, *(word[:idx] + word[idx + 1:] for idx in range(len(word)))}
+
+
+def is_one_edit(word: str, other: str) -> bool:
+    # Damerau-Levenshtein distance of at most one
+    if word == other:
+        return True
+    if abs(len(word) - len(other)) > 1:
+        return False
+
+    if len(word) == len(other):
+        diffs = [idx for idx, (char, other_char) in enumerate(zip(word, other))
+                 if char != other_char]
+        return len(diffs) == 1 or (
+            len(diffs) == 2 and diffs[1] == diffs[0] + 1
+            and word[diffs[0]] == other[diffs[1]]
+            and word[diffs[1]] == other[diffs[0]])
+
+    shorter, longer = sorted((word, other), key=len)
+    idx = next((idx for idx, char in enumerate(shorter)
+                if char != longer[idx]), len(shorter))
+    return shorter[idx:] == longer[idx + 1:]
+
+
+def get_prefix_range(keys: List[str], prefix: str) -> range:
+    return range(bisect_left(keys, prefix),
+                 bisect_left(keys, prefix + MAX_CHAR))
+
+
+class PlayerSearchIndex:
+    def __init__(self, names: List[str], rank_order: np.ndarray):
+        # Rows are player store rows, rank_order[row] is the position in
+        # the original_rank ordering
+        self.rank_order = rank_order
+        self.rank_rows = np.argsort(rank_order)
+
+        keys, key_rows = [], []
+        token_rows: Dict[str, List[int]] = defaultdict(list)
+        self.row_tokens = [normalize_name(name).split() for name in names]
+        for row, tokens in enumerate(self.row_tokens):
+
+            # Every word can start a match: "nad" finds "rafael nadal"
+            for idx in range(min(len(tokens), MAX_KEYS_PER_PLAYER)):
+                keys.append(" ".join(tokens[idx:]))
+                key_rows.append(row)
+            for token in dict.fromkeys(tokens):
+                token_rows[token].append(row)
+
+        key_order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[idx] for idx in key_order]
+        self.key_rows = np.array(key_rows, dtype=np.int32)[key_order]
+
+        self.tokens = sorted(token_rows)
+        self.token_offsets = np.zeros(len(self.tokens) + 1, dtype=np.int64)
+        np.cumsum([len(token_rows[token]) for token in self.tokens],
+                  out=self.token_offsets[1:])
+        self.token_rows = np.array(
+            [row for token in self.tokens for row in token_rows[token]],
+            dtype=np.int32)
+
+        self.deletions: Dict[str, List[int]] = defaultdict(list)
+        for token_idx, token in enumerate(self.tokens):
+            if len(token) >= MIN_FUZZY_LENGTH:
+                for deletion in get_deletions(token):
+                    self.deletions[deletion].append(token_idx)
+
+    def __len__(self) -> int:
+        return len(self.rank_order)
+
+    def get_ranked_rows(self, rows: np.ndarray, limit: int) -> np.ndarray:
+        ranks = self.rank_order[rows]
+        # A player shows up at most MAX_KEYS_PER_PLAYER times, so the best
+        # limit players are among that many best ranked matches
+        keep = limit * MAX_KEYS_PER_PLAYER
+        if len(ranks) > keep:
+            ranks = np.partition(ranks, keep)[:keep]
+
+        return self.rank_rows[np.unique(ranks)[:limit]]
+
+    def get_token_rows(self, token_idx: List[int]) -> np.ndarray:
+        return np.concatenate([
+            self.token_rows[self.token_offsets[idx]:
+                            self.token_offsets[idx + 1]]
+            for idx in token_idx
+        ])
+
+    def get_word_rows(self, word: str) -> np.ndarray:
+        # Tokens starting with the word, or one typo away from it
+        token_range = get_prefix_range(self.tokens, word)
+        prefix_rows = self.token_rows[self.token_offsets[token_range.start]:
+                                      self.token_offsets[token_range.stop]]
+        if len(word) < MIN_FUZZY_LENGTH:
+            return prefix_rows
+
+        fuzzy_idx = {
+            idx for deletion in get_deletions(word)
+            for idx in self.deletions.get(deletion, ())
+            if idx not in token_range and is_one_edit(word, self.tokens[idx])
+        }
+        if not fuzzy_idx:
+            return prefix_rows
+
+        return np.concatenate([prefix_rows,
+                               self.get_token_rows(sorted(fuzzy_idx))])
+
+    def is_word_match(self, word: str, row: int) -> bool:
+        return any(token.startswith(word) or (
+            len(word) >= MIN_FUZZY_LENGTH and is_one_edit(word, token))
+            for token in self.row_tokens[row])
+
+    def get_fuzzy_rows(self, words: List[str]) -> np.ndarray:
+        # Longest word first, it usually narrows the rows the most
+        words = sorted(words, key=len, reverse=True)
+        rows = np.unique(self.get_word_rows(words[0]))
+
+        for word in words[1:]:
+            if len(rows) <= MAX_FILTER_ROWS:
+                rows = rows[[self.is_word_match(word, row) for row in rows]]
+            else:
+                rows = np.intersect1d(rows, self.get_word_rows(word))
+
+        return rows
+
+    def search(self, query: str, limit: int=10) -> np.ndarray:
+        normalized_query = normalize_name(query)
+        if not normalized_query or limit <= 0:
+            return np.empty(0, dtype=np.int32)
+
+        key_range = get_prefix_range(self.keys, normalized_query)
+        rows = self.get_ranked_rows(
+            self.key_rows[key_range.start:key_range.stop], limit)
+        if len(rows) == limit:
+            return rows
+
+        # Prefix matches first, then any word order or a typo per word
+        fuzzy_rows = np.setdiff1d(
+            self.get_fuzzy_rows(normalized_query.split()), rows)
+        return np.concatenate([
+            rows, self.get_ranked_rows(fuzzy_rows, limit - len(rows))])
+
+
+def get_player_search_index(player_store: PlayerStore,
+                            sorted_player_ids: List[int]
+                            ) -> PlayerSearchIndex:
+    rank_order = np.empty(len(player_store), dtype=np.int32)
+    rank_order[player_store.get_rows(sorted_player_ids)] = np.arange(
+        len(sorted_player_ids), dtype=np.int32)
+
+    return PlayerSearchIndex(player_store.column("name").tolist(),
+                             rank_order)
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+
+    from backend.storage import load_storage
+
+    storage = load_storage()
+    player_store = storage.player_store
+
+    start = perf_counter()
+    search_index = get_player_search_index(player_store,
+                                           storage.sorted_player_ids)
+    print(f"Indexed {len(search_index)} players in "
+          f"{(perf_counter() - start) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(0)
+    names = [normalize_name(name) for name in rng.choice(
+        player_store.column("name").tolist(), 200)]
+    queries = ([name[:length] for name in names for length in (1, 3, 6)]
+               + [name[:2] + name[3:] for name in names]
+               + [" ".join(reversed(name.split())) for name in names])
+
+    start = perf_counter()
+    for query in queries:
+        search_index.search(query)
+    elapsed = (perf_counter() - start) / len(queries)
+    print(f"{elapsed * 1e6:.0f} us per query over {len(queries)} queries")
+
+    for query in ("fed", "NADAL", "djokovic novak", "wawrinak"):
+        rows = search_index.search(query, 3)
+        print(query, player_store.column("name")[rows].tolist())
@@ -0,0 +1,201 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from utils.feature_helpers import SURFACE_NAMES
+
+
+class PlayerView:
+    __slots__ = ("store", "row")
+
+    def __init__(self, store: "PlayerStore", row: int):
+        self.store = store
+        self.row = row
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for names that are not slots. An unset slot or a
+        # dunder looked up by pickle or copy must not recurse into store
+        if name.startswith("_") or name in PlayerView.__slots__:
+            raise AttributeError(name)
+
+        return self.store.get_value(self.row, name)
+
+    def __str__(self):
+        return f"{self.name}: {self.win_ratio}"
+
+
+class PlayerStore:
+    def __init__(self, player_ids: np.ndarray, records: np.ndarray,
+                 column_types: Dict[str, str], surface_columns: List[str],
+                 surface_values: np.ndarray, surface_seen: np.ndarray):
+        # records is the only copy of the player columns, numeric ones are
+        # stored as float64 and read back as column_types
+        self.player_ids = np.asarray(player_ids, dtype=np.int64)
+        self.records = records
+        self.columns = list(column_types)
+        self.column_types = {col: np.dtype(column_type)
+                             for col, column_type in column_types.items()}
+        self.column_arrays = {col: records[col] for col in self.columns}
+
+        self.value_columns = [col for col in self.columns
+                              if self.column_types[col].kind in "biuf"]
+        self.value_idx = {col: idx for idx, col
+                          in enumerate(self.value_columns)}
+        self.values = get_value_view(records, self.value_columns)
+
+        self.surface_columns = list(surface_columns)
+        self.surface_values = surface_values
+        self.surface_seen = surface_seen
+        self.surface_attributes = {
+            f"{col}_{surface_name}": (surface_idx, col_idx)
+            for surface_idx, surface_name in enumerate(SURFACE_NAMES)
+            for col_idx, col in enumerate(self.surface_columns)
+        }
+
+        self.set_row_index()
+
+    def set_row_index(self) -> None:
+        if len(self.player_ids) == 0:
+            self.min_id = 0
+            self.row_index = np.empty(0, dtype=np.int32)
+            return None
+
+        self.min_id = int(self.player_ids.min())
+        max_id = int(self.player_ids.max())
+        self.row_index = np.full(max_id - self.min_id + 1, -1, dtype=np.int32)
+        self.row_index[self.player_ids - self.min_id] = np.arange(
+            len(self.player_ids), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.player_ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.player_ids.tolist())
+
+    def __contains__(self, player_id: int) -> bool:
+        return self.get_row(player_id) >= 0
+
+    def __getitem__(self, player_id: int) -> PlayerView:
+        row = self.get_row(player_id)
+        if row < 0:
+            raise KeyError(player_id)
+
+        return PlayerView(self, row)
+
+    def get(self, player_id: int,
+            default: Optional[PlayerView]=None) -> Optional[PlayerView]:
+        row = self.get_row(player_id)
+        return PlayerView(self, row) if row >= 0 else default
+
+    def get_row(self, player_id: int) -> int:
+        idx = player_id - self.min_id
+        if not 0 <= idx < len(self.row_index):
+            return -1
+
+        return int(self.row_index[idx])
+
+    def get_rows(self, player_ids: np.ndarray) -> np.ndarray:
+        idx = np.asarray(player_ids, dtype=np.int64) - self.min_id
+        in_range = (idx >= 0) & (idx < len(self.row_index))
+
+        rows = np.full(idx.shape, -1, dtype=np.intp)
+        rows[in_range] = self.row_index[idx[in_range]]
+        if (rows < 0).any():
+            raise KeyError(int(np.asarray(player_ids)[rows < 0][0]))
+
+        return rows
+
+    def column(self, col: str) -> np.ndarray:
+        return self.column_arrays[col]
+
+    def get_value(self, row: int, name: str) -> Any:
+        if name in self.column_arrays:
+            return self.column_types[name].type(
+                self.column_arrays[name][row]).item()
+
+        if name in self.surface_attributes:
+            surface_idx, col_idx = self.surface_attributes[name]
+            if self.surface_seen[row, surface_idx]:
+                return self.surface_values[row, surface_idx, col_idx].item()
+
+        raise AttributeError(name)
+
+    def get_value_idx(self, col: str) -> int:
+        if col not in self.value_idx:
+            raise ValueError(f"Player column {col} is not numeric")
+
+        return self.value_idx[col]
+
+    def get_surface_value_idx(self, attribute: str) -> int:
+        # Position in the last axis of surface_values, -1 if unknown
+        if attribute not in self.surface_attributes:
+            return -1
+
+        return self.surface_attributes[attribute][1]
+
+    def get_surface_column(self, attribute: str) -> np.ndarray:
+        # Players never seen on the surface get 0, the value the
+        # prediction columns always used for a missing surface attribute
+        if attribute not in self.surface_attributes:
+            return np.zeros(len(self), dtype=np.float64)
+
+        surface_idx, col_idx = self.surface_attributes[attribute]
+        return np.where(self.surface_seen[:, surface_idx],
+                        self.surface_values[:, surface_idx, col_idx], 0.0)
+
+    def get_sorted_player_ids(self, col: str="original_rank") -> List[int]:
+        order = np.argsort(self.column(col), kind="stable")
+        return self.player_ids[order].tolist()
+
+
+def get_player_records(player_columns: Dict[str, np.ndarray]
+                       ) -> Tuple[np.ndarray, Dict[str, str]]:
+    # Numeric columns first and all float64, so they can be viewed as one
+    # matrix, then the text columns
+    column_types = {col: column.dtype.str
+                    for col, column in player_columns.items()}
+    value_columns = [col for col, column in player_columns.items()
+                     if column.dtype.kind in "biuf"]
+    other_columns = [col for col in player_columns
+                     if col not in value_columns]
+
+    player_count = len(next(iter(player_columns.values()), []))
+    player_records = np.empty(player_count, dtype=[
+        *((col, np.float64) for col in value_columns),
+        *((col, player_columns[col].dtype) for col in other_columns)
+    ])
+    for col, column in player_columns.items():
+        player_records[col] = column
+
+    return player_records, column_types
+
+
+def get_value_view(records: np.ndarray,
+                   value_columns: List[str]) -> np.ndarray:
+    # (players, value columns) over the leading float64 fields of records
+    fields = records.dtype.fields
+    for idx, col in enumerate(value_columns):
+        if fields[col] != (np.dtype(np.float64), idx * 8):
+            raise ValueError(f"Player column {col} is not stored as "
+                             f"float64 at position {idx}!")
+
+    return np.ndarray((len(records), len(value_columns)), dtype=np.float64,
+                      buffer=records, strides=(records.itemsize, 8))
+
+
+if __name__ == '__main__':
+    import sys
+    from backend.storage import load_storage
+
+    storage = load_storage()
+    player_store = storage.player_store
+    sorted_player_ids = storage.sorted_player_ids
+
+    store_bytes = (player_store.records.nbytes
+                   + player_store.row_index.nbytes
+                   + player_store.surface_values.nbytes
+                   + player_store.surface_seen.nbytes)
+    print(f"{len(player_store)} players in {store_bytes / 2 ** 20:.1f} MiB, "
+          f"{sys.getsizeof(player_store[sorted_player_ids[0]])} bytes "
+          f"per player view")
+    print(player_store[sorted_player_ids[0]])
@@ -0,0 +1,104 @@
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import get_logger
+
+logger = get_logger("backend.scheduler")
+
+
+class InferenceScheduler:
+    def __init__(self, predict_proba: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int=64, max_delay: float=0.002):
+        self.predict_proba = predict_proba
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.closed = False
+
+    async def submit(self, prediction_matrix: np.ndarray) -> np.ndarray:
+        if self.closed:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.predict_proba, prediction_matrix)
+
+        self.ensure_worker()
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((prediction_matrix, future))
+        return await future
+
+    def ensure_worker(self) -> None:
+        if self.worker is not None and not self.worker.done():
+            return None
+
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.get_running_loop().create_task(self.run())
+
+    async def close(self) -> None:
+        self.closed = True
+        if self.worker is None or self.worker.done():
+            return None
+
+        await self.queue.join()
+        self.worker.cancel()
+
+    async def run(self) -> None:
+        while True:
+            batch = await self.collect_batch()
+            try:
+                await self.flush(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def collect_batch(self) -> List[Tuple[np.ndarray,
+                                                asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        row_count = len(batch[0][0])
+        deadline = loop.time() + self.max_delay
+
+        while row_count < self.max_batch_size:
+            if self.queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self.queue.get_nowait()
+
+            batch.append(item)
+            row_count += len(item[0])
+
+        return batch
+
+    async def flush(self, batch: List[Tuple[np.ndarray,
+                                            asyncio.Future]]) -> None:
+        matrices, futures = zip(*batch)
+        prediction_matrix = np.concatenate(matrices)
+
+        try:
+            probabilities = await asyncio.get_running_loop().run_in_executor(
+                None, self.predict_proba, prediction_matrix)
+        except Exception as inference_error:
+            logger.error("Batched inference failed -> %s", inference_error)
+            for future in futures:
+                if not future.done():
+                    future.set_exception(inference_error)
+            return None
+
+        logger.debug("Flushed %s requests (%s rows) in one model call",
+                     len(futures), len(prediction_matrix))
+
+        offset = 0
+        for matrix, future in batch:
+            if not future.done():
+                future.set_result(probabilities[offset:offset + len(matrix)])
+            offset += len(matrix)
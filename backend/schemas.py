@@ -0,0 +1,32 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+
+MAX_DRAW_SIZE = 128
+
+
+class Prediction(BaseModel):
+    player_1_id: int
+    player_2_id: int
+    player_1_entry: str = "ALT"
+    player_2_entry: str = "ALT"
+    surface: str = "hard"
+    tourney_level: str = "A"
+    draw_size: float = 64.0
+
+    @field_validator("surface")
+    @classmethod
+    def normalize_surface(cls, surface: str) -> str:
+        # Lowercase once, the cache key, the win matrix and the head to
+        # head lookups all match surface names exactly
+        return surface.lower()
+
+
+class DrawSimulation(BaseModel):
+    player_ids: List[int] = Field(max_length=MAX_DRAW_SIZE)
+    surface: str = "hard"
+    tourney_level: str = "A"
+    draw_size: Optional[float] = None
+    iterations: int = Field(default=10000, gt=0, le=1_000_000)
+    seed: Optional[int] = None
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import time
+from functools import partial
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from backend.backend_utils import get_memory_usage
+from backend.encoded_response import EncodedResponse
+from backend.inference import Predictor, load_predictor
+from backend.leaderboard import Leaderboard
+from backend.metrics import get_model_call
+from backend.model_registry import DEFAULT_MODEL, get_model_versions
+from backend.player_search import get_player_search_index
+from backend.scheduler import InferenceScheduler
+from backend.storage import get_data_version, load_storage
+from backend.win_matrix import WinProbabilityMatrix, load_win_matrix
+from utils.logger import get_logger
+
+logger = get_logger("backend.serving")
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 64))
+MAX_BATCH_DELAY = float(os.getenv("MAX_BATCH_DELAY", 0.002))
+
+
+class ServingBundle:
+    def __init__(self, predictor: Predictor,
+                 win_matrix: Optional[WinProbabilityMatrix]):
+        self.predictor = predictor
+        self.storage = predictor.storage
+        self.win_matrix = win_matrix
+        self.schedulers: Dict[str, InferenceScheduler] = {}
+        self.responses: Dict[Hashable, EncodedResponse] = {}
+        self.player_search = get_player_search_index(
+            self.storage.player_store, self.storage.sorted_player_ids)
+        self.leaderboard = Leaderboard(self.storage.player_store,
+                                       self.storage.ioc_dict)
+
+        self.model_version = predictor.model_version
+        self.data_version = predictor.storage.data_version
+        self.version = (predictor.registry.version, self.data_version)
+        self.loaded_at = time.time()
+
+    def get_scheduler(self, model_name: str=DEFAULT_MODEL
+                      ) -> InferenceScheduler:
+        # One queue per model so a batch is always scored by one model
+        if model_name not in self.schedulers:
+            self.schedulers[model_name] = InferenceScheduler(
+                get_model_call(model_name, partial(
+                    self.predictor.predict_proba, model_name=model_name)),
+                MAX_BATCH_SIZE, MAX_BATCH_DELAY
+            )
+
+        return self.schedulers[model_name]
+
+    def get_encoded_response(self, key: Optional[Hashable],
+                             get_content: Callable[[], dict | list]
+                             ) -> EncodedResponse:
+        # Read-only responses are encoded once per bundle, a reload
+        # starts with an empty set
+        if key is None:
+            return EncodedResponse(get_content())
+
+        encoded_response = self.responses.get(key)
+        if encoded_response is None:
+            encoded_response = EncodedResponse(get_content())
+            self.responses[key] = encoded_response
+
+        return encoded_response
+
+    async def close(self) -> None:
+        for scheduler in self.schedulers.values():
+            await scheduler.close()
+
+
+def load_serving_bundle(preload: Iterable[str]=(DEFAULT_MODEL,)
+                        ) -> ServingBundle:
+    storage = load_storage()
+    predictor = load_predictor(storage, preload)
+    win_matrix = load_win_matrix(predictor.model_version,
+                                 storage.data_version)
+
+    logger.info("Serving bundle ready from %s, memory %s",
+                storage.source, get_memory_usage())
+    return ServingBundle(predictor, win_matrix)
+
+
+def get_source_versions() -> Tuple[tuple, Optional[str]]:
+    return tuple(sorted(get_model_versions().items())), get_data_version()
+
+
+class BundleManager:
+    def __init__(self, bundle: ServingBundle):
+        self.bundle = bundle
+        self.reload_lock: Optional[asyncio.Lock] = None
+
+        self.reloads = 0
+        self.last_reload_error: Optional[str] = None
+
+    async def reload(self, force: bool=False) -> bool:
+        if self.reload_lock is None:
+            self.reload_lock = asyncio.Lock()
+
+        async with self.reload_lock:
+            if not force and get_source_versions() == self.bundle.version:
+                return False
+
+            # Models already in use are loaded before the swap
+            preload = list(self.bundle.predictor.registry.models)
+            try:
+                new_bundle = await run_in_threadpool(load_serving_bundle,
+                                                     preload)
+            except Exception as reload_error:
+                # The type only, /health is public
+                self.last_reload_error = type(reload_error).__name__
+                logger.error("Reload failed, still serving %s -> %s",
+                             self.bundle.version, reload_error)
+                raise
+
+            # Requests that already hold the old bundle finish against it
+            old_bundle, self.bundle = self.bundle, new_bundle
+            self.reloads += 1
+            self.last_reload_error = None
+
+        logger.info("Swapped serving bundle %s -> %s",
+                    old_bundle.version, new_bundle.version)
+        await old_bundle.close()
+        return True
+
+    async def watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception:
+                continue
+
+    def get_health(self, bundle: Optional[ServingBundle]=None) -> dict:
+        # The bundle a request was served from, else the current one
+        bundle = bundle if bundle is not None else self.bundle
+        return {
+            "status": "ok",
+            "model_version": bundle.model_version,
+            "model_versions": bundle.predictor.registry.versions,
+            "loaded_models": list(bundle.predictor.registry.models),
+            "data_version": bundle.data_version,
+            "data_source": bundle.storage.source,
+            "players": len(bundle.storage.player_store),
+            "loaded_at": bundle.loaded_at,
+            "reloads": self.reloads,
+            "last_reload_error": self.last_reload_error,
+            "pid": os.getpid(),
+            "memory": get_memory_usage()
+        }
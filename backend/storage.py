@@ -1,65 +1,234 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
 from backend.backend_utils import (
     get_player_column_names,
     get_final_player_columns,
-    get_player_data_dict,
-    add_surface_attributes,
-    get_ioc_dict
+    get_player_columns,
+    get_player_surface_columns,
+    get_ioc_dict,
+    get_file_version,
+    build_once,
+    release_memory,
+    get_memory_usage,
+    SHARED_ARTIFACTS
+)
+
+from backend.model_registry import (
+    DEFAULT_MODEL,
+    MODEL_LOADERS,
+    MODEL_PATHS,
+    get_model_version
+)
+from backend.h2h_store import HeadToHeadStore, get_h2h_store
+from backend.player_store import PlayerStore, get_player_records
+from backend.feature_store import (
+    FEATURE_STORE_DIR,
+    read_feature_store_manifest,
+    load_feature_store,
+    save_feature_store,
 )
 
 from utils.dataframe import (
     read_final_csv,
-    delete_columns
+    get_final_path,
+    get_in_game_columns_to_delete
 )
 
-from utils.feature_helpers import (
-    get_head_to_head_dict,
-    get_surface_head_to_head_dict,
-)
+from utils.logger import get_logger
 
+logger = get_logger("backend.storage")
 
 LAST_N_MATCHES = [5, 10, 20, 50]
-
-BOOSTING_DF = read_final_csv("boosting_model")
-COLUMN_NAMES = list(BOOSTING_DF.columns)
-
-PREDICTION_DF = delete_columns(BOOSTING_DF, LAST_N_MATCHES)
-PREDICTION_COLUMNS = [col for col in list(PREDICTION_DF.columns)
-                      if col != "player_1_won"]
-
-PLAYER_1_ALL_COLUMNS = get_player_column_names(COLUMN_NAMES, 1)
-PLAYER_2_ALL_COLUMNS = get_player_column_names(COLUMN_NAMES, 2)
-
-(
-    PLAYER_1_COLUMNS,
-    PLAYER_2_COLUMNS,
-    PLAYER_1_SURFACE_COLUMNS,
-    PLAYER_2_SURFACE_COLUMNS,
-) = get_final_player_columns(PLAYER_1_ALL_COLUMNS, PLAYER_2_ALL_COLUMNS)
-
-PLAYER_DATA_DICT = get_player_data_dict(BOOSTING_DF,
-                                        PLAYER_1_COLUMNS, PLAYER_2_COLUMNS)
-add_surface_attributes(BOOSTING_DF, PLAYER_DATA_DICT,
-                       PLAYER_1_SURFACE_COLUMNS, PLAYER_2_SURFACE_COLUMNS)
-
-H2H_DICT = get_head_to_head_dict(BOOSTING_DF)
-SURFACE_H2H_DICT = get_surface_head_to_head_dict(BOOSTING_DF)
-
-IOC_DICT = get_ioc_dict()
-SORTED_PLAYER_IDS = sorted(PLAYER_DATA_DICT,
-                           key=lambda id: PLAYER_DATA_DICT[id].original_rank)
+CSV_DTYPES = {
+    "player_1_id": np.int32, "player_2_id": np.int32, "player_1_won": bool,
+    "surface_Carpet": bool, "surface_Clay": bool, "surface_Grass": bool,
+    "tourney_year": np.int16, "tourney_month": np.int8, "tourney_day": np.int8,
+}
+# Player stats that are whole numbers: float32 holds them exactly, missing
+# values included, so the store and FeaturePlan see the same values
+PLAYER_STAT_DTYPES = {
+    **{col: np.float32 for col
+       in get_in_game_columns_to_delete(LAST_N_MATCHES)},
+    **{f"player_{num}_{col}": np.float32 for num in (1, 2)
+       for col in ("rank_points", "original_rank")},
+    **{f"player_{num}_{col}": np.int32 for num in (1, 2)
+       for col in ("won_match", "total_match",
+                   *(f"last_{last}_match_won" for last in LAST_N_MATCHES))},
+}
+
+
+class Storage:
+    def __init__(self, prediction_columns: List[str],
+                 player_columns: List[str], player_surface_columns: List[str],
+                 player_store: PlayerStore, h2h_store: HeadToHeadStore,
+                 ioc_dict: dict,
+                 sorted_player_ids: List[int], data_version: str,
+                 model_version: Optional[str], source: str="csv"):
+        self.prediction_columns = prediction_columns
+        self.player_columns = player_columns
+        self.player_surface_columns = player_surface_columns
+
+        self.player_store = player_store
+        self.h2h_store = h2h_store
+        self.ioc_dict = ioc_dict
+
+        self.sorted_player_ids = sorted_player_ids
+        self.data_version = data_version
+        self.model_version = model_version
+        self.source = source
+
+
+def get_prediction_columns(model_name: str=DEFAULT_MODEL) -> List[str]:
+    # The columns the served model was trained on, in its order
+    _, feature_names = MODEL_LOADERS[model_name](MODEL_PATHS[model_name])
+    if not feature_names:
+        raise ValueError(f"Model {model_name} has no feature names!")
+
+    return list(feature_names)
+
+
+def get_player_store(df: pd.DataFrame) -> PlayerStore:
+    column_names = list(df.columns)
+    (
+        player_1_columns,
+        player_2_columns,
+        player_1_surface_columns,
+        player_2_surface_columns,
+    ) = get_final_player_columns(get_player_column_names(column_names, 1),
+                                 get_player_column_names(column_names, 2))
+
+    player_ids, player_columns = get_player_columns(
+        df, player_1_columns, player_2_columns)
+    surface_values, surface_seen = get_player_surface_columns(
+        df, player_ids, player_1_surface_columns, player_2_surface_columns)
+
+    player_surface_columns = [col.replace("player_1_", "")
+                              for col in player_1_surface_columns]
+    records, column_types = get_player_records(player_columns)
+    return PlayerStore(player_ids, records, column_types,
+                       player_surface_columns, surface_values, surface_seen)
+
+
+def get_csv_storage() -> Storage:
+    data_version = get_file_version(get_final_path("boosting_model"))
+    column_names = list(pd.read_csv(get_final_path("boosting_model"),
+                                    nrows=0).columns)
+    prediction_columns = get_prediction_columns()
+
+    # Only what the player and head-to-head stores are built from
+    usecols = (list(CSV_DTYPES) + get_player_column_names(column_names, 1)
+               + get_player_column_names(column_names, 2))
+    boosting_df = read_final_csv(
+        "boosting_model",
+        usecols=usecols,
+        dtype={**CSV_DTYPES,
+               **{col: dtype for col, dtype in PLAYER_STAT_DTYPES.items()
+                  if col in usecols}}
+    )
+
+    player_store = get_player_store(boosting_df)
+    h2h_store = get_h2h_store(boosting_df)
+    del boosting_df
+
+    return Storage(
+        prediction_columns,
+        player_store.columns,
+        player_store.surface_columns,
+        player_store,
+        h2h_store,
+        get_ioc_dict(),
+        player_store.get_sorted_player_ids(),
+        data_version,
+        get_model_version(DEFAULT_MODEL, MODEL_PATHS[DEFAULT_MODEL])
+    )
+
+
+def get_snapshot_storage(store_dir: str=FEATURE_STORE_DIR) -> Storage:
+    feature_store = load_feature_store(store_dir)
+    return Storage(
+        feature_store["prediction_columns"],
+        feature_store["player_columns"],
+        feature_store["player_surface_columns"],
+        feature_store["player_store"],
+        feature_store["h2h_store"],
+        feature_store["ioc_dict"],
+        feature_store["sorted_player_ids"],
+        feature_store["data_version"],
+        feature_store["model_version"],
+        source="snapshot"
+    )
+
+
+def is_snapshot_current(store_dir: str=FEATURE_STORE_DIR) -> bool:
+    manifest = read_feature_store_manifest(store_dir)
+    if manifest is None:
+        return False
+
+    csv_path = get_final_path("boosting_model")
+    if (os.path.exists(csv_path)
+            and manifest["data_version"] != get_file_version(csv_path)):
+        logger.warning("Feature store snapshot is older than the final "
+                       "csv, rebuilding player data from csv")
+        return False
+
+    if manifest["model_version"] != get_model_version(
+            DEFAULT_MODEL, MODEL_PATHS[DEFAULT_MODEL]):
+        logger.warning("Feature store snapshot was built for another "
+                       "%s model, rebuilding player data from csv",
+                       DEFAULT_MODEL)
+        return False
+
+    return True
+
+
+def get_data_version(store_dir: str=FEATURE_STORE_DIR) -> Optional[str]:
+    csv_path = get_final_path("boosting_model")
+    if os.path.exists(csv_path):
+        return get_file_version(csv_path)
+
+    manifest = read_feature_store_manifest(store_dir)
+    return manifest["data_version"] if manifest is not None else None
+
+
+def ensure_feature_store(store_dir: str=FEATURE_STORE_DIR) -> None:
+    os.makedirs(store_dir, exist_ok=True)
+    build_once(os.path.join(store_dir, "build.lock"),
+               lambda: is_snapshot_current(store_dir),
+               lambda: save_feature_store(get_csv_storage(), store_dir))
+
+
+def load_storage(shared: bool=SHARED_ARTIFACTS) -> Storage:
+    # Shared workers map one snapshot instead of each parsing the csv
+    if shared:
+        ensure_feature_store()
+
+    if is_snapshot_current():
+        logger.info("Loading feature store snapshot from %s",
+                    FEATURE_STORE_DIR)
+        return get_snapshot_storage()
+
+    storage = get_csv_storage()
+    release_memory()
+    return storage
 
 
 if __name__ == '__main__':
-    chosen_player = PLAYER_DATA_DICT[101142]
+    storage = load_storage()
+    player_store, h2h_store = storage.player_store, storage.h2h_store
+
+    chosen_player = player_store[101142]
     print(chosen_player)
-    chosen_dict = chosen_player.__dict__
+    chosen_dict = {col: getattr(chosen_player, col)
+                   for col in player_store.columns}
     print(len(chosen_dict.keys()))
 
-    del chosen_dict["row"]
-    del chosen_dict["column_names"]
-    del chosen_dict["num"]
-
     print(chosen_dict)
 
-    print(list(H2H_DICT.items())[:5])
-    print(list(SURFACE_H2H_DICT.items())[:5])
\ No newline at end of file
+    print(h2h_store.pair_keys[:5] >> 32, h2h_store.pair_keys[:5] & 0xffffffff)
+    print(h2h_store.counts[:5])
+    print(h2h_store.surface_counts[:5])
+    print(get_memory_usage())
@@ -0,0 +1,173 @@
+import json
+import os
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.inference import Predictor
+from backend.schemas import Prediction
+from utils.feature_helpers import Surface, get_surface_idx_by_name
+from utils.logger import get_logger
+from config import ROOT_DIR
+
+logger = get_logger("backend.win_matrix")
+
+WIN_MATRIX_DIR = f"{ROOT_DIR}/data/win_matrix"
+WIN_MATRIX_PLAYER_COUNT = 300
+WIN_MATRIX_BATCH_SIZE = 65536
+
+MATRIX_SURFACES = [surface.name.lower() for surface in Surface]
+# carpet, clay, grass, hard
+
+MATRIX_CONTEXT = {
+    "player_1_entry": "ALT", "player_2_entry": "ALT",
+    "tourney_level": "A", "draw_size": 64.0
+}
+
+
+class WinProbabilityMatrix:
+    def __init__(self, matrix_dir: str, manifest: dict):
+        self.manifest = manifest
+        self.probabilities = np.load(
+            os.path.join(matrix_dir, "probabilities.npy"), mmap_mode="r")
+
+        player_ids = np.load(os.path.join(matrix_dir, "player_ids.npy"))
+        self.player_rows = {int(player_id): row
+                            for row, player_id in enumerate(player_ids)}
+
+    def covers(self, prediction: Prediction) -> bool:
+        return (
+            prediction.surface in MATRIX_SURFACES
+            and prediction.player_1_id in self.player_rows
+            and prediction.player_2_id in self.player_rows
+            and all(getattr(prediction, field) == value
+                    for field, value in MATRIX_CONTEXT.items())
+        )
+
+    def lookup(self, prediction: Prediction) -> Optional[float]:
+        if not self.covers(prediction):
+            return None
+
+        surface_idx = get_surface_idx_by_name(prediction.surface)
+        return float(self.probabilities[
+            surface_idx,
+            self.player_rows[prediction.player_1_id],
+            self.player_rows[prediction.player_2_id]
+        ])
+
+
+def load_win_matrix(model_version: str, data_version: str,
+                    matrix_dir: str=WIN_MATRIX_DIR
+                    ) -> Optional[WinProbabilityMatrix]:
+    manifest_path = os.path.join(matrix_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        logger.info("No win probability matrix found in %s", matrix_dir)
+        return None
+
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    if (manifest["model_version"] != model_version
+            or manifest["data_version"] != data_version):
+        logger.warning("Win probability matrix was built for another "
+                       "model or data version, serving live predictions")
+        return None
+
+    win_matrix = WinProbabilityMatrix(matrix_dir, manifest)
+    logger.info("Loaded win probability matrix for %s players",
+                len(win_matrix.player_rows))
+    return win_matrix
+
+
+def get_pair_predictions(player_ids: List[int], surface: str,
+                         context: Dict[str, Any]=MATRIX_CONTEXT
+                         ) -> Tuple[List[Prediction], np.ndarray, np.ndarray]:
+    predictions, rows_1, rows_2 = [], [], []
+    for row_1, row_2 in combinations(range(len(player_ids)), 2):
+        # Live predictions always put the higher id first
+        if player_ids[row_1] < player_ids[row_2]:
+            row_1, row_2 = row_2, row_1
+
+        rows_1.append(row_1)
+        rows_2.append(row_2)
+        predictions.append(Prediction(
+            player_1_id=player_ids[row_1], player_2_id=player_ids[row_2],
+            surface=surface, **context
+        ))
+
+    return (predictions, np.array(rows_1, dtype=np.intp),
+            np.array(rows_2, dtype=np.intp))
+
+
+def get_win_probabilities(predictor: Predictor,
+                          predictions: List[Prediction],
+                          batch_size: int) -> np.ndarray:
+    probabilities = np.empty(len(predictions), dtype=np.float64)
+    for start in range(0, len(predictions), batch_size):
+        batch = predictions[start:start + batch_size]
+        prediction_matrix = predictor.get_prediction_matrix(batch)
+        probabilities[start:start + len(batch)] = (
+            predictor.predict_proba(prediction_matrix)[:, 1])
+
+    return probabilities
+
+
+def get_surface_matrix(predictor: Predictor, player_ids: List[int],
+                       surface: str, batch_size: int) -> np.ndarray:
+    predictions, rows_1, rows_2 = get_pair_predictions(player_ids, surface)
+    probabilities = get_win_probabilities(predictor, predictions, batch_size)
+
+    surface_matrix = np.full((len(player_ids), len(player_ids)), 0.5)
+    surface_matrix[rows_1, rows_2] = probabilities
+    surface_matrix[rows_2, rows_1] = 1 - probabilities
+    return surface_matrix
+
+
+def save_win_matrix(predictor: Predictor,
+                    player_count: int=WIN_MATRIX_PLAYER_COUNT,
+                    dtype: str="float32",
+                    batch_size: int=WIN_MATRIX_BATCH_SIZE,
+                    matrix_dir: str=WIN_MATRIX_DIR) -> None:
+    player_ids = [int(player_id)
+                  for player_id
+                  in predictor.storage.sorted_player_ids[:player_count]]
+    os.makedirs(matrix_dir, exist_ok=True)
+
+    probabilities = np.lib.format.open_memmap(
+        os.path.join(matrix_dir, "probabilities.npy.tmp"), mode="w+",
+        dtype=dtype, shape=(len(MATRIX_SURFACES), len(player_ids),
+                            len(player_ids))
+    )
+    for surface_idx, surface in enumerate(MATRIX_SURFACES):
+        probabilities[surface_idx] = get_surface_matrix(
+            predictor, player_ids, surface, batch_size)
+        logger.info("Scored %s %s pairs", len(player_ids) ** 2, surface)
+
+    probabilities.flush()
+    del probabilities
+
+    with open(os.path.join(matrix_dir, "player_ids.npy.tmp"), "wb") as file:
+        np.save(file, np.array(player_ids, dtype=np.int64))
+
+    manifest = {
+        "model_version": predictor.model_version,
+        "data_version": predictor.storage.data_version,
+        "dtype": dtype, "player_count": len(player_ids),
+        "surfaces": MATRIX_SURFACES, "context": MATRIX_CONTEXT
+    }
+    with open(os.path.join(matrix_dir, "manifest.json.tmp"), "w") as file:
+        json.dump(manifest, file, indent=2)
+
+    for file_name in ("probabilities.npy", "player_ids.npy", "manifest.json"):
+        os.replace(os.path.join(matrix_dir, f"{file_name}.tmp"),
+                   os.path.join(matrix_dir, file_name))
+
+    logger.info("Saved win probability matrix to %s", matrix_dir)
+
+
+if __name__ == '__main__':
+    from backend.inference import load_predictor
+    from backend.storage import load_storage
+
+    save_win_matrix(load_predictor(load_storage()))
@@ -0,0 +1,31 @@
+import os
+
+import uvicorn
+
+from backend.oblivious_trees import ensure_tree_bundle
+from backend.storage import ensure_feature_store
+from utils.logger import get_logger
+
+logger = get_logger("backend.workers")
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", 8000))
+
+
+def prepare_shared_artifacts() -> None:
+    # Built once here, every worker then maps the same read-only files
+    ensure_feature_store()
+    try:
+        ensure_tree_bundle()
+    except ImportError:
+        logger.warning("catboost is not installed, workers will load "
+                       "the tree bundle as it is")
+
+    os.environ["SHARED_ARTIFACTS"] = "1"
+
+
+if __name__ == '__main__':
+    prepare_shared_artifacts()
+    logger.info("Starting %s workers on %s:%s", WORKERS, HOST, PORT)
+    uvicorn.run("backend.api:app", host=HOST, port=PORT, workers=WORKERS)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional
 
 import numpy as np
 import pandas as pd
@@ -35,12 +35,29 @@ class InGameDataEngineering(FeatureEngineeringBase):
         return self.df
 
     def add_in_game_data(self) -> None:
+        rolling_windows = RollingWindows(
+            self.df[["player_1_id", "player_2_id"]].to_numpy(),
+            get_surface_indexes(self.df), self.last_n_matches
+        )
+        windows = rolling_windows.get_windows(self.get_in_game_values())
+
         col_dict = {}
-        for game_column in self.in_game_columns:
-            self.process_game_column(game_column, col_dict)
+        for stat_idx, game_column in enumerate(self.in_game_columns):
+            stat_windows = {name: values[..., stat_idx]
+                            for name, values in windows.items()}
+            col_dict.update(self.get_in_game_columns_dict(game_column,
+                                                          stat_windows))
 
         self.df = bulk_add(self.df, col_dict)
 
+    def get_in_game_values(self) -> np.ndarray:
+        # (matches, 2, stats), player 1 and player 2 of every match
+        return np.stack([
+            self.df[[f"player_{num}_{game_column}"
+                     for game_column in self.in_game_columns]].to_numpy()
+            for num in (1, 2)
+        ], axis=1)
+
     def add_in_game_diff(self) -> None:
         col_dict = {}
 
@@ -64,155 +81,27 @@ class InGameDataEngineering(FeatureEngineeringBase):
 
         self.df = bulk_add(self.df, col_dict)
 
-    def process_game_column(self, game_column: str, col_dict: dict) -> None:
-        in_game_dict = self.get_final_in_game_dict(game_column)
-        player_index_dict = defaultdict(lambda: 5 * [0])
-
-        last_len = len(self.last_n_matches)
-        last_n = LastN(last_len)
-
-        player_total_val_dict = defaultdict(int)
-        total_val_list_1, total_val_list_2 = [], []
-
-        self.iterate_rows_and_build_features(game_column, in_game_dict,
-                    player_index_dict, last_n, player_total_val_dict,
-                    total_val_list_1, total_val_list_2)
-
-        self.update_cols(game_column, last_n,
-                    total_val_list_1, total_val_list_2, col_dict)
- 
-    def iterate_rows_and_build_features(self, game_column: str,
-            in_game_dict: dict, player_index_dict: defaultdict, last_n: LastN,
-            player_total_val_dict: defaultdict, total_val_list_1: List[int],
-            total_val_list_2: List[int]) -> None:
-        for row in self.df.itertuples():
-            ply_1_id, ply_2_id = row.player_1_id, row.player_2_id
-            ply_1_index_list = player_index_dict[ply_1_id]
-            ply_2_index_list = player_index_dict[ply_2_id]
-
-            handle_total_values(row, game_column, total_val_list_1,
-                  total_val_list_2, ply_1_id, ply_2_id, player_total_val_dict)
-
-            surface_idx = get_surface_index_by_row(row)
-            player_1_list = in_game_dict[ply_1_id]
-            player_2_list = in_game_dict[ply_2_id]
-
-            curr_surface_index_1 = ply_1_index_list[surface_idx]
-            curr_surface_index_2 = ply_2_index_list[surface_idx]
-
-            self.process_time_windows(
-                player_1_list, player_2_list, last_n,
-                ply_1_index_list, ply_2_index_list, surface_idx,
-                curr_surface_index_1, curr_surface_index_2
-            )
-
-            increase_player_indexes(player_index_dict, ply_1_id, ply_2_id,
-                            ply_1_index_list, ply_2_index_list, surface_idx)
-
-    def process_time_windows(self, player_1_list: list, player_2_list: list,
-            last_n: LastN, ply_1_index_list: List[int],
-            ply_2_index_list: List[int], surface_idx: int,
-            curr_surface_index_1: int, curr_surface_index_2: int) -> None:
-        last_len = len(self.last_n_matches)
-
-        for last in range(last_len):
-            append_last_n_lists(player_1_list, player_2_list, last_n, last,
-                    ply_1_index_list, ply_2_index_list, surface_idx,
-                    curr_surface_index_1, curr_surface_index_2)
-
-    def update_cols(self, game_column: str, last_n: LastN,
-            total_val_list_1: List[int], total_val_list_2: List[int],
-            col_dict: dict) -> None:
-        cols = self.get_in_game_columns_dict(game_column, last_n.last_n_1,
-                    last_n.last_n_2, last_n.last_n_surface_1,
-                    last_n.last_n_surface_2, total_val_list_1,
-                    total_val_list_2)
-
-        col_dict.update(cols)
-
     def get_in_game_columns_dict(self, game_column: str,
-        last_n_1: List[List[int]], last_n_2: List[List[int]],
-        last_n_surface_1: List[List[int]], last_n_surface_2: List[List[int]],
-        total_val_list_1: List[int], total_val_list_2: List[int]) -> dict:
+                                 windows: Dict[str, np.ndarray]) -> dict:
         cols = {}
 
         cols.update({
-            f"player_1_{game_column}_total": total_val_list_1,
-            f"player_2_{game_column}_total": total_val_list_2
+            f"player_1_{game_column}_total": windows["total"][:, 0],
+            f"player_2_{game_column}_total": windows["total"][:, 1]
         })
 
-        for last_idx, last in enumerate(self.last_n_matches):
+        for last in self.last_n_matches:
+            surface = windows[f"last_{last}_surface"]
+            overall = windows[f"last_{last}"]
             cols.update({
-                f"player_1_{game_column}_last_{last}_"
-                f"surface": last_n_surface_1[last_idx],
-                f"player_2_{game_column}_last_{last}_"
-                f"surface": last_n_surface_2[last_idx],
-                f"player_1_{game_column}_last_{last}": last_n_1[last_idx],
-                f"player_2_{game_column}_last_{last}": last_n_2[last_idx]
+                f"player_1_{game_column}_last_{last}_surface": surface[:, 0],
+                f"player_2_{game_column}_last_{last}_surface": surface[:, 1],
+                f"player_1_{game_column}_last_{last}": overall[:, 0],
+                f"player_2_{game_column}_last_{last}": overall[:, 1]
             })
 
         return cols
 
-    def get_final_player_dict_over_different_surfaces(self,
-                            game_column: str) -> Dict[int, List[List]]:
-        player_dict_over_surfaces = get_in_game_dict_over_surfaces()
-        self.append_player_dict_over_surfaces(game_column,
-                                              player_dict_over_surfaces)
-        return player_dict_over_surfaces
-
-    def append_player_dict_over_surfaces(self, game_column: str,
-                        player_dict_over_surfaces: defaultdict) -> None:
-        for row in self.df.itertuples():
-            player_1_val, player_2_val = get_in_game_data_by_row(
-                row, game_column)
-            player_1_id, player_2_id = row.player_1_id, row.player_2_id
-
-            surface_idx = get_surface_index_by_row(row)
-            player_dict_over_surfaces[player_1_id][surface_idx].append(
-                player_1_val)
-
-            player_dict_over_surfaces[player_2_id][surface_idx].append(
-                player_2_val)
-
-    def get_final_in_game_dict(self, game_column: str) -> dict:
-        player_dict_over_surfaces = (
-              self.get_final_player_dict_over_different_surfaces(game_column))
-
-        in_game_dict = self.get_in_game_dict(player_dict_over_surfaces)
-        return in_game_dict
-
-    def get_in_game_dict(self,
-                    player_dict: Dict[int, List[List[int]]]) -> dict:
-        in_game_dict = {}
-
-        for player_id in player_dict:
-            player_list = (
-                    self.get_player_in_game_lists(player_dict[player_id])
-            )
-            in_game_dict[player_id] = player_list
-
-        return in_game_dict
-
-    def get_player_in_game_lists(self,curr_in_game: List[List[int]]
-                                 ) -> List[List[List[int]]]:
-        player_in_game_list = [[[] for _ in
-                    range(len(self.last_n_matches))] for _ in range(4)]
-        # Inside every surface list, there are last n matches data
-
-        for surface_idx, surface_data in enumerate(curr_in_game):
-            curr_len = len(surface_data)
-            for last_idx, last_n in enumerate(self.last_n_matches):
-                for match_idx in range(curr_len):
-                    first = max(match_idx - last_n, 0)
-
-                    player_in_game_list[surface_idx][last_idx].append(
-                        sum(
-                            surface_data[first:match_idx]
-                        )
-                    )
-
-        return player_in_game_list
-
 
 class PlayerStatsEngineering(FeatureEngineeringBase):
     def apply_feature_engineering(self) -> pd.DataFrame:
@@ -261,6 +150,11 @@ class PhysicalEngineering(FeatureEngineeringBase):
 
 
 class HeadToHeadEngineering(FeatureEngineeringBase):
+    def __init__(self, df: pd.DataFrame,
+                 match_history: Optional[MatchHistory]=None):
+        super().__init__(df)
+        self.match_history = match_history or MatchHistory(df, ())
+
     def apply_feature_engineering(self) -> pd.DataFrame:
         self.add_head_to_head_features()
         return self.df
@@ -272,60 +166,15 @@ class HeadToHeadEngineering(FeatureEngineeringBase):
         self.add_surface_head_to_head_won()
         self.add_surface_head_to_head_diff()
 
-    def add_head_to_head_won(self) -> defaultdict:
-        h2h_dict = defaultdict(lambda: [0, 0])
-        player_1_h2h_won, player_2_h2h_won = [], []
-
-        for row in self.df.itertuples():
-            player_1_id, player_2_id = row.player_1_id, row.player_2_id
-            player_1_won = row.player_1_won
-
-            key, first, second = get_h2h_params(player_1_id,
-                                                player_2_id, h2h_dict)
-
-            player_1_h2h_won.append(h2h_dict[key][first])
-            player_2_h2h_won.append(h2h_dict[key][second])
-
-            if player_1_won: h2h_dict[key][first] += 1
-            else: h2h_dict[key][second] += 1
-
-        self.df["player_1_h2h_won"] = player_1_h2h_won
-        self.df["player_2_h2h_won"] = player_2_h2h_won
-
-        return h2h_dict
+    def add_head_to_head_won(self) -> None:
+        self.match_history.add_columns(self.df, "h2h_won")
 
     def add_head_to_head_diff(self) -> None:
         self.df["h2h_diff"] = (self.df["player_1_h2h_won"]
                        - self.df["player_2_h2h_won"])
 
-    def add_surface_head_to_head_won(self) -> defaultdict:
-        surface_h2h_dict = defaultdict(lambda: [[0, 0], [0, 0],
-                                                [0, 0], [0, 0]])
-        player_1_surface_h2h_won, player_2_surface_h2h_won = [], []
-
-        for row in self.df.itertuples():
-            player_1_id, player_2_id = row.player_1_id, row.player_2_id
-            player_1_won = row.player_1_won
-
-            key, first, second = get_h2h_params(player_1_id,
-                                                player_2_id, surface_h2h_dict)
-
-            surface_idx = get_surface_index_by_row(row)
-
-            player_1_surface_h2h_won.append(surface_h2h_dict
-                                            [key][surface_idx][first])
-            player_2_surface_h2h_won.append(surface_h2h_dict
-                                            [key][surface_idx][second])
-
-            if player_1_won:
-                surface_h2h_dict[key][surface_idx][first] += 1
-            else:
-                surface_h2h_dict[key][surface_idx][second] += 1
-
-        self.df["player_1_surface_h2h_won"] = player_1_surface_h2h_won
-        self.df["player_2_surface_h2h_won"] = player_2_surface_h2h_won
-
-        return surface_h2h_dict
+    def add_surface_head_to_head_won(self) -> None:
+        self.match_history.add_columns(self.df, "surface_h2h_won")
 
     def add_surface_head_to_head_diff(self) -> None:
         self.df["surface_h2h_diff"] = (self.df["player_1_surface_h2h_won"]
@@ -333,108 +182,21 @@ class HeadToHeadEngineering(FeatureEngineeringBase):
 
 
 class MatchDataEngineering(FeatureEngineeringBase):
-    def __init__(self, df: pd.DataFrame, last_n_matches: tuple):
+    def __init__(self, df: pd.DataFrame, last_n_matches: tuple,
+                 match_history: Optional[MatchHistory]=None):
         super().__init__(df)
         self.last_n_matches = last_n_matches
+        self.match_history = (match_history
+                              or MatchHistory(df, last_n_matches))
 
     def apply_feature_engineering(self) -> pd.DataFrame:
         self.add_won_match_data()
         return self.df
 
-    def add_won_match_data(self) -> defaultdict:
-        match_dt = defaultdict(lambda: [0, 0]
-            + len(self.last_n_matches) * [0])
-        # index 0 won, 1 total, then last_n_matches results
-        player_1_won_match, player_2_won_match = [], []
-        player_1_total_match, player_2_total_match = [], []
-        last_won_matches_1, last_won_matches_2 = [], []
-
-        for row in self.df.itertuples():
-            player_1_id, player_2_id = row.player_1_id, row.player_2_id
-            player_1_won = row.player_1_won
-
-            self.append(match_dt, player_1_id, player_2_id,
-                    player_1_won_match, player_2_won_match,
-                    player_1_total_match, player_2_total_match,
-                    last_won_matches_1, last_won_matches_2)
-
-            self.update_matches_dict(match_dt, player_1_id,
-                                     player_2_id, player_1_won)
-
-        self.update_won_match(player_1_won_match, player_2_won_match)
-        self.update_total_match(player_1_total_match, player_2_total_match)
-        self.update_last_won_matches(last_won_matches_1, last_won_matches_2)
-
-        return match_dt
-
-    def update_last_won_matches(self, last_won_matches_1: List[List[int]],
-                                last_won_matches_2: List[List[int]]):
-        last_won_matches_1 = list(zip(*last_won_matches_1))
-        last_won_matches_2 = list(zip(*last_won_matches_2))
-
-        for idx, num in enumerate(self.last_n_matches):
-            self.df[f"player_1_last_{num}_match_won"] = (
-                last_won_matches_1[idx])
-
-            self.df[f"player_2_last_{num}_match_won"] = (
-                last_won_matches_2[idx])
-
-    def append(self, match_dt: defaultdict, player_1_id: int,
-            player_2_id: int,player_1_won_match: List[int],
-            player_2_won_match: List[int],player_1_total_match:  List[int],
-            player_2_total_match: List[int],
-            last_won_matches_1: List[List[int]],
-            last_won_matches_2: List[List[int]]) -> None:
-        self.append_won_match(match_dt, player_1_id, player_2_id,
-                              player_1_won_match, player_2_won_match)
-
-        self.append_total_match(match_dt, player_1_id, player_2_id,
-                                player_1_total_match, player_2_total_match)
-
-        self.append_last_won_matches(match_dt, player_1_id, player_2_id,
-                                     last_won_matches_1, last_won_matches_2)
-
-    def update_won_match(self, player_1_won_match: List[int],
-                         player_2_won_match: List[int]) -> None:
-        self.df["player_1_won_match"] = player_1_won_match
-        self.df["player_2_won_match"] = player_2_won_match
-
-    def update_total_match(self, player_1_total_match: List[int],
-                           player_2_total_match: List[int]) -> None:
-        self.df["player_1_total_match"] = player_1_total_match
-        self.df["player_2_total_match"] = player_2_total_match
-
-    def append_won_match(self, match_dt: defaultdict, player_1_id: int,
-            player_2_id: int, player_1_won_match: List[int],
-            player_2_won_match: List[int]) -> None:
-        player_1_won_match.append(match_dt[player_1_id][0])
-        player_2_won_match.append(match_dt[player_2_id][0])
-
-    def append_total_match(self, match_dt: defaultdict, player_1_id: int,
-            player_2_id: int, player_1_total_match: List[int],
-            player_2_total_match: List[int]) -> None:
-        player_1_total_match.append(match_dt[player_1_id][1])
-        player_2_total_match.append(match_dt[player_2_id][1])
-
-    def append_last_won_matches(self, match_dt: defaultdict, player_1_id: int,
-                        player_2_id: int, last_won_matches_1: List[list],
-                                last_won_matches_2: List[list]):
-        curr_data_1, curr_data_2 = [], []
-        for match_idx, num in enumerate(self.last_n_matches, start=2):
-            match_data = get_last_won_match_data(match_dt, player_1_id,
-                                                player_2_id, match_idx)
-
-            curr_data_1.append(match_data[0])
-            curr_data_2.append(match_data[1])
-
-        last_won_matches_1.append(curr_data_1)
-        last_won_matches_2.append(curr_data_2)
-
-    def update_matches_dict(self, match_dt: defaultdict, player_1_id: int,
-                            player_2_id: int, player_1_won: bool) -> None:
-        update_match_dict(match_dt, player_1_won,
-                          player_1_id, player_2_id,
-                          self.last_n_matches)
+    def add_won_match_data(self) -> None:
+        for column_name in ("won_match", "total_match", *(
+                f"last_{num}_match_won" for num in self.last_n_matches)):
+            self.match_history.add_columns(self.df, column_name)
 
 
 class MatchFeatureDifferenceEngineering(FeatureEngineeringBase):
@@ -518,11 +280,26 @@ class WinRatioEngineering(FeatureEngineeringBase):
 
 
 class EloEngineering(FeatureEngineeringBase):
-    def __init__(self, df: pd.DataFrame, last_n_matches: tuple, K: int=24):
+    def __init__(self, df: pd.DataFrame, last_n_matches: tuple, K: int=24,
+                 elo_ratings: Optional[EloRatings]=None,
+                 match_history: Optional[MatchHistory]=None):
         super().__init__(df)
         self.last_n_matches = last_n_matches
         self.K = K
 
+        # Ratings computed for a grid of Ks can be shared between runs,
+        # K has to be one of elo_ratings.Ks
+        if match_history is None:
+            match_history = MatchHistory(df, last_n_matches, K, elo_ratings)
+        elif match_history.K != K:
+            raise ValueError(f"Match history was built for K="
+                             f"{match_history.K}, not K={K}!")
+        elif elo_ratings is not None and (
+                match_history.elo_ratings is not elo_ratings):
+            raise ValueError("Match history uses other Elo ratings!")
+
+        self.match_history = match_history
+
     def apply_feature_engineering(self) -> pd.DataFrame:
         self.add_elo_features()
         return self.df
@@ -534,25 +311,18 @@ class EloEngineering(FeatureEngineeringBase):
         self.add_elo_surface()
         self.add_elo_surface_diff()
 
-        self.add_elo_progress_column()
         self.add_last_matches_elo_progress()
         self.add_last_matches_elo_progress_diff()
 
     def add_elo(self) -> None:
-        player_1_elos, player_2_elos = get_elos(self.df, self.K)
-
-        self.df["player_1_elo"] = player_1_elos
-        self.df["player_2_elo"] = player_2_elos
+        self.match_history.add_columns(self.df, "elo")
 
     def add_elo_diff(self) -> None:
         self.df["elo_diff"] = (self.df["player_1_elo"]
                                - self.df["player_2_elo"])
 
     def add_elo_surface(self) -> None:
-        player_1_elos, player_2_elos = get_elo_surfaces(self.df, self.K)
-
-        self.df["player_1_elo_surface"] = player_1_elos
-        self.df["player_2_elo_surface"] = player_2_elos
+        self.match_history.add_columns(self.df, "elo_surface")
 
     def add_elo_surface_diff(self) -> None:
         self.df["elo_surface_diff"] = (
@@ -560,28 +330,15 @@ class EloEngineering(FeatureEngineeringBase):
                 - self.df["player_2_elo_surface"]
         )
 
-    def add_elo_progress_column(self) -> None:
-        for num in self.last_n_matches:
-            self.df[f"player_1_last_{num}_elo_progress"] = 0.0
-            self.df[f"player_2_last_{num}_elo_progress"] = 0.0
-
     def add_last_matches_elo_progress(self) -> None:
-        players_elo_history = defaultdict(lambda: [])
-        for row in self.df.itertuples():
-            row_idx = row.Index
-            player_1_id, player_2_id = row.player_1_id, row.player_2_id
-            player_1_elo, player_2_elo = row.player_1_elo, row.player_2_elo
-
-            for last_n in self.last_n_matches:
-                player_1_history = players_elo_history[player_1_id]
-                player_2_history = players_elo_history[player_2_id]
-
-                self.set_players_elo_progress(players_elo_history,
-                    player_1_history, player_2_history, last_n,
-                    player_1_id, player_2_id, row_idx)
+        col_dict = {}
+        for last in self.last_n_matches:
+            progress = self.match_history.get_column(
+                f"last_{last}_elo_progress")
+            col_dict[f"player_1_last_{last}_elo_progress"] = progress[:, 0]
+            col_dict[f"player_2_last_{last}_elo_progress"] = progress[:, 1]
 
-            append_players_elo_progress(players_elo_history, player_1_id,
-                                    player_2_id, player_1_elo, player_2_elo)
+        self.df = bulk_add(self.df, col_dict)
 
     def add_last_matches_elo_progress_diff(self):
         for last in self.last_n_matches:
@@ -590,51 +347,34 @@ class EloEngineering(FeatureEngineeringBase):
                     - self.df[f"player_2_last_{last}_elo_progress"]
             )
 
-    def set_players_elo_progress(self, players_elo_history: defaultdict,
-                player_1_history: List[float], player_2_history: List[float],
-                last_n: int, player_1_id: int, player_2_id: int, row_idx):
-        self.handle_player_elo_progress(players_elo_history,
-                                        player_1_history, player_1_id,
-                                        last_n, 1, row_idx)
-
-        self.handle_player_elo_progress(players_elo_history,
-                                        player_2_history, player_2_id,
-                                        last_n, 2, row_idx)
-
-    def handle_player_elo_progress(self, players_elo_history: defaultdict,
-                player_history: List[float], player_id: int, last_n: int,
-                player_num: int, row_idx) -> None:
-        if not player_history:
-            new_progress = 0
-
-        elif last_n > len(players_elo_history[player_id]):
-            new_progress = player_history[-1] / player_history[0]
-
-        else:
-            new_progress = (player_history[-1]
-                            / player_history[len(player_history) - last_n])
-
-        self.df.at[row_idx, (f"player_{player_num}_last_{last_n}"
-                             "_elo_progress")] = new_progress
-
 
 class FeatureEngineeringDf(FeatureEngineeringBase):
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, K: int=24,
+                 elo_ratings: Optional[EloRatings]=None):
         super().__init__(df)
         self.df = df.sort_values(["tourney_year", "tourney_month",
                                        "tourney_day"])
         self.last_n_matches = (5, 10, 20, 50)
+        self.K = K
+
+        # One pass for head to head and match data, shared with the Elo
+        # step. Ratings passed in have to be built from the sorted df
+        match_history = MatchHistory(self.df, self.last_n_matches, K,
+                                     elo_ratings)
+
         self.feature_engineering_steps = [
             PlayerStatsEngineering(self.df).apply_feature_engineering,
 
             PhysicalEngineering(self.df).apply_feature_engineering,
 
-            HeadToHeadEngineering(self.df).apply_feature_engineering,
+            (HeadToHeadEngineering(self.df, match_history)
+             .apply_feature_engineering),
 
             (InGameDataEngineering(self.df, self.last_n_matches)
              .apply_feature_engineering),
 
-            (MatchDataEngineering(self.df, self.last_n_matches)
+            (MatchDataEngineering(self.df, self.last_n_matches,
+                                  match_history)
             .apply_feature_engineering),
 
             (MatchFeatureDifferenceEngineering(self.df, self.last_n_matches)
@@ -643,7 +383,8 @@ class FeatureEngineeringDf(FeatureEngineeringBase):
             (WinRatioEngineering(self.df, self.last_n_matches)
              .apply_feature_engineering),
 
-            (EloEngineering(self.df, self.last_n_matches)
+            (EloEngineering(self.df, self.last_n_matches, K, elo_ratings,
+                            match_history)
              .apply_feature_engineering)
         ]
 
@@ -657,6 +398,8 @@ class FeatureEngineeringDf(FeatureEngineeringBase):
 
 
 if __name__ == '__main__':
+    from time import perf_counter
+
     from data_processing.random_forest import CleanRandomForestDf
     from utils.dataframe import shuffle_winner_loser_data
 
@@ -666,9 +409,13 @@ if __name__ == '__main__':
     df = cleaner.df
     shuffled_df = shuffle_winner_loser_data(df)
 
+    start = perf_counter()
     feature_engineering = FeatureEngineeringDf(shuffled_df)
     feature_engineering.apply_feature_engineering()
 
     df = feature_engineering.df
+    logger.info("Feature engineering for %s matches took %.2f s", len(df),
+                perf_counter() - start)
+
     print(df.info())
     print(list(df.columns))
\ No newline at end of file
@@ -0,0 +1,944 @@
+# The feature engineering pipeline before the in-game windows, the Elo
+# engine and the match history were vectorized or fused, helpers included.
+# Every row is processed in Python, the fused pipeline has to reproduce it
+from abc import ABC, abstractmethod
+from typing import Tuple, List, Dict, Any
+from collections import defaultdict
+from enum import IntEnum, auto
+
+import numpy as np
+import pandas as pd
+
+
+def get_elos(df: pd.DataFrame, K: int) -> Tuple[list, list]:
+    elo_rating = defaultdict(lambda: 1500)
+    player_1_elos = []
+    player_2_elos = []
+
+    for row in df.itertuples(index=False):
+        player_1_id, player_2_id = row.player_1_id, row.player_2_id
+        player_1_won = row.player_1_won
+
+        append_elos(player_1_elos, player_2_elos, player_1_id,
+                    player_2_id, elo_rating)
+        update_elo(elo_rating, player_1_won, K, player_1_id, player_2_id)
+
+    return player_1_elos, player_2_elos
+
+
+class AutoZeroEnum(IntEnum):
+    def _generate_next_value_(name, start, count, last_values):
+        return count
+
+
+class Surface(AutoZeroEnum):
+    CARPET = auto()
+    CLAY = auto()
+    GRASS = auto()
+    HARD = auto()
+
+
+def get_surface_index(carpet: bool, clay: bool, grass: bool) -> int:
+    if carpet: return Surface.CARPET.value
+    if clay: return Surface.CLAY.value
+    if grass: return Surface.GRASS.value
+    else: return Surface.HARD.value
+
+
+def get_in_game_data_by_row(row, column: str) -> Tuple[int, int]:
+    player_1_column  = f"player_1_{column}"
+    player_2_column = f"player_2_{column}"
+
+    player_1_val = getattr(row, player_1_column)
+    player_2_val = getattr(row, player_2_column)
+    return player_1_val, player_2_val
+
+
+def get_in_game_dict_over_surfaces() -> defaultdict:
+    base_dict = defaultdict(lambda: [[] for _ in range(4)])
+    # {"player_id": [carpet_values], [clay_values].....}
+    return base_dict
+
+
+def handle_total_values(row: Tuple[Any, ...], game_column: str,
+            total_val_list_1: List[int], total_val_list_2: List[int],
+            ply_1_id: int, ply_2_id: int,
+            player_total_val_dict: defaultdict) -> None:
+    player_1_val, player_2_val = get_in_game_data_by_row(row,
+                                                         game_column)
+
+    total_val_list_1.append(player_total_val_dict[ply_1_id])
+    total_val_list_2.append(player_total_val_dict[ply_2_id])
+
+    player_total_val_dict[ply_1_id] += player_1_val
+    player_total_val_dict[ply_2_id] += player_2_val
+
+
+def get_last_n_lists(last_len: int) -> tuple[List[List], List[List]]:
+    last_n_1 = [[] for _ in range(last_len)]
+    last_n_2 = [[] for _ in range(last_len)]
+    return last_n_1, last_n_2
+
+
+def get_last_n_surface_lists(last_len: int) -> tuple[List[List], List[List]]:
+    last_n_surface_1 = [[] for _ in range(last_len)]
+    last_n_surface_2 = [[] for _ in range(last_len)]
+    return last_n_surface_1, last_n_surface_2
+
+
+def get_last_n_sum(last: int,
+            player_list: List[List[List[int]]],
+            ply_index_list: List[int]):
+    last_n_sum = 0
+    for ply_idx, ply in enumerate(player_list):
+        curr_ply_index = ply_index_list[ply_idx]
+        if len(ply[last]) == 0:
+            continue
+
+        elif len(ply[last]) == curr_ply_index:
+            last_n_sum += ply[last][-1]
+
+        else:
+            last_n_sum += ply[last][curr_ply_index]
+
+    return last_n_sum
+
+
+class LastN:
+    def __init__(self, last_len: int):
+        self.last_n_1, self.last_n_2 = get_last_n_lists(last_len)
+        self.last_n_surface_1, self.last_n_surface_2 = (
+            get_last_n_surface_lists(last_len))
+
+
+def append_last_n_lists(player_1_list: list, player_2_list: list,
+                    last_n: LastN, last: int, ply_1_index_list: List[int],
+                    ply_2_index_list: List[int], surface_idx: int,
+                    curr_surface_index_1: int, curr_surface_index_2: int):
+    last_n_sum_1 = get_last_n_sum(last, player_1_list,
+                                  ply_1_index_list)
+    last_n_sum_2 = get_last_n_sum(last, player_2_list,
+                                  ply_2_index_list)
+
+    last_n.last_n_surface_1[last].append(
+        player_1_list[surface_idx][last][curr_surface_index_1]
+    )
+
+    last_n.last_n_surface_2[last].append(
+        player_2_list[surface_idx][last][curr_surface_index_2]
+    )
+
+    last_n.last_n_1[last].append(
+        last_n_sum_1
+    )
+
+    last_n.last_n_2[last].append(
+        last_n_sum_2
+    )
+
+
+def bulk_add(df: pd.DataFrame,
+             col_dict: dict[str, List[int]]) -> pd.DataFrame:
+    df[list(col_dict.keys())] = pd.DataFrame(col_dict, index=df.index)
+    return df
+
+
+def increase_player_indexes(player_index_dict: Dict[int, List[int]],
+                       ply_1_id: int, ply_2_id: int,
+                       ply_1_list: List[int],ply_2_list: List[int],
+                       surface_idx: int) -> None:
+    carpet_idx_1, clay_idx_1, grass_idx_1, hard_idx_1 = ply_1_list[:4]
+    carpet_idx_2, clay_idx_2, grass_idx_2, hard_idx_2 = ply_2_list[:4]
+    total_idx_1, total_idx_2 = ply_1_list[4], ply_2_list[4]
+
+    carpet_idx_1, clay_idx_1, grass_idx_1, hard_idx_1 = (
+        get_new_surface_indexes(carpet_idx_1, clay_idx_1,
+                                grass_idx_1, hard_idx_1, surface_idx))
+
+    carpet_idx_2, clay_idx_2, grass_idx_2, hard_idx_2 = (
+        get_new_surface_indexes(carpet_idx_2, clay_idx_2,
+                                grass_idx_2, hard_idx_2, surface_idx))
+
+    player_index_dict[ply_1_id] = [carpet_idx_1, clay_idx_1,
+                                   grass_idx_1, hard_idx_1, total_idx_1 + 1]
+    player_index_dict[ply_2_id] = [carpet_idx_2, clay_idx_2,
+                                   grass_idx_2, hard_idx_2, total_idx_2 + 1]
+
+
+def get_new_surface_indexes(carpet_idx: int, clay_idx: int,grass_idx: int,
+                hard_idx: int, surface_idx: int) -> Tuple[int, int, int, int]:
+    if surface_idx == 0: carpet_idx += 1
+    elif surface_idx == 1: clay_idx += 1
+    elif surface_idx == 2: grass_idx += 1
+    else: hard_idx += 1
+    return carpet_idx, clay_idx, grass_idx, hard_idx
+
+
+def get_surface_index_by_row(row: pd.DataFrame.itertuples) -> int:
+    carpet, clay = row.surface_Carpet, row.surface_Clay
+    grass, hard = row.surface_Grass, row.surface_Hard
+    surface_idx = get_surface_index(carpet, clay, grass)
+    return surface_idx
+
+
+def append_elo_surfaces(player_1_elos: list, player_2_elos: list,
+                player_1_id: int, player_2_id: int,
+                elo_rating, surface_idx: int) -> None:
+    player_1_elos.append(elo_rating[player_1_id][surface_idx])
+    player_2_elos.append(elo_rating[player_2_id][surface_idx])
+
+
+def update_elo_surface(elo_rating: dict, player_1_won: bool, K: int,
+            player_1_id: int, player_2_id: int, surface_idx: int) -> None:
+    actual_score_1 = 1 if player_1_won else 0
+    actual_score_2 = 1 - actual_score_1
+
+    expected_score_1 = get_expected_score(
+        elo_rating[player_1_id] [surface_idx],
+        elo_rating[player_2_id][surface_idx]
+    )
+    expected_score_2 = 1 - expected_score_1
+
+    elo_rating[player_1_id][surface_idx] += K * (actual_score_1
+                                                 - expected_score_1)
+    elo_rating[player_2_id][surface_idx] += K * (actual_score_2
+                                                 - expected_score_2)
+
+
+def get_elo_surfaces(df: pd.DataFrame, K: int) -> Tuple[list, list]:
+    elo_rating = defaultdict(lambda: [1500, 1500, 1500, 1500])
+    # carpet, clay, grass, hard
+
+    player_1_elos = []
+    player_2_elos = []
+
+    for row in df.itertuples(index=False):
+        surface_idx = get_surface_index_by_row(row)
+
+        player_1_id, player_2_id = row.player_1_id, row.player_2_id
+        player_1_won = row.player_1_won
+
+        append_elo_surfaces(player_1_elos, player_2_elos, player_1_id,
+                    player_2_id, elo_rating, surface_idx)
+        update_elo_surface(elo_rating, player_1_won, K, player_1_id,
+                           player_2_id, surface_idx)
+
+    return player_1_elos, player_2_elos
+
+
+def update_elo(elo_rating: dict, player_1_won: bool, K: int, player_1_id: int,
+               player_2_id: int) -> None:
+    actual_score_1 = 1 if player_1_won else 0
+    actual_score_2 = 1 - actual_score_1
+
+    expected_score_1 = get_expected_score(elo_rating[player_1_id],
+                                          elo_rating[player_2_id])
+    expected_score_2 = 1 - expected_score_1
+
+    elo_rating[player_1_id] += K * (actual_score_1 - expected_score_1)
+    elo_rating[player_2_id] += K * (actual_score_2 - expected_score_2)
+
+
+def get_expected_score(player_1_elo: float, player_2_elo: float) -> float:
+    return 1 / (1 + 10 ** ((player_2_elo - player_1_elo) / 400))
+
+
+def append_elos(player_1_elos: list, player_2_elos: list, player_1_id: int,
+                player_2_id: int, elo_rating) -> None:
+    player_1_elos.append(elo_rating[player_1_id])
+    player_2_elos.append(elo_rating[player_2_id])
+
+
+def update_match_dict(match_dt: defaultdict, player_1_won: bool,
+                      player_1_id: int, player_2_id: int,
+                      last_n_matches: tuple) -> None:
+    if player_1_won:
+        match_dt[player_1_id][0] += 1
+        for i, num in enumerate(last_n_matches, start=2):
+            match_dt[player_1_id][i] = min(match_dt[player_1_id][i] + 1, num)
+            match_dt[player_2_id][i] = max(match_dt[player_2_id][i] - 1, 0)
+
+    else:
+        match_dt[player_2_id][0] += 1
+        for i, num in enumerate(last_n_matches, start=2):
+            match_dt[player_2_id][i] = min(match_dt[player_2_id][i] + 1, num)
+            match_dt[player_1_id][i] = max(match_dt[player_1_id][i] - 1, 0)
+
+    match_dt[player_1_id][1] += 1
+    match_dt[player_2_id][1] += 1
+
+
+def append_players_elo_progress(players_elo_history: defaultdict,
+                                player_1_id: int, player_2_id: int,
+                                player_1_elo: float,
+                                player_2_elo: float) -> None:
+    append_player_elo_progress(players_elo_history, player_1_id, player_1_elo)
+    append_player_elo_progress(players_elo_history, player_2_id, player_2_elo)
+
+
+def append_player_elo_progress(players_elo_history: defaultdict,
+            player_id: int, player_elo: float) -> None:
+    players_elo_history[player_id].append(player_elo)
+
+
+def get_h2h_params(player_1_id: int, player_2_id: int,
+                   h2h_dict: defaultdict) -> Tuple[tuple, int, int]:
+    if (player_2_id, player_1_id) in h2h_dict:
+        key = (player_2_id, player_1_id)
+        first, second = 1, 0
+
+    else:
+        key = (player_1_id, player_2_id)
+        first, second = 0, 1
+
+    return key, first, second
+
+
+def get_last_won_match_data(match_dt: defaultdict, player_1_id: int,
+        player_2_id: int, match_idx: int) -> Tuple[int, int]:
+    return (match_dt[player_1_id][match_idx],
+            match_dt[player_2_id][match_idx])
+
+class FeatureEngineeringBase(ABC):
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+
+    @abstractmethod
+    def apply_feature_engineering(self) -> pd.DataFrame:
+        pass
+
+
+class InGameDataEngineering(FeatureEngineeringBase):
+    def __init__(self, df: pd.DataFrame, last_n_matches: Tuple[int]):
+        super().__init__(df)
+        self.last_n_matches = last_n_matches
+        self.in_game_columns = (
+            "ace", "df", "svpt", "1stIn",
+            "1stWon", "2ndWon", "SvGms",
+            "bpSaved", "bpFaced"
+        )
+
+    def apply_feature_engineering(self) -> pd.DataFrame:
+        self.add_in_game_data()
+        self.add_in_game_diff()
+        return self.df
+
+    def add_in_game_data(self) -> None:
+        col_dict = {}
+        for game_column in self.in_game_columns:
+            self.process_game_column(game_column, col_dict)
+
+        self.df = bulk_add(self.df, col_dict)
+
+    def add_in_game_diff(self) -> None:
+        col_dict = {}
+
+        for game_column in self.in_game_columns:
+            col_dict[f"{game_column}_total_diff"] = (
+                self.df[f"player_1_{game_column}_total"]
+                - self.df[f"player_2_{game_column}_total"]
+            )
+
+            for last in self.last_n_matches:
+                col_dict[f"{game_column}_last_{last}_surface_diff"] = (
+                        self.df[f"player_1_{game_column}_"
+                                f"last_{last}_surface"]
+                        - self.df[f"player_2_{game_column}"
+                                  f"_last_{last}_surface"]
+                )
+                col_dict[f"{game_column}_last_{last}_diff"] = (
+                        self.df[f"player_1_{game_column}_last_{last}"]
+                        - self.df[f"player_2_{game_column}_last_{last}"]
+                )
+
+        self.df = bulk_add(self.df, col_dict)
+
+    def process_game_column(self, game_column: str, col_dict: dict) -> None:
+        in_game_dict = self.get_final_in_game_dict(game_column)
+        player_index_dict = defaultdict(lambda: 5 * [0])
+
+        last_len = len(self.last_n_matches)
+        last_n = LastN(last_len)
+
+        player_total_val_dict = defaultdict(int)
+        total_val_list_1, total_val_list_2 = [], []
+
+        self.iterate_rows_and_build_features(game_column, in_game_dict,
+                    player_index_dict, last_n, player_total_val_dict,
+                    total_val_list_1, total_val_list_2)
+
+        self.update_cols(game_column, last_n,
+                    total_val_list_1, total_val_list_2, col_dict)
+ 
+    def iterate_rows_and_build_features(self, game_column: str,
+            in_game_dict: dict, player_index_dict: defaultdict, last_n: LastN,
+            player_total_val_dict: defaultdict, total_val_list_1: List[int],
+            total_val_list_2: List[int]) -> None:
+        for row in self.df.itertuples():
+            ply_1_id, ply_2_id = row.player_1_id, row.player_2_id
+            ply_1_index_list = player_index_dict[ply_1_id]
+            ply_2_index_list = player_index_dict[ply_2_id]
+
+            handle_total_values(row, game_column, total_val_list_1,
+                  total_val_list_2, ply_1_id, ply_2_id, player_total_val_dict)
+
+            surface_idx = get_surface_index_by_row(row)
+            player_1_list = in_game_dict[ply_1_id]
+            player_2_list = in_game_dict[ply_2_id]
+
+            curr_surface_index_1 = ply_1_index_list[surface_idx]
+            curr_surface_index_2 = ply_2_index_list[surface_idx]
+
+            self.process_time_windows(
+                player_1_list, player_2_list, last_n,
+                ply_1_index_list, ply_2_index_list, surface_idx,
+                curr_surface_index_1, curr_surface_index_2
+            )
+
+            increase_player_indexes(player_index_dict, ply_1_id, ply_2_id,
+                            ply_1_index_list, ply_2_index_list, surface_idx)
+
+    def process_time_windows(self, player_1_list: list, player_2_list: list,
+            last_n: LastN, ply_1_index_list: List[int],
+            ply_2_index_list: List[int], surface_idx: int,
+            curr_surface_index_1: int, curr_surface_index_2: int) -> None:
+        last_len = len(self.last_n_matches)
+
+        for last in range(last_len):
+            append_last_n_lists(player_1_list, player_2_list, last_n, last,
+                    ply_1_index_list, ply_2_index_list, surface_idx,
+                    curr_surface_index_1, curr_surface_index_2)
+
+    def update_cols(self, game_column: str, last_n: LastN,
+            total_val_list_1: List[int], total_val_list_2: List[int],
+            col_dict: dict) -> None:
+        cols = self.get_in_game_columns_dict(game_column, last_n.last_n_1,
+                    last_n.last_n_2, last_n.last_n_surface_1,
+                    last_n.last_n_surface_2, total_val_list_1,
+                    total_val_list_2)
+
+        col_dict.update(cols)
+
+    def get_in_game_columns_dict(self, game_column: str,
+        last_n_1: List[List[int]], last_n_2: List[List[int]],
+        last_n_surface_1: List[List[int]], last_n_surface_2: List[List[int]],
+        total_val_list_1: List[int], total_val_list_2: List[int]) -> dict:
+        cols = {}
+
+        cols.update({
+            f"player_1_{game_column}_total": total_val_list_1,
+            f"player_2_{game_column}_total": total_val_list_2
+        })
+
+        for last_idx, last in enumerate(self.last_n_matches):
+            cols.update({
+                f"player_1_{game_column}_last_{last}_"
+                f"surface": last_n_surface_1[last_idx],
+                f"player_2_{game_column}_last_{last}_"
+                f"surface": last_n_surface_2[last_idx],
+                f"player_1_{game_column}_last_{last}": last_n_1[last_idx],
+                f"player_2_{game_column}_last_{last}": last_n_2[last_idx]
+            })
+
+        return cols
+
+    def get_final_player_dict_over_different_surfaces(self,
+                            game_column: str) -> Dict[int, List[List]]:
+        player_dict_over_surfaces = get_in_game_dict_over_surfaces()
+        self.append_player_dict_over_surfaces(game_column,
+                                              player_dict_over_surfaces)
+        return player_dict_over_surfaces
+
+    def append_player_dict_over_surfaces(self, game_column: str,
+                        player_dict_over_surfaces: defaultdict) -> None:
+        for row in self.df.itertuples():
+            player_1_val, player_2_val = get_in_game_data_by_row(
+                row, game_column)
+            player_1_id, player_2_id = row.player_1_id, row.player_2_id
+
+            surface_idx = get_surface_index_by_row(row)
+            player_dict_over_surfaces[player_1_id][surface_idx].append(
+                player_1_val)
+
+            player_dict_over_surfaces[player_2_id][surface_idx].append(
+                player_2_val)
+
+    def get_final_in_game_dict(self, game_column: str) -> dict:
+        player_dict_over_surfaces = (
+              self.get_final_player_dict_over_different_surfaces(game_column))
+
+        in_game_dict = self.get_in_game_dict(player_dict_over_surfaces)
+        return in_game_dict
+
+    def get_in_game_dict(self,
+                    player_dict: Dict[int, List[List[int]]]) -> dict:
+        in_game_dict = {}
+
+        for player_id in player_dict:
+            player_list = (
+                    self.get_player_in_game_lists(player_dict[player_id])
+            )
+            in_game_dict[player_id] = player_list
+
+        return in_game_dict
+
+    def get_player_in_game_lists(self,curr_in_game: List[List[int]]
+                                 ) -> List[List[List[int]]]:
+        player_in_game_list = [[[] for _ in
+                    range(len(self.last_n_matches))] for _ in range(4)]
+        # Inside every surface list, there are last n matches data
+
+        for surface_idx, surface_data in enumerate(curr_in_game):
+            curr_len = len(surface_data)
+            for last_idx, last_n in enumerate(self.last_n_matches):
+                for match_idx in range(curr_len):
+                    first = max(match_idx - last_n, 0)
+
+                    player_in_game_list[surface_idx][last_idx].append(
+                        sum(
+                            surface_data[first:match_idx]
+                        )
+                    )
+
+        return player_in_game_list
+
+
+class PlayerStatsEngineering(FeatureEngineeringBase):
+    def apply_feature_engineering(self) -> pd.DataFrame:
+        self.add_rank_feature_differences()
+        self.add_seed_diff()
+        self.add_original_rank_diff()
+        return self.df
+
+    def add_rank_feature_differences(self) -> None:
+        self.add_rank_diff()
+        self.add_rank_points_diff()
+
+    def add_seed_diff(self) -> None:
+        self.df["seed_diff"] = (self.df["player_1_seed"]
+                            - self.df["player_2_seed"])
+
+    def add_rank_diff(self) -> None:
+        self.df["rank_diff"] = (self.df["player_1_rank"]
+                            - self.df["player_2_rank"])
+
+    def add_rank_points_diff(self) -> None:
+        self.df["rank_points_diff"] = (self.df["player_1_rank_points"]
+                                       - self.df["player_2_rank_points"])
+
+    def add_original_rank_diff(self) -> None:
+        self.df["original_rank_diff"] = (self.df["player_1_original_rank"]
+                                         - self.df["player_2_original_rank"])
+
+
+class PhysicalEngineering(FeatureEngineeringBase):
+    def apply_feature_engineering(self) -> pd.DataFrame:
+        self.add_player_physical_features()
+        return self.df
+
+    def add_player_physical_features(self) -> None:
+        self.add_height_diff()
+        self.add_age_diff()
+
+    def add_age_diff(self) -> None:
+        self.df["age_diff"] = (self.df["player_1_age"]
+                               - self.df["player_2_age"])
+
+    def add_height_diff(self) -> None:
+        self.df["ht_diff"] = (self.df["player_1_ht"]
+                                  - self.df["player_2_ht"])
+
+
+class HeadToHeadEngineering(FeatureEngineeringBase):
+    def apply_feature_engineering(self) -> pd.DataFrame:
+        self.add_head_to_head_features()
+        return self.df
+
+    def add_head_to_head_features(self) -> None:
+        self.add_head_to_head_won()
+        self.add_head_to_head_diff()
+
+        self.add_surface_head_to_head_won()
+        self.add_surface_head_to_head_diff()
+
+    def add_head_to_head_won(self) -> defaultdict:
+        h2h_dict = defaultdict(lambda: [0, 0])
+        player_1_h2h_won, player_2_h2h_won = [], []
+
+        for row in self.df.itertuples():
+            player_1_id, player_2_id = row.player_1_id, row.player_2_id
+            player_1_won = row.player_1_won
+
+            key, first, second = get_h2h_params(player_1_id,
+                                                player_2_id, h2h_dict)
+
+            player_1_h2h_won.append(h2h_dict[key][first])
+            player_2_h2h_won.append(h2h_dict[key][second])
+
+            if player_1_won: h2h_dict[key][first] += 1
+            else: h2h_dict[key][second] += 1
+
+        self.df["player_1_h2h_won"] = player_1_h2h_won
+        self.df["player_2_h2h_won"] = player_2_h2h_won
+
+        return h2h_dict
+
+    def add_head_to_head_diff(self) -> None:
+        self.df["h2h_diff"] = (self.df["player_1_h2h_won"]
+                       - self.df["player_2_h2h_won"])
+
+    def add_surface_head_to_head_won(self) -> defaultdict:
+        surface_h2h_dict = defaultdict(lambda: [[0, 0], [0, 0],
+                                                [0, 0], [0, 0]])
+        player_1_surface_h2h_won, player_2_surface_h2h_won = [], []
+
+        for row in self.df.itertuples():
+            player_1_id, player_2_id = row.player_1_id, row.player_2_id
+            player_1_won = row.player_1_won
+
+            key, first, second = get_h2h_params(player_1_id,
+                                                player_2_id, surface_h2h_dict)
+
+            surface_idx = get_surface_index_by_row(row)
+
+            player_1_surface_h2h_won.append(surface_h2h_dict
+                                            [key][surface_idx][first])
+            player_2_surface_h2h_won.append(surface_h2h_dict
+                                            [key][surface_idx][second])
+
+            if player_1_won:
+                surface_h2h_dict[key][surface_idx][first] += 1
+            else:
+                surface_h2h_dict[key][surface_idx][second] += 1
+
+        self.df["player_1_surface_h2h_won"] = player_1_surface_h2h_won
+        self.df["player_2_surface_h2h_won"] = player_2_surface_h2h_won
+
+        return surface_h2h_dict
+
+    def add_surface_head_to_head_diff(self) -> None:
+        self.df["surface_h2h_diff"] = (self.df["player_1_surface_h2h_won"]
+                                    - self.df["player_2_surface_h2h_won"])
+
+
+class MatchDataEngineering(FeatureEngineeringBase):
+    def __init__(self, df: pd.DataFrame, last_n_matches: tuple):
+        super().__init__(df)
+        self.last_n_matches = last_n_matches
+
+    def apply_feature_engineering(self) -> pd.DataFrame:
+        self.add_won_match_data()
+        return self.df
+
+    def add_won_match_data(self) -> defaultdict:
+        match_dt = defaultdict(lambda: [0, 0]
+            + len(self.last_n_matches) * [0])
+        # index 0 won, 1 total, then last_n_matches results
+        player_1_won_match, player_2_won_match = [], []
+        player_1_total_match, player_2_total_match = [], []
+        last_won_matches_1, last_won_matches_2 = [], []
+
+        for row in self.df.itertuples():
+            player_1_id, player_2_id = row.player_1_id, row.player_2_id
+            player_1_won = row.player_1_won
+
+            self.append(match_dt, player_1_id, player_2_id,
+                    player_1_won_match, player_2_won_match,
+                    player_1_total_match, player_2_total_match,
+                    last_won_matches_1, last_won_matches_2)
+
+            self.update_matches_dict(match_dt, player_1_id,
+                                     player_2_id, player_1_won)
+
+        self.update_won_match(player_1_won_match, player_2_won_match)
+        self.update_total_match(player_1_total_match, player_2_total_match)
+        self.update_last_won_matches(last_won_matches_1, last_won_matches_2)
+
+        return match_dt
+
+    def update_last_won_matches(self, last_won_matches_1: List[List[int]],
+                                last_won_matches_2: List[List[int]]):
+        last_won_matches_1 = list(zip(*last_won_matches_1))
+        last_won_matches_2 = list(zip(*last_won_matches_2))
+
+        for idx, num in enumerate(self.last_n_matches):
+            self.df[f"player_1_last_{num}_match_won"] = (
+                last_won_matches_1[idx])
+
+            self.df[f"player_2_last_{num}_match_won"] = (
+                last_won_matches_2[idx])
+
+    def append(self, match_dt: defaultdict, player_1_id: int,
+            player_2_id: int,player_1_won_match: List[int],
+            player_2_won_match: List[int],player_1_total_match:  List[int],
+            player_2_total_match: List[int],
+            last_won_matches_1: List[List[int]],
+            last_won_matches_2: List[List[int]]) -> None:
+        self.append_won_match(match_dt, player_1_id, player_2_id,
+                              player_1_won_match, player_2_won_match)
+
+        self.append_total_match(match_dt, player_1_id, player_2_id,
+                                player_1_total_match, player_2_total_match)
+
+        self.append_last_won_matches(match_dt, player_1_id, player_2_id,
+                                     last_won_matches_1, last_won_matches_2)
+
+    def update_won_match(self, player_1_won_match: List[int],
+                         player_2_won_match: List[int]) -> None:
+        self.df["player_1_won_match"] = player_1_won_match
+        self.df["player_2_won_match"] = player_2_won_match
+
+    def update_total_match(self, player_1_total_match: List[int],
+                           player_2_total_match: List[int]) -> None:
+        self.df["player_1_total_match"] = player_1_total_match
+        self.df["player_2_total_match"] = player_2_total_match
+
+    def append_won_match(self, match_dt: defaultdict, player_1_id: int,
+            player_2_id: int, player_1_won_match: List[int],
+            player_2_won_match: List[int]) -> None:
+        player_1_won_match.append(match_dt[player_1_id][0])
+        player_2_won_match.append(match_dt[player_2_id][0])
+
+    def append_total_match(self, match_dt: defaultdict, player_1_id: int,
+            player_2_id: int, player_1_total_match: List[int],
+            player_2_total_match: List[int]) -> None:
+        player_1_total_match.append(match_dt[player_1_id][1])
+        player_2_total_match.append(match_dt[player_2_id][1])
+
+    def append_last_won_matches(self, match_dt: defaultdict, player_1_id: int,
+                        player_2_id: int, last_won_matches_1: List[list],
+                                last_won_matches_2: List[list]):
+        curr_data_1, curr_data_2 = [], []
+        for match_idx, num in enumerate(self.last_n_matches, start=2):
+            match_data = get_last_won_match_data(match_dt, player_1_id,
+                                                player_2_id, match_idx)
+
+            curr_data_1.append(match_data[0])
+            curr_data_2.append(match_data[1])
+
+        last_won_matches_1.append(curr_data_1)
+        last_won_matches_2.append(curr_data_2)
+
+    def update_matches_dict(self, match_dt: defaultdict, player_1_id: int,
+                            player_2_id: int, player_1_won: bool) -> None:
+        update_match_dict(match_dt, player_1_won,
+                          player_1_id, player_2_id,
+                          self.last_n_matches)
+
+
+class MatchFeatureDifferenceEngineering(FeatureEngineeringBase):
+    def __init__(self, df: pd.DataFrame, last_n_matches: tuple):
+        super().__init__(df)
+        self.last_n_matches = last_n_matches
+
+    def apply_feature_engineering(self) -> pd.DataFrame:
+        self.add_match_feature_differences()
+        return self.df
+
+    def add_match_feature_differences(self) -> None:
+        self.add_total_match_diff()
+        self.add_won_match_diff()
+        self.add_last_won_match_diff()
+
+    def add_total_match_diff(self) -> None:
+        self.df["total_match_diff"] = (self.df["player_1_total_match"]
+                                - self.df["player_2_total_match"])
+
+    def add_won_match_diff(self) -> None:
+        self.df["won_match_diff"] = (self.df["player_1_won_match"]
+                                - self.df["player_2_won_match"])
+
+    def add_last_won_match_diff(self) -> None:
+        for idx, num in enumerate(self.last_n_matches, start=2):
+            self.df[f"last_{num}_match_won_diff"] = (
+                                self.df[f"player_1_last_{num}_match_won"]
+                                - self.df[f"player_2_last_{num}_match_won"])
+
+
+class WinRatioEngineering(FeatureEngineeringBase):
+    def __init__(self, df: pd.DataFrame, last_n_matches: tuple):
+        super().__init__(df)
+        self.last_n_matches = last_n_matches
+
+    def apply_feature_engineering(self) -> pd.DataFrame:
+        self.add_win_ratio_features()
+        return self.df
+
+    def add_win_ratio_features(self) -> None:
+        self.add_win_ratio()
+        self.add_last_matches_win_ratio()
+
+        self.add_win_ratio_diff()
+        self.add_last_matches_win_ratio_diff()
+
+    def add_win_ratio(self) -> None:
+        self.df["player_1_win_ratio"] = np.where(
+            self.df["player_1_total_match"] == 0,
+            0,
+            self.df["player_1_won_match"] / self.df["player_1_total_match"]
+        )
+
+        self.df["player_2_win_ratio"] = np.where(
+            self.df["player_2_total_match"] == 0,
+            0,
+            self.df["player_2_won_match"] / self.df["player_2_total_match"]
+        )
+
+    def add_win_ratio_diff(self) -> None:
+        self.df["win_ratio_diff"] = (self.df["player_1_win_ratio"]
+                                    - self.df["player_2_win_ratio"])
+
+    def add_last_matches_win_ratio(self) -> None:
+        for num in self.last_n_matches:
+            self.df[f"player_1_last_{num}_win_ratio"] = (
+                    self.df[f"player_1_last_{num}_match_won"] / num
+            )
+
+            self.df[f"player_2_last_{num}_win_ratio"] = (
+                    self.df[f"player_2_last_{num}_match_won"] / num
+            )
+
+    def add_last_matches_win_ratio_diff(self) -> None:
+        for num in self.last_n_matches:
+            self.df[f"last_{num}_win_ratio_diff"] = (
+                self.df[f"player_1_last_{num}_win_ratio"]
+                - self.df[f"player_2_last_{num}_win_ratio"]
+            )
+
+
+class EloEngineering(FeatureEngineeringBase):
+    def __init__(self, df: pd.DataFrame, last_n_matches: tuple, K: int=24):
+        super().__init__(df)
+        self.last_n_matches = last_n_matches
+        self.K = K
+
+    def apply_feature_engineering(self) -> pd.DataFrame:
+        self.add_elo_features()
+        return self.df
+
+    def add_elo_features(self) -> None:
+        self.add_elo()
+        self.add_elo_diff()
+
+        self.add_elo_surface()
+        self.add_elo_surface_diff()
+
+        self.add_elo_progress_column()
+        self.add_last_matches_elo_progress()
+        self.add_last_matches_elo_progress_diff()
+
+    def add_elo(self) -> None:
+        player_1_elos, player_2_elos = get_elos(self.df, self.K)
+
+        self.df["player_1_elo"] = player_1_elos
+        self.df["player_2_elo"] = player_2_elos
+
+    def add_elo_diff(self) -> None:
+        self.df["elo_diff"] = (self.df["player_1_elo"]
+                               - self.df["player_2_elo"])
+
+    def add_elo_surface(self) -> None:
+        player_1_elos, player_2_elos = get_elo_surfaces(self.df, self.K)
+
+        self.df["player_1_elo_surface"] = player_1_elos
+        self.df["player_2_elo_surface"] = player_2_elos
+
+    def add_elo_surface_diff(self) -> None:
+        self.df["elo_surface_diff"] = (
+                self.df["player_1_elo_surface"]
+                - self.df["player_2_elo_surface"]
+        )
+
+    def add_elo_progress_column(self) -> None:
+        for num in self.last_n_matches:
+            self.df[f"player_1_last_{num}_elo_progress"] = 0.0
+            self.df[f"player_2_last_{num}_elo_progress"] = 0.0
+
+    def add_last_matches_elo_progress(self) -> None:
+        players_elo_history = defaultdict(lambda: [])
+        for row in self.df.itertuples():
+            row_idx = row.Index
+            player_1_id, player_2_id = row.player_1_id, row.player_2_id
+            player_1_elo, player_2_elo = row.player_1_elo, row.player_2_elo
+
+            for last_n in self.last_n_matches:
+                player_1_history = players_elo_history[player_1_id]
+                player_2_history = players_elo_history[player_2_id]
+
+                self.set_players_elo_progress(players_elo_history,
+                    player_1_history, player_2_history, last_n,
+                    player_1_id, player_2_id, row_idx)
+
+            append_players_elo_progress(players_elo_history, player_1_id,
+                                    player_2_id, player_1_elo, player_2_elo)
+
+    def add_last_matches_elo_progress_diff(self):
+        for last in self.last_n_matches:
+            self.df[f"last_{last}_elo_progress_diff"] = (
+                    self.df[f"player_1_last_{last}_elo_progress"]
+                    - self.df[f"player_2_last_{last}_elo_progress"]
+            )
+
+    def set_players_elo_progress(self, players_elo_history: defaultdict,
+                player_1_history: List[float], player_2_history: List[float],
+                last_n: int, player_1_id: int, player_2_id: int, row_idx):
+        self.handle_player_elo_progress(players_elo_history,
+                                        player_1_history, player_1_id,
+                                        last_n, 1, row_idx)
+
+        self.handle_player_elo_progress(players_elo_history,
+                                        player_2_history, player_2_id,
+                                        last_n, 2, row_idx)
+
+    def handle_player_elo_progress(self, players_elo_history: defaultdict,
+                player_history: List[float], player_id: int, last_n: int,
+                player_num: int, row_idx) -> None:
+        if not player_history:
+            new_progress = 0
+
+        elif last_n > len(players_elo_history[player_id]):
+            new_progress = player_history[-1] / player_history[0]
+
+        else:
+            new_progress = (player_history[-1]
+                            / player_history[len(player_history) - last_n])
+
+        self.df.at[row_idx, (f"player_{player_num}_last_{last_n}"
+                             "_elo_progress")] = new_progress
+
+
+class FeatureEngineeringDf(FeatureEngineeringBase):
+    def __init__(self, df: pd.DataFrame):
+        super().__init__(df)
+        self.df = df.sort_values(["tourney_year", "tourney_month",
+                                       "tourney_day"])
+        self.last_n_matches = (5, 10, 20, 50)
+        self.feature_engineering_steps = [
+            PlayerStatsEngineering(self.df).apply_feature_engineering,
+
+            PhysicalEngineering(self.df).apply_feature_engineering,
+
+            HeadToHeadEngineering(self.df).apply_feature_engineering,
+
+            (InGameDataEngineering(self.df, self.last_n_matches)
+             .apply_feature_engineering),
+
+            (MatchDataEngineering(self.df, self.last_n_matches)
+            .apply_feature_engineering),
+
+            (MatchFeatureDifferenceEngineering(self.df, self.last_n_matches)
+             .apply_feature_engineering),
+
+            (WinRatioEngineering(self.df, self.last_n_matches)
+             .apply_feature_engineering),
+
+            (EloEngineering(self.df, self.last_n_matches)
+             .apply_feature_engineering)
+        ]
+
+    def apply_feature_engineering(self) -> pd.DataFrame:
+        for step in self.feature_engineering_steps:
+            self.df = step()
+
+        return self.df
+
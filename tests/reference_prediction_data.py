@@ -0,0 +1,115 @@
+# The column by column assembly the API used before FeaturePlan, kept
+# as the reference the plan is checked against
+from typing import List, Tuple, Union
+
+from backend.player_store import PlayerView
+from backend.schemas import Prediction
+from tests.reference_player_data import get_surface_player_val
+
+
+class PredictionData:
+    entry_columns = [
+        "ALT", "Alt", "LL", "PR",
+        "Q", "SE", "WC"
+    ]
+
+    surface_columns = [
+        "surface_Carpet", "surface_Clay",
+        "surface_Grass", "surface_Hard"
+    ]
+
+    tourney_level_columns = [
+        'tourney_level_A', 'tourney_level_D', 'tourney_level_F',
+        'tourney_level_G', 'tourney_level_M',
+    ]
+
+    def __init__(self, prediction_columns: List[str], player_1: PlayerView,
+                 player_2: PlayerView, prediction: Prediction,
+                 tourney_date: Tuple[int, int, int]):
+        self.prediction_columns = prediction_columns
+        self.player_1 = player_1
+        self.player_2 = player_2
+        self.prediction = prediction
+        self.tourney_date = tourney_date
+
+        player_total_diff_columns = [
+            col for col in prediction_columns
+            if "diff" in col and "h2h" not in col
+        ]
+        self.player_diff_columns = [
+            col for col in player_total_diff_columns if "surface" not in col
+        ]
+        self.player_surface_diff_columns = [
+            col for col in player_total_diff_columns if "surface" in col
+        ]
+
+    def set(self) -> None:
+        self.set_players_entry_data()
+        self.set_players_hand_data()
+
+        self.set_tourney_date()
+
+        self.set_surface_data(self.prediction.surface)
+        self.set_tourney_level(self.prediction.tourney_level)
+
+        self.set_diff_columns()
+        self.set_surface_diff_columns()
+        self.draw_size = self.prediction.draw_size
+
+    def set_players_entry_data(self) -> None:
+        self.set_player_entry_data(self.prediction.player_1_entry)
+        self.set_player_entry_data(self.prediction.player_2_entry, 2)
+
+    def set_players_hand_data(self) -> None:
+        self.player_1_hand_L = self.player_1.hand_L
+        self.player_1_hand_R = self.player_1.hand_R
+
+        self.player_2_hand_L = self.player_2.hand_L
+        self.player_2_hand_R = self.player_2.hand_R
+
+    def set_tourney_date(self) -> None:
+        (self.tourney_year, self.tourney_month,
+         self.tourney_day) = self.tourney_date
+
+    def set_player_entry_data(self, entry_name: str, num: int=1) -> None:
+        for entry_col in self.entry_columns:
+            entry_val = True if entry_col == entry_name else False
+            setattr(self, f"player_{num}_entry_{entry_col}", entry_val)
+
+    def set_surface_data(self, surface: str) -> None:
+        surface = surface.capitalize()
+        for surface_col in self.surface_columns:
+            surface_val = (True if surface_col == f"surface_{surface}"
+                           else False)
+            setattr(self, surface_col, surface_val)
+
+    def set_tourney_level(self, tourney_level: str) -> None:
+        for tourney_col in self.tourney_level_columns:
+            tourney_val = (True
+                           if tourney_col == f"tourney_level_{tourney_level}"
+                           else False)
+            setattr(self, tourney_col, tourney_val)
+
+    def set_diff_columns(self) -> None:
+        for col in self.player_diff_columns:
+            player_col = col.replace("_diff", "")
+
+            player_1_val = getattr(self.player_1, player_col)
+            player_2_val = getattr(self.player_2, player_col)
+
+            setattr(self, col, player_1_val - player_2_val)
+
+    def set_surface_diff_columns(self) -> None:
+        surface = self.prediction.surface.capitalize()
+        for col in self.player_surface_diff_columns:
+            player_col = col.replace("diff", surface)
+
+            player_1_val = get_surface_player_val(self.player_1, player_col)
+            player_2_val = get_surface_player_val(self.player_2, player_col)
+
+            setattr(self, col, player_1_val - player_2_val)
+
+    def get_prediction_list(self) -> List[Union[float, int, bool]]:
+        # Every model column has to be set, a missing one raises
+        return [getattr(self, col) for col in self.prediction_columns]
+
@@ -0,0 +1,78 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from backend.storage import LAST_N_MATCHES
+from data_processing.feature_engineering import FeatureEngineeringDf
+from utils.dataframe import delete_columns, reorder_dataframe
+from utils.feature_helpers import SURFACE_NAMES
+
+
+IN_GAME_COLUMNS = ("ace", "df", "svpt", "1stIn", "1stWon", "2ndWon", "SvGms",
+                   "bpSaved", "bpFaced")
+ENTRIES = ("ALT", "Alt", "LL", "PR", "Q", "SE", "WC")
+TOURNEY_LEVELS = ("A", "D", "F", "G", "M")
+
+
+def get_match_df(match_count: int=600, player_count: int=40,
+                 seed: int=0) -> pd.DataFrame:
+    # Matches shaped like the cleaned, shuffled frame feature engineering
+    # gets, with a few matches on the same day so the sort has ties
+    rng = np.random.default_rng(seed)
+    player_ids = np.array([rng.choice(player_count, 2, replace=False)
+                           for _ in range(match_count)]) + 100001
+    heights = rng.integers(170, 200, player_count + 100001)
+    df = pd.DataFrame({
+        "tourney_year": rng.integers(1990, 2000, match_count),
+        "tourney_month": rng.integers(1, 13, match_count),
+        "tourney_day": rng.integers(1, 29, match_count),
+        "draw_size": rng.choice([32, 64, 128], match_count),
+        "player_1_won": rng.random(match_count) < 0.5,
+    })
+
+    surfaces = rng.integers(len(SURFACE_NAMES), size=match_count)
+    for surface_idx, surface in enumerate(SURFACE_NAMES):
+        df[f"surface_{surface}"] = surfaces == surface_idx
+
+    levels = rng.integers(len(TOURNEY_LEVELS), size=match_count)
+    for level_idx, level in enumerate(TOURNEY_LEVELS):
+        df[f"tourney_level_{level}"] = levels == level_idx
+
+    for num in (1, 2):
+        ids = player_ids[:, num - 1]
+        df[f"player_{num}_id"] = ids
+        df[f"player_{num}_seed"] = rng.choice([0.0, 1.0, 4.0, 16.0],
+                                              match_count)
+        df[f"player_{num}_ht"] = heights[ids]
+        df[f"player_{num}_age"] = 18 + rng.random(match_count) * 20
+        df[f"player_{num}_rank"] = rng.integers(1, 2000,
+                                                match_count).astype(float)
+        df[f"player_{num}_rank_points"] = rng.integers(
+            0, 10000, match_count).astype(float)
+        df[f"player_{num}_original_rank"] = df[f"player_{num}_rank"]
+        for column in IN_GAME_COLUMNS:
+            df[f"player_{num}_{column}"] = rng.integers(
+                0, 40, match_count).astype(float)
+
+        entries = rng.integers(len(ENTRIES), size=match_count)
+        for entry_idx, entry in enumerate(ENTRIES):
+            df[f"player_{num}_entry_{entry}"] = entries == entry_idx
+
+        df[f"player_{num}_hand_L"] = ids % 5 == 0
+        df[f"player_{num}_hand_R"] = ids % 5 != 0
+
+    return df
+
+
+def get_boosting_df(match_count: int=600, player_count: int=40,
+                    seed: int=0) -> pd.DataFrame:
+    # The final boosting_model frame as it reads back from the csv
+    df = FeatureEngineeringDf(get_match_df(
+        match_count, player_count, seed)).apply_feature_engineering()
+    return reorder_dataframe(df).reset_index(drop=True)
+
+
+def get_prediction_columns(df: pd.DataFrame) -> List[str]:
+    return [col for col in delete_columns(df.head(0), LAST_N_MATCHES).columns
+            if col != "player_1_won"]
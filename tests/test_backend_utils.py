@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.backend_utils import (
+    get_player_column_names,
+    get_final_player_columns,
+    get_player_columns,
+    get_player_surface_columns
+)
+from tests.reference_player_data import (
+    get_player_data_dict,
+    add_surface_attributes,
+    get_surface_player_val
+)
+from tests.synthetic import get_boosting_df
+from utils.feature_helpers import SURFACE_NAMES
+
+
+pytestmark = pytest.mark.filterwarnings(
+    "ignore::pandas.errors.PerformanceWarning")
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_player_columns_match_player_data_dict(seed):
+    boosting_df = get_boosting_df(match_count=60, player_count=16, seed=seed)
+    column_names = list(boosting_df.columns)
+    (
+        player_1_columns,
+        player_2_columns,
+        player_1_surface_columns,
+        player_2_surface_columns,
+    ) = get_final_player_columns(get_player_column_names(column_names, 1),
+                                 get_player_column_names(column_names, 2))
+
+    player_data_dict = get_player_data_dict(boosting_df, player_1_columns,
+                                            player_2_columns)
+    add_surface_attributes(boosting_df, player_data_dict,
+                           player_1_surface_columns, player_2_surface_columns)
+
+    player_ids, player_columns = get_player_columns(
+        boosting_df, player_1_columns, player_2_columns)
+    surface_values, surface_seen = get_player_surface_columns(
+        boosting_df, player_ids, player_1_surface_columns,
+        player_2_surface_columns)
+
+    assert player_ids.tolist() == list(player_data_dict)
+
+    surface_columns = [col.replace("player_1_", "")
+                       for col in player_1_surface_columns]
+    for row, player in enumerate(player_data_dict.values()):
+        for col, column in player_columns.items():
+            pd.testing.assert_series_equal(
+                pd.Series([column[row].item()]),
+                pd.Series([getattr(player, col)]), obj=col)
+
+        for surface_idx, surface_name in enumerate(SURFACE_NAMES):
+            expected = [get_surface_player_val(player, f"{col}_{surface_name}")
+                        for col in surface_columns]
+            np.testing.assert_array_equal(surface_values[row, surface_idx],
+                                          expected)
+            assert surface_seen[row, surface_idx] == hasattr(
+                player, f"{surface_columns[0]}_{surface_name}")
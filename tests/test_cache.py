@@ -0,0 +1,45 @@
+import asyncio
+
+from backend.cache import PredictionCache
+
+
+def test_versions_are_cached_side_by_side():
+    cache = PredictionCache(max_size=8)
+    computed = []
+
+    async def compute(value):
+        computed.append(value)
+        return value
+
+    async def run():
+        # Requests on the old and the new bundle interleave during a reload
+        results = []
+        for version in ("old", "new", "old", "new"):
+            results.append(await cache.get_or_compute(
+                "key", version, lambda: compute(version)))
+        return results
+
+    assert asyncio.run(run()) == ["old", "new", "old", "new"]
+    assert computed == ["old", "new"]
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_in_flight_requests_are_coalesced_per_version():
+    cache = PredictionCache(max_size=8)
+    computed = []
+
+    async def compute(version):
+        computed.append(version)
+        await asyncio.sleep(0.01)
+        return version
+
+    async def run():
+        return await asyncio.gather(*(
+            cache.get_or_compute("key", version,
+                                 lambda version=version: compute(version))
+            for version in ("old", "old", "new", "new")
+        ))
+
+    assert asyncio.run(run()) == ["old", "old", "new", "new"]
+    assert computed == ["old", "new"]
+    assert cache.get_stats()["coalesced"] == 2
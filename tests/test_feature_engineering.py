@@ -0,0 +1,51 @@
+from time import perf_counter
+
+import pandas as pd
+import pytest
+
+from data_processing.feature_engineering import FeatureEngineeringDf
+from tests import reference_feature_engineering as reference
+from tests.synthetic import get_match_df
+
+
+pytestmark = pytest.mark.filterwarnings(
+    "ignore::pandas.errors.PerformanceWarning")
+
+
+def get_feature_dfs(df: pd.DataFrame) -> tuple:
+    start = perf_counter()
+    reference_df = reference.FeatureEngineeringDf(
+        df.copy()).apply_feature_engineering()
+    reference_time = perf_counter() - start
+
+    start = perf_counter()
+    feature_df = FeatureEngineeringDf(df.copy()).apply_feature_engineering()
+    feature_time = perf_counter() - start
+
+    return reference_df, reference_time, feature_df, feature_time
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_matches_reference_pipeline(seed):
+    reference_df, _, feature_df, _ = get_feature_dfs(get_match_df(seed=seed))
+
+    assert list(feature_df.columns) == list(reference_df.columns)
+
+    # np.power can differ from Python's float pow in the last bit, the
+    # Elo columns only agree to within rounding
+    elo_columns = [col for col in feature_df.columns if "elo" in col]
+    pd.testing.assert_frame_equal(feature_df.drop(columns=elo_columns),
+                                  reference_df.drop(columns=elo_columns),
+                                  check_exact=True)
+    pd.testing.assert_frame_equal(feature_df[elo_columns],
+                                  reference_df[elo_columns],
+                                  check_exact=False, rtol=1e-12)
+
+
+def test_faster_than_reference_pipeline():
+    _, reference_time, _, feature_time = get_feature_dfs(
+        get_match_df(match_count=1500, player_count=60))
+
+    print(f"reference {reference_time:.2f} s, fused {feature_time:.2f} s, "
+          f"{reference_time / feature_time:.1f}x")
+    assert feature_time < reference_time
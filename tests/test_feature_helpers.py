@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from tests.synthetic import get_match_df
+from utils.feature_helpers import EloRatings, get_elo_progress
+
+
+LAST_N_MATCHES = (5, 10, 20, 50)
+
+
+def get_loop_elo_progress(player_ids: np.ndarray, elos: np.ndarray,
+                          last_n_matches: tuple) -> dict:
+    # The per-row loop get_elo_progress replaced
+    elo_progress = {last: np.zeros(player_ids.shape)
+                    for last in last_n_matches}
+    players_elo_history = defaultdict(list)
+    for row_idx, (ids, row_elos) in enumerate(zip(player_ids, elos)):
+        for num, player_id in enumerate(ids):
+            history = players_elo_history[player_id]
+            for last_n in last_n_matches:
+                if not history:
+                    progress = 0
+                elif last_n > len(history):
+                    progress = history[-1] / history[0]
+                else:
+                    progress = history[-1] / history[len(history) - last_n]
+
+                elo_progress[last_n][row_idx, num] = progress
+
+        for player_id, player_elo in zip(ids, row_elos):
+            players_elo_history[player_id].append(player_elo)
+
+    return elo_progress
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_elo_progress_matches_loop(seed):
+    # Enough matches per player for every window to fill up
+    rng = np.random.default_rng(seed)
+    player_ids = np.array([rng.choice(12, 2, replace=False)
+                           for _ in range(500)])
+    elos = np.round(rng.normal(1500, 150, player_ids.shape), 2)
+
+    expected = get_loop_elo_progress(player_ids, elos, LAST_N_MATCHES)
+    elo_progress = get_elo_progress(player_ids, elos, LAST_N_MATCHES)
+
+    assert list(elo_progress) == list(LAST_N_MATCHES)
+    for last, progress in elo_progress.items():
+        np.testing.assert_array_equal(progress, expected[last])
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_elo_grid_matches_single_K(seed):
+    df = get_match_df(seed=seed)
+    single_ratings = EloRatings(df, (24,))
+    grid_ratings = EloRatings(df, tuple(range(8, 49, 4)))
+
+    for single_elos, grid_elos in zip(single_ratings.get_elos(24),
+                                      grid_ratings.get_elos(24)):
+        np.testing.assert_array_equal(single_elos, grid_elos)
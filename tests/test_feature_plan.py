@@ -0,0 +1,65 @@
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from backend.feature_plan import FeaturePlan
+from backend.schemas import Prediction
+from backend.storage import get_player_store
+from tests.reference_prediction_data import PredictionData
+from tests.synthetic import (
+    ENTRIES,
+    TOURNEY_LEVELS,
+    get_boosting_df,
+    get_prediction_columns
+)
+
+
+pytestmark = pytest.mark.filterwarnings(
+    "ignore::pandas.errors.PerformanceWarning")
+
+TOURNEY_DATE = (2024, 12, 15)
+
+
+def get_predictions(player_ids: list) -> list:
+    predictions = []
+    pairs = permutations(player_ids, 2)
+    for pair_idx, (player_1_id, player_2_id) in enumerate(pairs):
+        for surface in ("carpet", "clay", "grass", "hard", "indoor"):
+            predictions.append(Prediction(
+                player_1_id=player_1_id, player_2_id=player_2_id,
+                player_1_entry=ENTRIES[pair_idx % len(ENTRIES)],
+                player_2_entry=ENTRIES[(pair_idx // 2) % len(ENTRIES)],
+                surface=surface,
+                tourney_level=TOURNEY_LEVELS[pair_idx % len(TOURNEY_LEVELS)],
+                draw_size=float(2 ** (pair_idx % 7 + 1))
+            ))
+
+    return predictions
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_fill_matches_prediction_data(seed):
+    # Few matches, so some players were never seen on some surfaces
+    boosting_df = get_boosting_df(match_count=30, player_count=12,
+                                  seed=seed)
+    prediction_columns = get_prediction_columns(boosting_df)
+    player_store = get_player_store(boosting_df)
+    plan = FeaturePlan(prediction_columns, player_store, TOURNEY_DATE)
+
+    for prediction in get_predictions(player_store.get_sorted_player_ids()):
+        prediction_data = PredictionData(
+            prediction_columns, player_store[prediction.player_1_id],
+            player_store[prediction.player_2_id], prediction, TOURNEY_DATE)
+        prediction_data.set()
+        prediction_data.h2h_diff = 3
+        prediction_data.surface_h2h_diff = -1
+
+        expected = np.array(prediction_data.get_prediction_list(),
+                            dtype=np.float32)
+        vector = plan.fill(prediction, 3, -1)
+
+        for column, expected_val, val in zip(prediction_columns, expected,
+                                             vector):
+            assert val == expected_val or np.isnan(val) and np.isnan(
+                expected_val), f"{column}: {val} != {expected_val}"
@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+from backend.feature_store import (
+    load_feature_store,
+    read_feature_store_manifest,
+    save_feature_store
+)
+from backend.h2h_store import get_h2h_store
+from backend.storage import Storage, get_player_store
+from tests.synthetic import get_boosting_df, get_prediction_columns
+
+
+pytestmark = pytest.mark.filterwarnings(
+    "ignore::pandas.errors.PerformanceWarning")
+
+
+@pytest.fixture(scope="module")
+def boosting_df():
+    return get_boosting_df(match_count=200, player_count=20, seed=1)
+
+
+def get_storage(boosting_df, model_version: str) -> Storage:
+    player_store = get_player_store(boosting_df)
+    return Storage(
+        get_prediction_columns(boosting_df), player_store.columns,
+        player_store.surface_columns, player_store,
+        get_h2h_store(boosting_df), {100001: "SRB"},
+        player_store.get_sorted_player_ids(), "1a-2b", model_version
+    )
+
+
+def test_snapshot_round_trip(tmp_path, boosting_df):
+    storage = get_storage(boosting_df, "3c-4d")
+    save_feature_store(storage, str(tmp_path))
+    feature_store = load_feature_store(str(tmp_path))
+
+    player_store = feature_store["player_store"]
+    np.testing.assert_array_equal(player_store.records,
+                                  storage.player_store.records)
+    assert player_store.column_types == storage.player_store.column_types
+    assert feature_store["prediction_columns"] == storage.prediction_columns
+    assert feature_store["model_version"] == "3c-4d"
+    assert feature_store["ioc_dict"] == {100001: "SRB"}
+
+
+def test_snapshot_versions_switch_the_manifest(tmp_path, boosting_df):
+    directories = []
+    for model_version in ("m1", "m2", "m3"):
+        save_feature_store(get_storage(boosting_df, model_version),
+                           str(tmp_path))
+        manifest = read_feature_store_manifest(str(tmp_path))
+        assert manifest["version"] == f"1a-2b_{model_version}"
+        directories.append(manifest["directory"])
+
+    # The current snapshot and the one before it are kept
+    assert sorted(os.listdir(tmp_path / "versions")) == sorted(
+        directories[1:])
+    assert load_feature_store(str(tmp_path))["model_version"] == "m3"
@@ -0,0 +1,70 @@
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from backend.h2h_store import get_h2h_store
+from tests.synthetic import get_match_df
+from utils.feature_helpers import MatchHistory, SURFACE_NAMES
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_diffs_match_match_history(seed):
+    df = get_match_df(match_count=400, player_count=20, seed=seed)
+
+    # The feature engineering pass keeps the same wins in dicts
+    match_history = MatchHistory(df, ())
+    match_history.get_counts()
+    h2h_dict = match_history.h2h_won
+    surface_h2h_dict = match_history.surface_h2h_won
+    h2h_store = get_h2h_store(df)
+
+    # Ids past the synthetic ones have no matches
+    player_ids = np.unique(df["player_1_id"]).tolist() + [999999]
+    pairs = np.array(list(permutations(player_ids, 2)), dtype=np.int64)
+    pairs = np.repeat(pairs, len(SURFACE_NAMES), axis=0)
+    surfaces = np.tile(np.arange(len(SURFACE_NAMES)),
+                       len(pairs) // len(SURFACE_NAMES))
+
+    h2h_diffs, surface_h2h_diffs = h2h_store.get_diffs(
+        pairs[:, 0], pairs[:, 1], surfaces)
+
+    for (player_1_id, player_2_id), surface_idx, h2h_diff, surface_diff in (
+            zip(pairs.tolist(), surfaces.tolist(), h2h_diffs.tolist(),
+                surface_h2h_diffs.tolist())):
+        expected = (
+            h2h_dict.get((player_1_id, player_2_id), 0)
+            - h2h_dict.get((player_2_id, player_1_id), 0),
+            surface_h2h_dict.get((player_1_id, player_2_id, surface_idx), 0)
+            - surface_h2h_dict.get((player_2_id, player_1_id, surface_idx), 0)
+        )
+        assert (h2h_diff, surface_diff) == expected
+
+
+def test_matches_resolve_without_the_frame():
+    df = get_match_df(match_count=400, player_count=20, seed=3)
+    h2h_store = get_h2h_store(df)
+
+    player_1_ids = df["player_1_id"].to_numpy()
+    player_2_ids = df["player_2_id"].to_numpy()
+    dates = (df["tourney_year"] * 10000 + df["tourney_month"] * 100
+             + df["tourney_day"]).to_numpy()
+    winner_ids = np.where(df["player_1_won"], player_1_ids, player_2_ids)
+    surfaces = np.argmax(df[[f"surface_{surface}" for surface
+                             in SURFACE_NAMES]].to_numpy(), axis=1)
+
+    for player_1_id, player_2_id in {(player_1_id, player_2_id) for
+                                     player_1_id, player_2_id
+                                     in zip(player_1_ids, player_2_ids)}:
+        in_pair = np.isin(player_1_ids, [player_1_id, player_2_id]) & (
+            np.isin(player_2_ids, [player_1_id, player_2_id]))
+        matches = h2h_store.get_matches(player_1_id, player_2_id)
+
+        assert np.all(np.diff(matches["date"]) >= 0)
+        assert sorted(zip(matches["date"].tolist(),
+                          matches["winner_id"].tolist(),
+                          matches["surface_idx"].tolist())) == sorted(zip(
+            dates[in_pair].tolist(), winner_ids[in_pair].tolist(),
+            surfaces[in_pair].tolist()))
+
+    assert len(h2h_store.get_matches(100001, 999999)) == 0
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from backend.leaderboard import Leaderboard
+from backend.storage import get_player_store
+from tests.synthetic import get_boosting_df
+
+
+pytestmark = pytest.mark.filterwarnings(
+    "ignore::pandas.errors.PerformanceWarning")
+
+
+def test_orders_are_built_with_the_leaderboard():
+    player_store = get_player_store(get_boosting_df(
+        match_count=40, player_count=16, seed=1))
+    leaderboard = Leaderboard(player_store, {})
+
+    stats = [*player_store.value_idx, *player_store.surface_attributes]
+    assert set(leaderboard.orders) == {(stat, descending) for stat in stats
+                                       for descending in (True, False)}
+
+    for stat in stats:
+        values, has_value = leaderboard.get_stat_values(stat)
+        for descending in (True, False):
+            order = leaderboard.get_order(stat, descending)
+            assert sorted(order.tolist()) == np.flatnonzero(
+                has_value).tolist()
+
+            ordered = values[order]
+            steps = np.diff(ordered)
+            assert np.all(steps <= 0 if descending else steps >= 0)
+            # Ties keep the store's row order
+            assert np.all(np.diff(order)[steps == 0] > 0)
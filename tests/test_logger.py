@@ -0,0 +1,31 @@
+import logging
+import os
+
+import pytest
+
+from utils import logger as logger_module
+from utils.logger import LOG_QUEUE, LazyQueueHandler
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_starts_its_own_listener():
+    # get_logger leaves loggers alone once pytest's root handlers exist
+    logger = logging.getLogger("tests.fork")
+    logger.propagate = False
+    logger.addHandler(LazyQueueHandler(LOG_QUEUE))
+    logger.warning("parent logs before the fork")
+    assert logger_module.LOG_LISTENER is not None
+
+    pid = os.fork()
+    if pid == 0:
+        inherited = logger_module.LOG_LISTENER
+        logger.warning("child logs after the fork")
+        listener = logger_module.LOG_LISTENER
+        os._exit(0 if inherited is None and listener is not None
+                 and listener._thread.is_alive() else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert logger_module.LOG_LISTENER is None
+    logger.warning("parent logs after the fork")
+    assert logger_module.LOG_LISTENER._thread.is_alive()
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from backend.oblivious_trees import (
+    export_catboost_model,
+    load_oblivious_tree_model,
+    read_bundle_feature_names
+)
+from tests.synthetic import get_boosting_df, get_prediction_columns
+
+
+catboost = pytest.importorskip("catboost")
+
+pytestmark = pytest.mark.filterwarnings(
+    "ignore::pandas.errors.PerformanceWarning")
+
+
+@pytest.mark.parametrize("nan_mode", ["Min", "Max"])
+def test_matches_catboost(tmp_path, nan_mode):
+    boosting_df = get_boosting_df(match_count=400, player_count=30, seed=1)
+    prediction_columns = get_prediction_columns(boosting_df)
+    train_df = boosting_df[prediction_columns].astype(np.float32)
+    # Missing values go down the side nan_mode sends them
+    train_df.iloc[::7, ::5] = np.nan
+
+    catboost_model = catboost.CatBoostClassifier(
+        iterations=40, depth=4, nan_mode=nan_mode, random_seed=0,
+        verbose=False, allow_writing_files=False)
+    catboost_model.fit(train_df, boosting_df["player_1_won"])
+
+    model_path = str(tmp_path / "catboost_model.cbm")
+    bundle_path = str(tmp_path / "catboost_model.npz")
+    catboost_model.save_model(model_path)
+    export_catboost_model(model_path, bundle_path)
+    tree_model = load_oblivious_tree_model(bundle_path)
+
+    assert read_bundle_feature_names(bundle_path) == prediction_columns
+    test_matrix = train_df.to_numpy()
+    np.testing.assert_allclose(tree_model.predict_proba(test_matrix),
+                               catboost_model.predict_proba(test_matrix),
+                               rtol=0, atol=1e-6)
@@ -0,0 +1,46 @@
+import copy
+import pickle
+
+import numpy as np
+import pytest
+
+from backend.storage import get_player_store
+from tests.synthetic import get_boosting_df
+
+
+pytestmark = pytest.mark.filterwarnings(
+    "ignore::pandas.errors.PerformanceWarning")
+
+
+@pytest.fixture(scope="module")
+def player_store():
+    return get_player_store(get_boosting_df(match_count=200, player_count=20,
+                                            seed=1))
+
+
+def test_values_are_a_view_of_records(player_store):
+    assert np.shares_memory(player_store.values, player_store.records)
+    for col, idx in player_store.value_idx.items():
+        np.testing.assert_array_equal(player_store.values[:, idx],
+                                      player_store.column(col))
+
+
+def test_values_keep_column_types(player_store):
+    player = player_store[player_store.get_sorted_player_ids()[0]]
+
+    assert type(player.ht) is int
+    assert type(player.total_match) is int
+    assert type(player.hand_L) is bool
+    assert type(player.elo) is float
+    assert player_store.column_types["ht"].kind == "i"
+
+
+def test_player_view_copies(player_store):
+    player = player_store[player_store.get_sorted_player_ids()[0]]
+
+    for player_copy in (copy.copy(player), pickle.loads(pickle.dumps(player))):
+        assert player_copy.row == player.row
+        assert player_copy.elo == player.elo
+
+    with pytest.raises(AttributeError):
+        player.__missing_dunder__
@@ -43,12 +43,13 @@ def save_final_dataframe(model: str) -> None:
     final_dataframe.to_csv(final_path, index=False)
 
 
-def read_final_csv(model: str) -> Optional[DataFrame]:
+def read_final_csv(model: str, usecols: Optional[List[str]]=None,
+                   dtype: Optional[dict]=None) -> Optional[DataFrame]:
     final_path = get_final_path(model)
     if not os.path.exists(final_path):
         raise FileNotFoundError(f"Final csv file for {model} not found!")
 
-    return pd.read_csv(final_path)
+    return pd.read_csv(final_path, usecols=usecols, dtype=dtype)
 
 
 def get_final_dataframe(model: str) -> DataFrame:
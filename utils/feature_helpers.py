@@ -1,24 +1,12 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional
 from collections import defaultdict
 from enum import IntEnum, auto
 
+import numpy as np
 import pandas as pd
 
 
-def get_elos(df: pd.DataFrame, K: int) -> Tuple[list, list]:
-    elo_rating = defaultdict(lambda: 1500)
-    player_1_elos = []
-    player_2_elos = []
-
-    for row in df.itertuples(index=False):
-        player_1_id, player_2_id = row.player_1_id, row.player_2_id
-        player_1_won = row.player_1_won
-
-        append_elos(player_1_elos, player_2_elos, player_1_id,
-                    player_2_id, elo_rating)
-        update_elo(elo_rating, player_1_won, K, player_1_id, player_2_id)
-
-    return player_1_elos, player_2_elos
+INITIAL_ELO = 1500
 
 
 class AutoZeroEnum(IntEnum):
@@ -33,6 +21,10 @@ class Surface(AutoZeroEnum):
     HARD = auto()
 
 
+SURFACE_NAMES = [surface.name.capitalize() for surface in Surface]
+# Carpet, Clay, Grass, Hard
+
+
 def get_surface_index(carpet: bool, clay: bool, grass: bool) -> int:
     if carpet: return Surface.CARPET.value
     if clay: return Surface.CLAY.value
@@ -40,135 +32,12 @@ def get_surface_index(carpet: bool, clay: bool, grass: bool) -> int:
     else: return Surface.HARD.value
 
 
-def get_in_game_data_by_row(row, column: str) -> Tuple[int, int]:
-    player_1_column  = f"player_1_{column}"
-    player_2_column = f"player_2_{column}"
-
-    player_1_val = getattr(row, player_1_column)
-    player_2_val = getattr(row, player_2_column)
-    return player_1_val, player_2_val
-
-
-def get_in_game_dict_over_surfaces() -> defaultdict:
-    base_dict = defaultdict(lambda: [[] for _ in range(4)])
-    # {"player_id": [carpet_values], [clay_values].....}
-    return base_dict
-
-
-def handle_total_values(row: Tuple[Any, ...], game_column: str,
-            total_val_list_1: List[int], total_val_list_2: List[int],
-            ply_1_id: int, ply_2_id: int,
-            player_total_val_dict: defaultdict) -> None:
-    player_1_val, player_2_val = get_in_game_data_by_row(row,
-                                                         game_column)
-
-    total_val_list_1.append(player_total_val_dict[ply_1_id])
-    total_val_list_2.append(player_total_val_dict[ply_2_id])
-
-    player_total_val_dict[ply_1_id] += player_1_val
-    player_total_val_dict[ply_2_id] += player_2_val
-
-
-def get_last_n_lists(last_len: int) -> tuple[List[List], List[List]]:
-    last_n_1 = [[] for _ in range(last_len)]
-    last_n_2 = [[] for _ in range(last_len)]
-    return last_n_1, last_n_2
-
-
-def get_last_n_surface_lists(last_len: int) -> tuple[List[List], List[List]]:
-    last_n_surface_1 = [[] for _ in range(last_len)]
-    last_n_surface_2 = [[] for _ in range(last_len)]
-    return last_n_surface_1, last_n_surface_2
-
-
-def get_last_n_sum(last: int,
-            player_list: List[List[List[int]]],
-            ply_index_list: List[int]):
-    last_n_sum = 0
-    for ply_idx, ply in enumerate(player_list):
-        curr_ply_index = ply_index_list[ply_idx]
-        if len(ply[last]) == 0:
-            continue
-
-        elif len(ply[last]) == curr_ply_index:
-            last_n_sum += ply[last][-1]
-
-        else:
-            last_n_sum += ply[last][curr_ply_index]
-
-    return last_n_sum
-
-
-class LastN:
-    def __init__(self, last_len: int):
-        self.last_n_1, self.last_n_2 = get_last_n_lists(last_len)
-        self.last_n_surface_1, self.last_n_surface_2 = (
-            get_last_n_surface_lists(last_len))
-
-
-def append_last_n_lists(player_1_list: list, player_2_list: list,
-                    last_n: LastN, last: int, ply_1_index_list: List[int],
-                    ply_2_index_list: List[int], surface_idx: int,
-                    curr_surface_index_1: int, curr_surface_index_2: int):
-    last_n_sum_1 = get_last_n_sum(last, player_1_list,
-                                  ply_1_index_list)
-    last_n_sum_2 = get_last_n_sum(last, player_2_list,
-                                  ply_2_index_list)
-
-    last_n.last_n_surface_1[last].append(
-        player_1_list[surface_idx][last][curr_surface_index_1]
-    )
-
-    last_n.last_n_surface_2[last].append(
-        player_2_list[surface_idx][last][curr_surface_index_2]
-    )
-
-    last_n.last_n_1[last].append(
-        last_n_sum_1
-    )
-
-    last_n.last_n_2[last].append(
-        last_n_sum_2
-    )
-
-
 def bulk_add(df: pd.DataFrame,
              col_dict: dict[str, List[int]]) -> pd.DataFrame:
     df[list(col_dict.keys())] = pd.DataFrame(col_dict, index=df.index)
     return df
 
 
-def increase_player_indexes(player_index_dict: Dict[int, List[int]],
-                       ply_1_id: int, ply_2_id: int,
-                       ply_1_list: List[int],ply_2_list: List[int],
-                       surface_idx: int) -> None:
-    carpet_idx_1, clay_idx_1, grass_idx_1, hard_idx_1 = ply_1_list[:4]
-    carpet_idx_2, clay_idx_2, grass_idx_2, hard_idx_2 = ply_2_list[:4]
-    total_idx_1, total_idx_2 = ply_1_list[4], ply_2_list[4]
-
-    carpet_idx_1, clay_idx_1, grass_idx_1, hard_idx_1 = (
-        get_new_surface_indexes(carpet_idx_1, clay_idx_1,
-                                grass_idx_1, hard_idx_1, surface_idx))
-
-    carpet_idx_2, clay_idx_2, grass_idx_2, hard_idx_2 = (
-        get_new_surface_indexes(carpet_idx_2, clay_idx_2,
-                                grass_idx_2, hard_idx_2, surface_idx))
-
-    player_index_dict[ply_1_id] = [carpet_idx_1, clay_idx_1,
-                                   grass_idx_1, hard_idx_1, total_idx_1 + 1]
-    player_index_dict[ply_2_id] = [carpet_idx_2, clay_idx_2,
-                                   grass_idx_2, hard_idx_2, total_idx_2 + 1]
-
-
-def get_new_surface_indexes(carpet_idx: int, clay_idx: int,grass_idx: int,
-                hard_idx: int, surface_idx: int) -> Tuple[int, int, int, int]:
-    if surface_idx == 0: carpet_idx += 1
-    elif surface_idx == 1: clay_idx += 1
-    elif surface_idx == 2: grass_idx += 1
-    else: hard_idx += 1
-    return carpet_idx, clay_idx, grass_idx, hard_idx
-
-
 def get_surface_index_by_row(row: pd.DataFrame.itertuples) -> int:
     carpet, clay = row.surface_Carpet, row.surface_Clay
     grass, hard = row.surface_Grass, row.surface_Hard
@@ -176,11 +45,84 @@ def get_surface_index_by_row(row: pd.DataFrame.itertuples) -> int:
     return surface_idx
 
 
-def append_elo_surfaces(player_1_elos: list, player_2_elos: list,
-                player_1_id: int, player_2_id: int,
-                elo_rating, surface_idx: int) -> None:
-    player_1_elos.append(elo_rating[player_1_id][surface_idx])
-    player_2_elos.append(elo_rating[player_2_id][surface_idx])
+def get_surface_indexes(df: pd.DataFrame) -> np.ndarray:
+    # Vectorized get_surface_index_by_row
+    return np.select(
+        [df["surface_Carpet"], df["surface_Clay"], df["surface_Grass"]],
+        [Surface.CARPET.value, Surface.CLAY.value, Surface.GRASS.value],
+        Surface.HARD.value
+    )
+
+
+class RollingWindows:
+    def __init__(self, player_ids: np.ndarray, surface_idx: np.ndarray,
+                 last_n_matches: Tuple[int]):
+        # Player 1 and player 2 of every match are stacked into one
+        # chronological sequence, entry 2 * row + num - 1
+        surface_count = len(Surface)
+        player_codes, unique_ids = pd.factorize(player_ids.ravel())
+        surfaces = np.repeat(surface_idx, 2)
+        groups = player_codes * surface_count + surfaces
+        entry_count = len(groups)
+
+        # Sorted by player and surface, every group is a contiguous run in
+        # chronological order
+        self.order = np.argsort(groups, kind="stable")
+        group_sizes = np.bincount(groups,
+                                  minlength=len(unique_ids) * surface_count)
+        group_starts = np.cumsum(group_sizes) - group_sizes
+
+        # Matches each player played on every surface before the entry,
+        # the index arrays are (surfaces, entries)
+        player_groups = (np.arange(surface_count)[:, None]
+                         + player_codes * surface_count)
+        sorted_keys = groups[self.order] * entry_count + self.order
+        self.group_starts = group_starts[player_groups]
+        self.seen_ends = np.searchsorted(
+            sorted_keys, player_groups * entry_count + np.arange(entry_count))
+        seen = self.seen_ends - self.group_starts
+
+        # Once a player has no matches left on a surface, the surface keeps
+        # adding the window before its last match
+        last_seen = np.clip(np.minimum(seen, group_sizes[player_groups] - 1),
+                            0, None)
+        self.window_ends = self.group_starts + last_seen
+        self.window_starts = {
+            last: self.group_starts + np.clip(last_seen - last, 0, None)
+            for last in last_n_matches
+        }
+        self.surface_idx = surfaces
+
+    def get_prefix_sums(self, values: np.ndarray) -> np.ndarray:
+        prefix_sums = np.zeros((len(values) + 1, *values.shape[1:]),
+                               dtype=values.dtype)
+        np.cumsum(values[self.order], axis=0, out=prefix_sums[1:])
+        return prefix_sums
+
+    def get_windows(self, player_values: np.ndarray) -> Dict[str, np.ndarray]:
+        # player_values (matches, 2, stats), every result has the same shape
+        # and only counts the matches before the current one. All stats
+        # share the index arrays, so they are summed together
+        shape = player_values.shape
+        prefix_sums = self.get_prefix_sums(
+            player_values.reshape(len(self.surface_idx), -1))
+        entries = np.arange(len(self.surface_idx))
+        window_ends = np.take(prefix_sums, self.window_ends, axis=0)
+        surface_ends = window_ends[self.surface_idx, entries]
+        end_sums = window_ends.sum(axis=0)
+
+        windows = {"total": (np.take(prefix_sums, self.seen_ends, axis=0)
+                             - np.take(prefix_sums, self.group_starts, axis=0)
+                             ).sum(axis=0).reshape(shape)}
+        for last, window_starts in self.window_starts.items():
+            window_starts = np.take(prefix_sums, window_starts, axis=0)
+            windows[f"last_{last}"] = (end_sums - window_starts.sum(axis=0)
+                                       ).reshape(shape)
+            windows[f"last_{last}_surface"] = (
+                surface_ends - window_starts[self.surface_idx, entries]
+            ).reshape(shape)
+
+        return windows
 
 
 def get_surface_name_by_row(row: pd.DataFrame.itertuples) -> str:
@@ -200,153 +142,252 @@ def get_surface_idx_by_name(surface: str) -> int:
     else: return Surface.HARD.value
 
 
-def update_elo_surface(elo_rating: dict, player_1_won: bool, K: int,
-            player_1_id: int, player_2_id: int, surface_idx: int) -> None:
-    actual_score_1 = 1 if player_1_won else 0
-    actual_score_2 = 1 - actual_score_1
-
-    expected_score_1 = get_expected_score(
-        elo_rating[player_1_id] [surface_idx],
-        elo_rating[player_2_id][surface_idx]
-    )
-    expected_score_2 = 1 - expected_score_1
-
-    elo_rating[player_1_id][surface_idx] += K * (actual_score_1
-                                                 - expected_score_1)
-    elo_rating[player_2_id][surface_idx] += K * (actual_score_2
-                                                 - expected_score_2)
-
-
-def get_elo_surfaces(df: pd.DataFrame, K: int) -> Tuple[list, list]:
-    elo_rating = defaultdict(lambda: [1500, 1500, 1500, 1500])
-    # carpet, clay, grass, hard
-
-    player_1_elos = []
-    player_2_elos = []
-
-    for row in df.itertuples(index=False):
-        surface_idx = get_surface_index_by_row(row)
-
-        player_1_id, player_2_id = row.player_1_id, row.player_2_id
-        player_1_won = row.player_1_won
-
-        append_elo_surfaces(player_1_elos, player_2_elos, player_1_id,
-                    player_2_id, elo_rating, surface_idx)
-        update_elo_surface(elo_rating, player_1_won, K, player_1_id,
-                           player_2_id, surface_idx)
-
-    return player_1_elos, player_2_elos
-
-
-def update_elo(elo_rating: dict, player_1_won: bool, K: int, player_1_id: int,
-               player_2_id: int) -> None:
-    actual_score_1 = 1 if player_1_won else 0
-    actual_score_2 = 1 - actual_score_1
-
-    expected_score_1 = get_expected_score(elo_rating[player_1_id],
-                                          elo_rating[player_2_id])
-    expected_score_2 = 1 - expected_score_1
-
-    elo_rating[player_1_id] += K * (actual_score_1 - expected_score_1)
-    elo_rating[player_2_id] += K * (actual_score_2 - expected_score_2)
-
-
-def get_expected_score(player_1_elo: float, player_2_elo: float) -> float:
-    return 1 / (1 + 10 ** ((player_2_elo - player_1_elo) / 400))
-
-
-def append_elos(player_1_elos: list, player_2_elos: list, player_1_id: int,
-                player_2_id: int, elo_rating) -> None:
-    player_1_elos.append(elo_rating[player_1_id])
-    player_2_elos.append(elo_rating[player_2_id])
-
-
-def update_match_dict(match_dt: defaultdict, player_1_won: bool,
-                      player_1_id: int, player_2_id: int,
-                      last_n_matches: tuple) -> None:
-    if player_1_won:
-        match_dt[player_1_id][0] += 1
-        for i, num in enumerate(last_n_matches, start=2):
-            match_dt[player_1_id][i] = min(match_dt[player_1_id][i] + 1, num)
-            match_dt[player_2_id][i] = max(match_dt[player_2_id][i] - 1, 0)
-
-    else:
-        match_dt[player_2_id][0] += 1
-        for i, num in enumerate(last_n_matches, start=2):
-            match_dt[player_2_id][i] = min(match_dt[player_2_id][i] + 1, num)
-            match_dt[player_1_id][i] = max(match_dt[player_1_id][i] - 1, 0)
-
-    match_dt[player_1_id][1] += 1
-    match_dt[player_2_id][1] += 1
-
-
-def append_players_elo_progress(players_elo_history: defaultdict,
-                                player_1_id: int, player_2_id: int,
-                                player_1_elo: float,
-                                player_2_elo: float) -> None:
-    append_player_elo_progress(players_elo_history, player_1_id, player_1_elo)
-    append_player_elo_progress(players_elo_history, player_2_id, player_2_elo)
-
-
-def append_player_elo_progress(players_elo_history: defaultdict,
-            player_id: int, player_elo: float) -> None:
-    players_elo_history[player_id].append(player_elo)
-
-
-def get_h2h_params(player_1_id: int, player_2_id: int,
-                   h2h_dict: defaultdict) -> Tuple[tuple, int, int]:
-    if (player_2_id, player_1_id) in h2h_dict:
-        key = (player_2_id, player_1_id)
-        first, second = 1, 0
-
-    else:
-        key = (player_1_id, player_2_id)
-        first, second = 0, 1
-
-    return key, first, second
-
-
-def get_head_to_head_dict(df: pd.DataFrame
-                          ) -> defaultdict[int, List[int]]:
-    h2h_dict = defaultdict(lambda: [0, 0])
-
-    for row in df.itertuples():
-        player_1_id, player_2_id = row.player_1_id, row.player_2_id
-        player_1_won = row.player_1_won
-
-        key, first, second = get_h2h_params(player_1_id,
-                                            player_2_id, h2h_dict)
-
-        if player_1_won:
-            h2h_dict[key][first] += 1
-        else:
-            h2h_dict[key][second] += 1
-
-    return h2h_dict
-
-
-def get_surface_head_to_head_dict(df: pd.DataFrame
-                                   ) -> defaultdict[int, List[List[int]]]:
-    surface_h2h_dict = defaultdict(lambda: [[0, 0], [0, 0],
-                                                [0, 0], [0, 0]])
-    for row in df.itertuples():
-        player_1_id, player_2_id = row.player_1_id, row.player_2_id
-        player_1_won = row.player_1_won
-
-        key, first, second = get_h2h_params(player_1_id,
-                                            player_2_id, surface_h2h_dict)
-
-        surface_idx = get_surface_index_by_row(row)
-
-        if player_1_won:
-            surface_h2h_dict[key][surface_idx][first] += 1
-        else:
-            surface_h2h_dict[key][surface_idx][second] += 1
-
-    return surface_h2h_dict
-
-
-def get_last_won_match_data(match_dt: defaultdict, player_1_id: int,
-        player_2_id: int, match_idx: int) -> Tuple[int, int]:
-    return (match_dt[player_1_id][match_idx],
-            match_dt[player_2_id][match_idx])
\ No newline at end of file
+def get_expected_scores(player_1_elos: np.ndarray,
+                        player_2_elos: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.power(10.0, (player_2_elos - player_1_elos) / 400))
+
+
+class EloRatings:
+    def __init__(self, df: pd.DataFrame, Ks: Tuple[int, ...]=(24,),
+                 add_matches: bool=True):
+        self.Ks = tuple(Ks)
+        surface_count = len(Surface)
+        match_count = len(df)
+
+        player_codes, self.player_ids = pd.factorize(
+            df[["player_1_id", "player_2_id"]].to_numpy().ravel())
+
+        # (players, surfaces + 1, Ks), the overall Elo comes after the
+        # surfaces. Holds the ratings after the last added match
+        self.ratings = np.full(
+            (len(self.player_ids), surface_count + 1, len(self.Ks)),
+            float(INITIAL_ELO))
+
+        # (matches, player 1 and 2, elo and elo_surface, Ks), the ratings
+        # both players had before every match
+        self.elos = np.empty((match_count, 2, 2, len(self.Ks)))
+
+        rating_idx = np.stack([np.full(match_count, surface_count),
+                               get_surface_indexes(df)], axis=1)
+        self.rating_rows = (player_codes.reshape(-1, 2, 1)
+                            * (surface_count + 1)
+                            + rating_idx[:, None, :]).reshape(match_count, 4)
+        self.player_1_won = df["player_1_won"].to_numpy(dtype=bool)
+
+        self.K_values = np.array(self.Ks, dtype=np.float64)
+        self.flat_ratings = self.ratings.reshape(-1, len(self.Ks))
+        self.match_elos = self.elos.reshape(match_count, 4, len(self.Ks))
+
+        # MatchHistory adds the matches from its own pass instead
+        if add_matches:
+            self.add_matches()
+
+    def add_matches(self) -> None:
+        for match_idx, player_1_won in enumerate(self.player_1_won.tolist()):
+            self.add_match(match_idx, player_1_won)
+
+    def add_match(self, match_idx: int, player_1_won: bool) -> None:
+        # Matches have to be added in order, every K is updated at once
+        rows = self.rating_rows[match_idx]
+        match_elos = self.flat_ratings[rows]
+        self.match_elos[match_idx] = match_elos
+        player_1_elos, player_2_elos = match_elos[:2], match_elos[2:]
+
+        actual_score_1 = 1 if player_1_won else 0
+        expected_score_1 = get_expected_scores(player_1_elos, player_2_elos)
+
+        self.flat_ratings[rows] = np.concatenate([
+            player_1_elos + self.K_values * (actual_score_1
+                                             - expected_score_1),
+            player_2_elos + self.K_values * ((1 - actual_score_1)
+                                             - (1 - expected_score_1))
+        ])
+
+    def get_elos(self, K: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Overall and surface Elo of both players, each (matches, 2)
+        elos = self.elos[..., self.Ks.index(K)]
+        return elos[:, :, 0], elos[:, :, 1]
+
+
+class MatchHistory:
+    # Every order-dependent feature from a single chronological pass over
+    # the matches: head to head, won and total matches, recent form and
+    # overall and surface Elo. Ratings passed in for a grid of Ks are only
+    # read. Elo progress is derived from the pre-match ratings afterwards
+    COUNT_COLUMNS = ("h2h_won", "surface_h2h_won", "won_match", "total_match")
+
+    def __init__(self, df: pd.DataFrame, last_n_matches: Tuple[int],
+                 K: int=24, elo_ratings: Optional[EloRatings]=None):
+        if elo_ratings is not None and K not in elo_ratings.Ks:
+            raise ValueError(f"K={K} is not one of the Elo rating Ks "
+                             f"{elo_ratings.Ks}!")
+
+        self.df = df
+        self.last_n_matches = last_n_matches
+        self.K = K
+        self.update_elos = elo_ratings is None
+        if elo_ratings is None:
+            elo_ratings = EloRatings(df, (K,), add_matches=False)
+        self.elo_ratings = elo_ratings
+
+        player_ids = df[["player_1_id", "player_2_id"]].to_numpy()
+        player_codes, unique_ids = pd.factorize(player_ids.ravel())
+        self.player_ids = player_ids
+        self.player_count = len(unique_ids)
+        self.player_codes = player_codes.reshape(-1, 2)
+        self.surface_idx = get_surface_indexes(df)
+        self.player_1_won = df["player_1_won"].to_numpy(dtype=bool)
+
+        self.count_names = [
+            *self.COUNT_COLUMNS,
+            *(f"last_{last}_match_won" for last in last_n_matches)
+        ]
+        self.columns: Optional[Dict[str, np.ndarray]] = None
+
+        # Wins after the last match, keyed by (winner_id, loser_id) and
+        # (winner_id, loser_id, surface_idx)
+        self.h2h_won: Dict[Tuple[int, int], int] = defaultdict(int)
+        self.surface_h2h_won: Dict[Tuple[int, int, int], int] = (
+            defaultdict(int))
+
+    def get_column(self, column_name: str) -> np.ndarray:
+        # (matches, 2), player 1 and player 2 before every match
+        if self.columns is None:
+            self.columns = self.get_columns()
+
+        return self.columns[column_name]
+
+    def get_counts(self) -> np.ndarray:
+        # (matches, 2, count columns), fills h2h_won and surface_h2h_won
+        # and the Elo ratings unless they were passed in
+        counts = np.empty((len(self.player_codes), 2, len(self.count_names)),
+                          dtype=np.int64)
+        self.add_matches(counts)
+        return counts
+
+    def get_columns(self) -> Dict[str, np.ndarray]:
+        counts = self.get_counts()
+        columns = {name: counts[:, :, idx]
+                   for idx, name in enumerate(self.count_names)}
+
+        elos, surface_elos = self.elo_ratings.get_elos(self.K)
+        columns.update({"elo": elos, "elo_surface": surface_elos})
+        for last, progress in get_elo_progress(
+                self.player_ids, elos, self.last_n_matches).items():
+            columns[f"last_{last}_elo_progress"] = progress
+
+        return columns
+
+    def add_matches(self, counts: np.ndarray) -> None:
+        last_n_matches = self.last_n_matches
+        player_count = self.player_count
+        h2h_won, surface_h2h_won = self.h2h_won, self.surface_h2h_won
+        add_elo_match = (self.elo_ratings.add_match if self.update_elos
+                         else None)
+
+        won_matches, total_matches = [0] * player_count, [0] * player_count
+        last_won = [[0] * len(last_n_matches) for _ in range(player_count)]
+
+        for match_idx, ((code_1, code_2), (id_1, id_2), surface_idx,
+                        player_1_won) in enumerate(zip(
+                self.player_codes.tolist(), self.player_ids.tolist(),
+                self.surface_idx.tolist(), self.player_1_won.tolist())):
+            counts[match_idx] = (
+                (h2h_won.get((id_1, id_2), 0),
+                 surface_h2h_won.get((id_1, id_2, surface_idx), 0),
+                 won_matches[code_1], total_matches[code_1],
+                 *last_won[code_1]),
+                (h2h_won.get((id_2, id_1), 0),
+                 surface_h2h_won.get((id_2, id_1, surface_idx), 0),
+                 won_matches[code_2], total_matches[code_2],
+                 *last_won[code_2])
+            )
+
+            if player_1_won:
+                winner, loser = code_1, code_2
+                h2h_won[id_1, id_2] += 1
+                surface_h2h_won[id_1, id_2, surface_idx] += 1
+            else:
+                winner, loser = code_2, code_1
+                h2h_won[id_2, id_1] += 1
+                surface_h2h_won[id_2, id_1, surface_idx] += 1
+
+            won_matches[winner] += 1
+            total_matches[code_1] += 1
+            total_matches[code_2] += 1
+
+            # Not a true window: a win adds one up to last, a loss takes
+            # one away down to 0
+            last_won[winner] = [min(won + 1, last) for won, last
+                                in zip(last_won[winner], last_n_matches)]
+            last_won[loser] = [max(won - 1, 0) for won in last_won[loser]]
+
+            if add_elo_match is not None:
+                add_elo_match(match_idx, player_1_won)
+
+    def add_columns(self, df: pd.DataFrame, column_name: str) -> None:
+        column = self.get_column(column_name)
+        df[f"player_1_{column_name}"] = column[:, 0]
+        df[f"player_2_{column_name}"] = column[:, 1]
+
+
+def get_elo_progress(player_ids: np.ndarray, elos: np.ndarray,
+                     last_n_matches: Tuple[int]) -> Dict[int, np.ndarray]:
+    # player_ids and elos are (matches, 2) with the pre-match Elo. Progress
+    # is the Elo a player brought into their previous match over the one
+    # they brought into the match last_n appearances back, or into their
+    # first match with fewer appearances, and 0 on their first appearance
+    history = pd.DataFrame({"player_id": player_ids.ravel(),
+                            "elo": elos.ravel()})
+    player_elos = history.groupby("player_id", sort=False)["elo"]
+
+    appearances = player_elos.cumcount().to_numpy()
+    previous_elos = player_elos.shift(1).to_numpy()
+    first_elos = player_elos.transform("first").to_numpy()
+
+    elo_progress = {}
+    for last in last_n_matches:
+        earlier_elos = np.where(appearances >= last,
+                                player_elos.shift(last).to_numpy(),
+                                first_elos)
+        elo_progress[last] = np.where(
+            appearances == 0, 0.0, previous_elos / earlier_elos
+        ).reshape(player_ids.shape)
+
+    return elo_progress
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+
+    last_n_matches = (5, 10, 20, 50)
+    rng = np.random.default_rng(0)
+    player_ids = np.array([rng.choice(1500, 2, replace=False)
+                           for _ in range(30000)])
+    elos = np.round(rng.normal(1500, 150, player_ids.shape), 2)
+    df = pd.DataFrame({"player_1_id": player_ids[:, 0],
+                       "player_2_id": player_ids[:, 1]})
+
+    start = perf_counter()
+    get_elo_progress(player_ids, elos, last_n_matches)
+    grouped_time = perf_counter() - start
+
+    print(f"Elo progress for {len(df)} matches: "
+          f"{grouped_time * 1000:.1f} ms")
+
+    surfaces = rng.integers(len(Surface), size=len(df))
+    for surface_idx, surface in enumerate(SURFACE_NAMES):
+        df[f"surface_{surface}"] = surfaces == surface_idx
+    df["player_1_won"] = rng.random(len(df)) < 0.5
+
+    start = perf_counter()
+    single_ratings = EloRatings(df, (24,))
+    single_time = perf_counter() - start
+
+    Ks = tuple(range(8, 49, 4))
+    start = perf_counter()
+    grid_ratings = EloRatings(df, Ks)
+    grid_time = perf_counter() - start
+
+    print(f"Elo ratings for {len(df)} matches: K=24 {single_time:.2f} s, "
+          f"{len(Ks)} Ks {grid_time:.2f} s")
@@ -1,4 +1,12 @@
+import atexit
+import itertools
+import json
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
 
 class ColoredFormatter(logging.Formatter):
     COLORS = {
@@ -15,14 +23,178 @@ class ColoredFormatter(logging.Formatter):
         return f"{color}{super().format(record)}{reset}"
 
 
-def get_logger(logger_name: str) -> logging:
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        log_line = {
+            "time": self.formatTime(record), "level": record.levelname,
+            "logger": record.name, "message": record.getMessage()
+        }
+        if record.exc_info:
+            log_line["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(log_line, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    # Keeps one in every `every` records below WARNING, warnings and
+    # errors always get through
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self.counter = itertools.count()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        if not self.every:
+            return False
+
+        return next(self.counter) % self.every == 0
+
+
+class LazyQueueHandler(QueueHandler):
+    # The message is only formatted in the listener thread, so log
+    # arguments should not be mutated after the call
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if LOG_LISTENER is None:
+            start_log_listener()
+        super().enqueue(record)
+
+
+def get_logger_settings(settings_text: Optional[str]) -> Dict[str, str]:
+    # "backend.api=INFO,backend.scheduler=0.01"
+    settings = {}
+    for item in (settings_text or "").split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            settings[name.strip()] = value.strip()
+
+    return settings
+
+
+APP_ENV = os.getenv("APP_ENV", "development")
+LOG_LEVEL = os.getenv("LOG_LEVEL",
+                      "WARNING" if APP_ENV == "production" else "DEBUG")
+LOG_LEVELS = get_logger_settings(os.getenv("LOG_LEVELS"))
+LOG_SAMPLING = get_logger_settings(os.getenv("LOG_SAMPLING"))
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+LOG_QUEUE = queue.SimpleQueue()
+LOG_LISTENER: Optional[QueueListener] = None
+
+
+def get_formatter(log_format: str=LOG_FORMAT) -> logging.Formatter:
+    if log_format == "json":
+        return JsonLinesFormatter()
+
+    return ColoredFormatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+def start_log_listener() -> None:
+    global LOG_LISTENER
+    if LOG_LISTENER is not None:
+        return None
+
+    # Formatting and the blocking stream write happen on this thread,
+    # started by the first record a process logs
+    handler = logging.StreamHandler()
+    handler.setFormatter(get_formatter())
+    LOG_LISTENER = QueueListener(LOG_QUEUE, handler)
+    LOG_LISTENER.start()
+
+
+def stop_log_listener() -> None:
+    global LOG_LISTENER
+    if LOG_LISTENER is not None:
+        LOG_LISTENER.stop()
+        LOG_LISTENER = None
+
+
+# No listener thread may be mid-write when a process forks, the child
+# would inherit the stream lock it holds. Parent and child each start
+# their own on the next record
+atexit.register(stop_log_listener)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=stop_log_listener)
+
+
+def get_logger_setting(logger_name: str,
+                       settings: Dict[str, str]) -> Optional[str]:
+    # The most specific configured prefix wins, "backend" covers
+    # "backend.api"
+    for name, value in sorted(settings.items(), key=lambda item:
+                              -len(item[0])):
+        if logger_name == name or logger_name.startswith(f"{name}."):
+            return value
+
+    return None
+
+
+def get_logger_level(logger_name: str) -> str:
+    level = get_logger_setting(logger_name, LOG_LEVELS)
+    return (level or LOG_LEVEL).upper()
+
+
+def get_logger(logger_name: str) -> logging.Logger:
     logger = logging.getLogger(logger_name)
     if not logger.hasHandlers():
-        logger.setLevel(logging.DEBUG)
-        handler = logging.StreamHandler()
+        logger.setLevel(get_logger_level(logger_name))
+        sample_rate = get_logger_setting(logger_name, LOG_SAMPLING)
+        if sample_rate is not None:
+            logger.addFilter(SamplingFilter(float(sample_rate)))
+
+        logger.addHandler(LazyQueueHandler(LOG_QUEUE))
+    return logger
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+
+    def log_request(logger: logging.Logger, lazy: bool) -> None:
+        # The three lines get_model_output writes for every prediction
+        winner_player, confidence_percent = 1, 63.94
+        if lazy:
+            logger.debug("Raw Player 1 Won Prediction: %s", True)
+            logger.debug("Raw Confidence Score: %s", 0.6394)
+            logger.debug("Model Prediction: Player %s wins with %s%% "
+                         "confidence", winner_player, confidence_percent)
+        else:
+            logger.debug(f"Raw Player 1 Won Prediction: {True}")
+            logger.debug(f"Raw Confidence Score: {0.6394}")
+            logger.debug(f"Model Prediction: Player {winner_player}"
+                         f" wins with {confidence_percent}% confidence")
+
+    def time_requests(logger: logging.Logger, lazy: bool,
+                      iterations: int=20000) -> float:
+        start = perf_counter()
+        for _ in range(iterations):
+            log_request(logger, lazy)
+        return (perf_counter() - start) / iterations
+
+    with open(os.devnull, "w") as devnull:
+        # The previous setup: DEBUG, formatted and written inline
+        inline_logger = logging.getLogger("benchmark.inline")
+        inline_logger.propagate = False
+        inline_logger.setLevel(logging.DEBUG)
+        inline_handler = logging.StreamHandler(devnull)
+        inline_handler.setFormatter(get_formatter("text"))
+        inline_logger.addHandler(inline_handler)
+        print(f"inline DEBUG: "
+              f"{time_requests(inline_logger, False) * 1e6:.2f} us/request")
+
+        queued_logger = logging.getLogger("benchmark.queued")
+        queued_logger.propagate = False
+        queued_logger.addHandler(LazyQueueHandler(LOG_QUEUE))
+        LOG_LISTENER = QueueListener(LOG_QUEUE, inline_handler)
+        LOG_LISTENER.start()
 
-        formatter = ColoredFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
+        for level in ("DEBUG", "INFO", "WARNING"):
+            queued_logger.setLevel(level)
+            elapsed = time_requests(queued_logger, True)
+            print(f"queued {level}: {elapsed * 1e6:.2f} us/request")
 
-        logger.addHandler(handler)
-    return logger
\ No newline at end of file
+        stop_log_listener()